@@ -1,28 +1,135 @@
+import asyncio
+import contextvars
+import datetime
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import streamlit as st
 import pandas as pd
-from groq import Groq
-from data_handler import DataGovAPI
+from groq import Groq, RateLimitError
+from data_handler import DataGovAPI, RateLimiter
+from async_data_handler import AsyncDataGovAPI, AsyncRunner
+from answer_cache import AnswerCache
+from cache_warmer import ForegroundGate, QueryLog
+from correlation import correlate, format_stats
+from frame_cache import FrameCache
+from prompt_budget import Section, compact_sources, estimate_tokens, fit_sections, table
+from request_control import CircuitBreaker, yield_to
+from rollups import RollupStore
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from schemas import CROP_SCHEMA, DICTIONARY, RAINFALL_SCHEMA, assemble_chunks, compact, memory_bytes
+from tracing import Trace, current_trace, span
 from query_analyzer import QueryAnalyzer
+from query_planner import (DEFAULT_COVERAGE, FetchPlan, PlannedRequest, QueryPlanner, last_complete_year,
+                           mentions_rain)
+import rainfall_seasons
+import trends
 from dotenv import load_dotenv
 
 
 class IntelligentQASystem:
-    """Main AI Q&A System for agricultural and climate data."""
+    """Main AI Q&A System for agricultural and climate data.
 
-    def __init__(self):
+    An instance holds no per-user state, so one can be shared by every
+    Streamlit session in the process (see app.py): the API clients, their
+    connection pools and the fetched-frame cache are then reused by all users.
+    """
+
+    MODEL = "llama-3.1-8b-instant"
+
+    # Seconds after a question is asked past which optional data is left out
+    ANSWER_SLA = float(os.getenv("SAMARTH_ANSWER_SLA", "8"))
+    DATASET_LABELS = {"crop_data": "Crop production data", "rainfall_data": "Rainfall data"}
+
+    # Token budget for the data summary in the prompt
+    SUMMARY_TOKENS = int(os.getenv("SAMARTH_SUMMARY_TOKENS", "600"))
+    # Longest table built before budgeting (district rankings)
+    MAX_TABLE_ROWS = 25
+    # Summary tables per query type, most relevant first; unlisted ones go last
+    SUMMARY_PRIORITY = {
+        "ranking": ["crop_overview", "state_production", "district_ranking", "crop_by_state",
+                    "rain_overview", "rainfall_by_state", "yearly_production", "rainfall_by_year"],
+        "trend": ["crop_overview", "state_trend", "yearly_production", "district_trend", "trend_anomalies",
+                  "rain_overview", "rain_trend", "rainfall_by_year", "state_production", "crop_by_state",
+                  "rainfall_by_state", "district_ranking"],
+        "comparison": ["crop_overview", "state_production", "crop_by_state", "rain_overview",
+                       "rainfall_by_state", "yearly_production", "rainfall_by_year", "district_ranking"],
+        "correlation": ["crop_overview", "rain_overview", "correlation", "season_rainfall", "rainfall_by_state",
+                        "state_production", "yearly_production", "rainfall_by_year", "crop_by_state",
+                        "district_ranking"],
+        "general": ["crop_overview", "state_production", "district_ranking", "rain_overview",
+                    "rainfall_by_state", "crop_by_state", "yearly_production", "rainfall_by_year"],
+    }
+
+    def __init__(self,
+                 use_async: bool = True,
+                 frame_cache_bytes: int = 256 * 1024 * 1024,
+                 trace_log: Optional[str] = None,
+                 summary_tokens: Optional[int] = None,
+                 requests_per_second: float = 3.0,
+                 llm_requests_per_second: Optional[float] = None,
+                 answer_sla: Optional[float] = None,
+                 max_requests_per_second: Optional[float] = None):
         # Load local .env if present
         load_dotenv()
 
-        self.data_api = DataGovAPI()
+        self.use_async = use_async
+        self.summary_tokens = summary_tokens or self.SUMMARY_TOKENS
+        # 0 disables the deadline: every dataset is waited for
+        self.answer_sla = self.ANSWER_SLA if answer_sla is None else answer_sla
+        self.fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dataset-fetch")
+        # Append per-stage timing spans as JSON lines (see tracing.py)
+        self.trace_log = trace_log or os.getenv("SAMARTH_TRACE_LOG")
+
+        self.response_cache = ResponseCache(ttls=DataGovAPI.CACHE_TTLS)
+        self.frame_cache = FrameCache(max_bytes=frame_cache_bytes)
+        # Concurrent identical (or narrower) fetches share one download
+        self.single_flight = SingleFlight()
+        self.answer_cache = AnswerCache()
+        # data.gov.in pacing adapts: a 429 halves it and successes raise it
+        # again, up to max_requests_per_second (twice the rate by default)
+        # One breaker for both clients, so either seeing the API down stops both
+        self.breaker = CircuitBreaker()
+        self.data_api = DataGovAPI(cache=self.response_cache, requests_per_second=requests_per_second,
+                                   breaker=self.breaker, max_requests_per_second=max_requests_per_second)
+        # Paces Groq calls (cache hits are free) at most at the given rate; None leaves them unpaced
+        self.llm_limiter = (RateLimiter(llm_requests_per_second, max_rate=llm_requests_per_second)
+                            if llm_requests_per_second else None)
+        self.rollups = RollupStore()
         self.query_analyzer = QueryAnalyzer()
+        self.query_planner = QueryPlanner(
+            batch_size=DataGovAPI.BATCH_SIZE,
+            is_cached=lambda dataset, kwargs: not self.needs_fetch(dataset, kwargs),
+            is_local=self._is_local,
+            coverage=self.coverage,
+        )
+        self.query_log = QueryLog()
+        # Held while a user's question is fetching; background warming waits on it
+        self.foreground = ForegroundGate()
+
+        # One long-lived loop and httpx pool instead of one per question
+        self.async_runner = None
+        self.async_api = None
+        if use_async:
+            self.async_runner = AsyncRunner()
+            self.async_api = self.async_runner.run(
+                AsyncDataGovAPI(cache=self.response_cache,
+                                requests_per_second=requests_per_second, breaker=self.breaker,
+                                max_requests_per_second=max_requests_per_second).__aenter__()
+            )
 
         # --- Load API key (Streamlit secrets > environment variable) ---
         api_key = None
 
-        if hasattr(st, "secrets") and "GROQ_API_KEY" in st.secrets:
-            api_key = st.secrets["GROQ_API_KEY"]
-        elif os.getenv("GROQ_API_KEY"):
+        try:
+            if hasattr(st, "secrets") and "GROQ_API_KEY" in st.secrets:
+                api_key = st.secrets["GROQ_API_KEY"]
+        except FileNotFoundError:
+            # No secrets.toml (e.g. running headless); fall back to the environment
+            pass
+        if not api_key and os.getenv("GROQ_API_KEY"):
             api_key = os.getenv("GROQ_API_KEY")
 
         if not api_key:
@@ -33,101 +140,699 @@ class IntelligentQASystem:
         self.groq_client = Groq(api_key=api_key)
 
     # ------------------------------------------------------------------
-    def fetch_relevant_data(self, analysis: dict) -> dict:
-        """Fetch data from APIs based on query analysis."""
-        result = {"crop_data": None, "rainfall_data": None, "sources": []}
-
-        states = analysis["states"]
-        crops = analysis["crops"]
-        years = analysis["years"]
-
-        # Handle crop data (available up to 2014)
-        crop_year = 2014
-        if years:
-            crop_year = min(years[0], 2014)
-
-        if crops and states:
-            print(f"📊 Fetching crop data for {crops} in {states} (year: {crop_year})...")
-            for state in states[:2]:
-                for crop in crops[:2]:
-                    df = self.data_api.fetch_crop_data(
-                        state=state,
-                        crop=crop,
-                        year=crop_year,
-                        limit=200,
-                    )
-                    if df is not None and len(df) > 0:
-                        result["crop_data"] = (
-                            df if result["crop_data"] is None else pd.concat([result["crop_data"], df])
-                        )
-                        result["sources"].append(
-                            f"Crop Production API (data.gov.in) - {state}, {crop}, {crop_year}"
-                        )
-
-        # Handle rainfall data (default year 2020)
-        if states:
-            rain_year = years[0] if years else 2020
-            print(f"🌧️ Fetching rainfall data for {states} (year: {rain_year})...")
-            for state in states[:2]:
-                df = self.data_api.fetch_rainfall_data(state=state, year=rain_year, limit=300)
+    def plan(self, analysis: dict) -> FetchPlan:
+        """Minimal fetch plan for a query analysis (see query_planner.py)"""
+        return self.query_planner.plan(analysis)
+
+    def plan_fetches(self, analysis: dict, verbose: bool = True) -> list:
+        """Turn query analysis into (dataset, kwargs, source) fetch jobs."""
+        plan = self.plan(analysis)
+        if verbose and plan.requests:
+            print(plan.explain())
+        return plan.jobs
+
+    def _is_local(self, dataset: str, kwargs: dict) -> bool:
+        """True if a job is read from a local store rather than the API"""
+        if dataset == "crop_data":
+            return self.data_api.crop_snapshot is not None and self.data_api.crop_snapshot.exists()
+        store = self.data_api.rainfall_store
+        return store is not None and store.serves(kwargs.get("state"), kwargs.get("year"))
+
+    def coverage(self, dataset: str) -> Tuple[int, int]:
+        """(first, last) year a dataset has data for.
+
+        Read from the crop snapshot manifest, the rainfall sync watermarks
+        and the rollup cubes when they exist, else DEFAULT_COVERAGE. Rainfall
+        coverage never includes a year that is still being reported.
+        """
+        first, last = DEFAULT_COVERAGE[dataset]
+        if dataset == "crop_data":
+            snapshot = self.data_api.crop_snapshot
+            if snapshot is not None and snapshot.exists() and snapshot.manifest().get("years"):
+                first, last = snapshot.manifest()["years"]
+                return int(first), int(last)
+            cube = self.rollups.cube("crop_state")
+            if cube is not None and len(cube):
+                years = cube.index.get_level_values("crop_year")
+                return int(years.min()), int(years.max())
+            return first, last
+
+        # Rainfall keeps growing, so it ends at the last complete year: the
+        # newest day of the finished syncs when there are any, else the
+        # year before the current one
+        store = self.data_api.rainfall_store
+        if store is not None:
+            newest = [mark["max_date"] for mark in store.manifest()["states"].values()
+                      if mark.get("complete") and mark.get("max_date")]
+            if newest:
+                last = min(last, last_complete_year(datetime.date.fromisoformat(max(newest)[:10])))
+        cube = self.rollups.cube("rain_state")
+        if cube is not None and len(cube):
+            first = min(first, int(cube.index.get_level_values("Year").min()))
+        return first, last
+
+    def _run_jobs_sync(self, jobs: list) -> list:
+        fetchers = {
+            "crop_data": self.data_api.fetch_crop_data,
+            "rainfall_data": self.data_api.fetch_rainfall_data,
+        }
+        frames = []
+        for dataset, kwargs, _ in jobs:
+            with span("fetch_job", dataset=dataset, **kwargs) as job:
+                df = fetchers[dataset](**kwargs)
+                job["rows"] = 0 if df is None else len(df)
+            frames.append(df)
+        return frames
+
+    async def _run_jobs_async(self, jobs: list, trace: Optional[Trace] = None) -> list:
+        # Runs on the shared loop thread, so adopt the caller's trace here
+        current_trace.set(trace)
+        fetchers = {
+            "crop_data": self.async_api.fetch_crop_data,
+            "rainfall_data": self.async_api.fetch_rainfall_data,
+        }
+
+        async def fetch(dataset, kwargs):
+            with span("fetch_job", dataset=dataset, **kwargs) as job:
+                df = await fetchers[dataset](**kwargs)
+                job["rows"] = 0 if df is None else len(df)
+            return df
+
+        return await asyncio.gather(*[fetch(dataset, kwargs) for dataset, kwargs, _ in jobs])
+
+    def run_jobs(self, jobs: list, broader: bool = True) -> list:
+        """Fetch each job's frame, serving repeats from the shared frame cache.
+
+        Misses go through the single-flight layer: a job another thread or
+        session is already fetching, or that a broader in-flight fetch
+        covers, waits for that download instead of sending its own.
+        """
+        keys = [FrameCache.make_key(dataset, kwargs) for dataset, kwargs, _ in jobs]
+        with span("frame_cache", jobs=len(jobs)) as lookup:
+            frames = [self.frame_cache.get(key) for key in keys]
+            missing = [i for i, df in enumerate(frames) if df is None]
+            lookup["cache_hits"] = len(jobs) - len(missing)
+        if not missing:
+            return frames
+
+        owned, waiting = [], []
+        for i in missing:
+            flight, role = self.single_flight.join(jobs[i][0], jobs[i][1], broader)
+            (owned if role == "leader" else waiting).append((i, flight, role))
+
+        if owned:
+            todo = [jobs[i] for i, _, _ in owned]
+            try:
+                with self.foreground:
+                    if self.use_async:
+                        fetched = self.async_runner.run(self._run_jobs_async(todo, current_trace.get()))
+                    else:
+                        fetched = self._run_jobs_sync(todo)
+            except BaseException as e:
+                for _, flight, _ in owned:
+                    self.single_flight.finish(flight, error=e)
+                raise
+            for (i, flight, _), df in zip(owned, fetched):
+                frames[i] = df
+                # Truncated results are not reused; the next ask retries them
+                if df is not None and not df.attrs.get("partial"):
+                    self.frame_cache.put(keys[i], df)
+                self.single_flight.finish(flight, df)
+
+        # Waiters go last, so a thread never blocks before publishing its own fetches
+        retry = []
+        for i, flight, role in waiting:
+            with span("single_flight", dataset=flight.dataset, role=role):
+                try:
+                    df = flight.future.result()
+                except Exception:
+                    retry.append(i)
+                    continue
+            if role == "subset":
+                df = self.single_flight.narrow(flight.dataset, df, flight.kwargs, jobs[i][1])
+                if df is None:
+                    self.single_flight.count("subset_refetched")
+                    retry.append(i)
+                    continue
+                self.single_flight.count("subset_served")
+                self.frame_cache.put(keys[i], df)
+            frames[i] = df
+        if retry:
+            for i, df in zip(retry, self.run_jobs([jobs[i] for i in retry], broader=False)):
+                frames[i] = df
+
+        return frames
+
+    def needs_fetch(self, dataset: str, kwargs: dict) -> bool:
+        """True if a job is neither cached, being fetched nor answerable from the rollups"""
+        if self.frame_cache.contains(FrameCache.make_key(dataset, kwargs)):
+            return False
+        if self.single_flight.in_flight(dataset, kwargs):
+            return False
+        return self._rollup(dataset, kwargs) is None
+
+    def _rollup(self, dataset: str, kwargs: dict) -> Optional[pd.DataFrame]:
+        """Rollup rows answering a job, or None.
+
+        The rainfall cubes are fed by the sync, so they only answer what the
+        local copy serves: a sync that stopped partway, or the current year,
+        goes to the API instead.
+        """
+        if dataset == "rainfall_data":
+            store = self.data_api.rainfall_store
+            if store is None or not store.serves(kwargs.get("state"), kwargs.get("year")):
+                return None
+        return self.rollups.lookup(dataset, **kwargs)
+
+    def warm(self, dataset: str, kwargs: dict):
+        """Fetch one job into the shared caches (used by cache_warmer).
+
+        Uses the client that answers questions, so warming shares its rate
+        limiter, and yields to user fetches before every page it requests.
+        """
+        flight, role = self.single_flight.join(dataset, kwargs, broader=False)
+        if role != "leader":
+            return  # already being fetched for someone else
+        jobs = [(dataset, kwargs, None)]
+        token = yield_to.set(self.foreground)
+        try:
+            if self.use_async:
+                # The loop's task copies this thread's context, yield_to included
+                df, = self.async_runner.run(self._run_jobs_async(jobs))
+            else:
+                df, = self._run_jobs_sync(jobs)
+        except BaseException as e:
+            self.single_flight.finish(flight, error=e)
+            raise
+        finally:
+            yield_to.reset(token)
+        if df is not None and not df.attrs.get("partial"):
+            self.frame_cache.put(FrameCache.make_key(dataset, kwargs), df)
+        self.single_flight.finish(flight, df)
+
+    def _plan_for(self, analysis: dict) -> FetchPlan:
+        with span("plan") as planning:
+            plan = self.plan(analysis)
+            planning.update(jobs=len(plan.requests), estimated_requests=plan.estimated_requests)
+        if plan.requests:
+            print(plan.explain())
+            self.query_log.record(plan.jobs)
+        return plan
+
+    def _fetch_dataset(self, dataset: str, requests: List[PlannedRequest]) -> dict:
+        """Fetch one dataset's planned requests into a single compact frame.
+
+        Returns {"frame", "sources", "partial"} for that dataset. Rows cut
+        off by a request's limit are noted in its source and make the piece
+        partial; the frame's `truncated` attr tells the summaries.
+        """
+        jobs = [request.job for request in requests]
+        piece = {"frame": None, "sources": [], "partial": False}
+
+        # Serve what the pre-aggregated rollups can answer; fetch the rest
+        with span("rollup_lookup", dataset=dataset) as lookup:
+            frames = [self._rollup(dataset, kwargs) for dataset, kwargs, _ in jobs]
+            from_rollup = [df is not None for df in frames]
+            lookup["cache_hits"] = sum(from_rollup)
+        missing = [i for i, df in enumerate(frames) if df is None]
+        if missing:
+            for i, df in zip(missing, self.run_jobs([jobs[i] for i in missing])):
+                frames[i] = df
+        # The fetched frame knows from the API's total whether it was cut;
+        # the planner's estimate stands in for frames that do not say
+        cuts = [None if df is None or rolled or not df.attrs.get("truncated", request.truncated)
+                else (len(df), df.attrs.get("total"))
+                for request, df, rolled in zip(requests, frames, from_rollup)]
+        # Broad requests carry more rows than asked for; keep the asked-for slices
+        frames = [request.select(df) for request, df in zip(requests, frames)]
+
+        with span("assemble", dataset=dataset) as assemble:
+            chunks = []
+            for (_, kwargs, source), df, rolled, cut in zip(jobs, frames, from_rollup, cuts):
                 if df is not None and len(df) > 0:
-                    result["rainfall_data"] = (
-                        df if result["rainfall_data"] is None else pd.concat([result["rainfall_data"], df])
-                    )
-                    result["sources"].append(
-                        f"Daily District Rainfall API (data.gov.in) - {state}, {rain_year}"
-                    )
+                    chunks.append(df)
+                    notes = []
+                    if rolled:
+                        notes.append("pre-aggregated")
+                    elif df.attrs.get("partial"):
+                        notes.append("partial: some pages failed")
+                        piece["partial"] = True
+                    if cut:
+                        rows, total = cut
+                        notes.append(f"truncated: first {rows:,} of {total:,} rows" if total
+                                     else f"truncated at {rows:,} rows")
+                        piece["partial"] = True
+                    freshness = self._freshness(dataset, kwargs)
+                    if freshness:
+                        notes.append(freshness)
+                    piece["sources"].append(f"{source} ({'; '.join(notes)})" if notes else source)
+            # One normalization pass: API, snapshot and rollup frames all end
+            # up on the shared category dictionary and compact numeric types
+            schema = CROP_SCHEMA if dataset == "crop_data" else RAINFALL_SCHEMA
+            before = memory_bytes(chunks)
+            piece["frame"] = assemble_chunks(compact(df, schema) for df in chunks)
+            if piece["frame"] is not None:
+                piece["frame"].attrs["truncated"] = any(cuts)
+                cut = [c for c in cuts if c]
+                if cut:
+                    # Rows kept and (when every cut request reported it) rows available
+                    piece["frame"].attrs["cut"] = (sum(rows for rows, _ in cut),
+                                                   sum(total for _, total in cut) if all(t for _, t in cut) else None)
+            after = memory_bytes([piece["frame"]])
+            assemble.update(bytes_before=before, bytes=after,
+                            records=0 if piece["frame"] is None else len(piece["frame"]))
+        if before > after:
+            print(f"🧮 Fetched {dataset}: {before / 1024:,.0f} KB → {after / 1024:,.0f} KB after compaction "
+                  f"(+{DICTIONARY.nbytes() / 1024:,.0f} KB shared category dictionary)")
+        return piece
+
+    def start_fetches(self, analysis: dict, plan: Optional[FetchPlan] = None) -> Dict[str, Future]:
+        """Plan (unless `plan` is given), then fetch each dataset on its own
+        worker; returns at once.
+
+        Datasets run concurrently (and, with `use_async`, so do the requests
+        within each), so a caller can use whichever dataset lands first.
+        """
+        plan = plan or self._plan_for(analysis)
+        by_dataset: Dict[str, List[PlannedRequest]] = {}
+        for request in plan.requests:
+            by_dataset.setdefault(request.dataset, []).append(request)
+        # Each worker runs in a copy of this context, so its spans join the question's trace
+        return {dataset: self.fetch_pool.submit(contextvars.copy_context().run,
+                                                self._fetch_dataset, dataset, requests)
+                for dataset, requests in by_dataset.items()}
 
+    @staticmethod
+    def _merge(pieces: Dict[str, dict]) -> dict:
+        result = {"crop_data": None, "rainfall_data": None, "sources": [], "partial": False}
+        for dataset, piece in pieces.items():
+            result[dataset] = piece["frame"]
+            result["sources"].extend(piece["sources"])
+            result["partial"] = result["partial"] or piece["partial"]
         return result
 
+    def fetch_relevant_data(self, analysis: dict) -> dict:
+        """Fetch data from APIs based on query analysis.
+
+        Waits for every dataset; answer_question instead starts answering as
+        soon as the datasets the question needs are in (see required_datasets).
+        """
+        futures = self.start_fetches(analysis)
+        return self._merge({dataset: future.result() for dataset, future in futures.items()})
+
+    def required_datasets(self, analysis: dict, planned) -> set:
+        """Datasets an answer cannot start without; the rest are optional.
+
+        Crop questions are answered from crop data unless they mention
+        rain; rainfall-only questions and correlations need what they plan.
+        """
+        planned = set(planned)
+        if analysis["query_type"] == "correlation" or "crop_data" not in planned:
+            return planned
+        if mentions_rain(analysis):
+            return planned
+        return {"crop_data"}
+
+    def _gather(self, futures: Dict[str, Future], analysis: dict, deadline: Optional[float]):
+        """Collect datasets as they finish, building their summary sections at once.
+
+        Returns (data, sections, late): required datasets are always waited
+        for; optional ones still running at `deadline` (a perf_counter time)
+        are left out, listed in `late` and make `data` partial. An optional
+        dataset whose fetch fails is skipped.
+        """
+        required = self.required_datasets(analysis, futures)
+        owner = {future: dataset for dataset, future in futures.items()}
+        pieces, sections = {}, []
+        pending = set(futures.values())
+        while pending:
+            waiting_on_required = any(owner[f] in required for f in pending)
+            timeout = None
+            if not waiting_on_required and deadline is not None:
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                dataset = owner[future]
+                try:
+                    pieces[dataset] = future.result()
+                except Exception as e:
+                    if dataset in required:
+                        raise
+                    print(f"⚠️ Optional {dataset} fetch failed: {e}")
+                    continue
+                with span("summarize", dataset=dataset):
+                    sections.extend(self._dataset_sections(dataset, pieces[dataset]["frame"], analysis))
+
+        late = sorted(owner[f] for f in pending)
+        data = self._merge(pieces)
+        if late:
+            print(f"⏱️ Answering without {', '.join(late)}: not in within the {self.answer_sla:g} s SLA")
+            # The answer leaves data out, so it is incomplete like a cut fetch
+            data["partial"] = True
+        return data, sections, late
+
+    def _freshness(self, dataset: str, kwargs: dict) -> Optional[str]:
+        """Sync age of the local rainfall copy a job was served from, if any"""
+        store = self.data_api.rainfall_store
+        if dataset != "rainfall_data" or store is None or not store.serves(kwargs.get("state"), kwargs.get("year")):
+            return None
+        return store.freshness(kwargs.get("state"))
+
     # ------------------------------------------------------------------
+    @staticmethod
+    def _record_count(df: pd.DataFrame) -> int:
+        """Raw rows represented by a frame; rollup rows carry a `records` count."""
+        if "records" in df.columns:
+            return int(df["records"].fillna(1).sum())
+        return len(df)
+
+    @staticmethod
+    def _names(values, limit: int = 12) -> str:
+        names = [str(v) for v in values]
+        more = f" … +{len(names) - limit} more" if len(names) > limit else ""
+        return f"({len(names)}) " + ", ".join(names[:limit]) + more
+
+    def _crop_sections(self, crop_df: pd.DataFrame, analysis: dict) -> List[Section]:
+        """Overview, per-state, per-crop, per-year and district tables of crop data"""
+        ascending = analysis.get("ranking_order") == "asc"
+        years = crop_df["crop_year"].dropna()
+        overview = [
+            f"- Crop records: {self._record_count(crop_df):,}",
+            f"- States {self._names(crop_df['state_name'].unique())}",
+            f"- Crops {self._names(crop_df['crop'].unique())}",
+            f"- Districts: {crop_df['district_name'].nunique()}",
+        ]
+        if len(years):
+            overview.append(f"- Crop years: {int(years.min())}-{int(years.max())}")
+        sections = [Section("crop_overview", "Crop data:", overview, min_rows=len(overview))]
+        if "production_" not in crop_df.columns:
+            return sections
+
+        by_state = crop_df.groupby("state_name", observed=True)[["production_", "area_"]].sum()
+        by_state = by_state.sort_values("production_", ascending=ascending)
+        share = by_state["production_"] / by_state["production_"].sum() * 100
+        yield_t_ha = by_state["production_"] / by_state["area_"].where(by_state["area_"] > 0)
+        header, rows = table(["state", "production_t", "share", "yield_t_ha"], [
+            (state, f"{prod:,.0f}", f"{pct:.1f}%", f"{y:.2f}" if pd.notna(y) else "n/a")
+            for state, prod, pct, y in zip(by_state.index, by_state["production_"], share, yield_t_ha)
+        ])
+        order = "lowest" if ascending else "highest"
+        sections.append(Section("state_production", f"Production by state ({order} first):", rows, [header]))
+
+        if crop_df["crop"].nunique() > 1:
+            pivot = crop_df.pivot_table(index="state_name", columns="crop", values="production_",
+                                        aggfunc="sum", observed=True)
+            header, rows = table(["state"] + [str(c) for c in pivot.columns], [
+                [state] + [f"{v:,.0f}" if pd.notna(v) else "-" for v in values]
+                for state, values in zip(pivot.index, pivot.to_numpy())
+            ])
+            sections.append(Section("crop_by_state", "Production by state and crop (tonnes):", rows, [header]))
+
+        if years.nunique() > 1:
+            pivot = crop_df.pivot_table(index="crop_year", columns="state_name", values="production_",
+                                        aggfunc="sum", observed=True).sort_index()
+            first, last = pivot.iloc[0], pivot.iloc[-1]
+            change = ((last - first) / first.where(first > 0) * 100).dropna()
+            header, rows = table(["year"] + [str(c) for c in pivot.columns], [
+                [int(year)] + [f"{v:,.0f}" if pd.notna(v) else "-" for v in values]
+                for year, values in zip(pivot.index, pivot.to_numpy())
+            ])
+            notes = [f"change {int(pivot.index[0])}→{int(pivot.index[-1])}: "
+                     + ", ".join(f"{state} {pct:+.1f}%" for state, pct in change.items())] if len(change) else []
+            sections.append(Section("yearly_production", "Production by year (tonnes):", rows,
+                                    notes + [header], keep="ends"))
+
+        districts = (crop_df.groupby(["state_name", "district_name"], observed=True)["production_"].sum()
+                     .sort_values(ascending=ascending).head(self.MAX_TABLE_ROWS))
+        header, rows = table(["district", "state", "production_t"], [
+            (district, state, f"{prod:,.0f}") for (state, district), prod in districts.items()
+        ])
+        sections.append(Section("district_ranking", f"Districts by production ({order} first):",
+                                rows, [header]))
+        return sections
+
+    def _rain_seasons(self, rain_df: pd.DataFrame) -> pd.DataFrame:
+        """Season and annual totals per district for the states and years in `rain_df`.
+
+        Frames served from the rollups read the precomputed rain_season
+        table; raw daily rows are resampled on the spot.
+        """
+        with span("resample_rainfall", rows=len(rain_df)) as resample:
+            precomputed = None
+            if "Avg_rainfall" not in rain_df.columns and self.rollups.cube("rain_season") is not None:
+                parts = [self.rollups.seasons(state=state) for state in rain_df["State"].astype(str).unique()]
+                parts = [part for part in parts if part is not None]
+                if parts:
+                    precomputed = pd.concat(parts, ignore_index=True)
+                    precomputed = precomputed[precomputed["Year"].isin(rain_df["Year"].dropna().astype(int).unique())]
+            resample["precomputed"] = precomputed is not None
+            if precomputed is not None:
+                return precomputed
+            return rainfall_seasons.seasonal(rainfall_seasons.monthly(rain_df))
+
+    @staticmethod
+    def _rain_shortfall(rain_df: pd.DataFrame, seasons: pd.DataFrame) -> Optional[str]:
+        """Why rainfall totals cannot be stated for this frame, or None if they can"""
+        if rain_df.attrs.get("truncated"):
+            return "the rows were cut off by the API row limit, so only part of each year is known"
+        annual = seasons[seasons["Season"] == rainfall_seasons.ANNUAL]
+        coverage = annual["coverage"].mean() if len(annual) else 1.0
+        if coverage < rainfall_seasons.MIN_COVERAGE:
+            return f"only {coverage:.0%} of days were reported"
+        return None
+
+    def _rain_sections(self, rain_df: pd.DataFrame) -> List[Section]:
+        """Overview, seasonal totals per state and annual totals per year"""
+        overview = [
+            f"- Rainfall records: {self._record_count(rain_df):,}",
+            f"- States {self._names(rain_df['State'].unique())}",
+        ]
+        if "Avg_rainfall" not in rain_df.columns and "Avg_rainfall_sum" not in rain_df.columns:
+            return [Section("rain_overview", "Rainfall data:", overview, min_rows=2)]
+        if rain_df.attrs.get("truncated"):
+            return self._partial_rain_sections(rain_df, overview)
+        seasons = self._rain_seasons(rain_df)
+        shortfall = self._rain_shortfall(rain_df, seasons)
+        if shortfall:
+            overview.append(f"- Not enough data to state rainfall totals: {shortfall}")
+            return [Section("rain_overview", "Rainfall data:", overview, min_rows=len(overview))]
+        annual = seasons[seasons["Season"] == rainfall_seasons.ANNUAL]
+        coverage = annual["coverage"].mean() if len(annual) else 1.0
+        if coverage < 0.9:
+            overview.append(f"- Only {coverage:.0%} of days reported; totals are scaled up from the mean daily rainfall")
+        sections = [Section("rain_overview", "Rainfall data:", overview, min_rows=len(overview))]
+        seasons = seasons[seasons["coverage"] >= rainfall_seasons.MIN_COVERAGE]
+        annual = annual[annual["coverage"] >= rainfall_seasons.MIN_COVERAGE]
+        if seasons.empty:
+            return sections
+
+        shown = [rainfall_seasons.ANNUAL, "Monsoon", "Kharif", "Rabi"]
+        per_state = rainfall_seasons.by_state(seasons[seasons["Season"].isin(shown)], ["Season"])
+        pivot = per_state.pivot(index="State", columns="Season", values="mm").reindex(columns=shown)
+        pivot = pivot.sort_values(rainfall_seasons.ANNUAL, ascending=False)
+        header, rows = table(["state", "annual_mm", "monsoon_mm", "kharif_mm", "rabi_mm"], [
+            [state] + [f"{v:,.0f}" if pd.notna(v) else "-" for v in values]
+            for state, values in zip(pivot.index, pivot.to_numpy())
+        ])
+        sections.append(Section("rainfall_by_state",
+                                "Rainfall by state and season (mm, district average, mean over years):",
+                                rows, [header]))
+
+        if annual["Year"].nunique() > 1:
+            pivot = rainfall_seasons.by_state(annual, ["Year"]).pivot(index="Year", columns="State", values="mm")
+            header, rows = table(["year"] + [str(c) for c in pivot.columns], [
+                [int(year)] + [f"{v:,.0f}" if pd.notna(v) else "-" for v in values]
+                for year, values in zip(pivot.index, pivot.to_numpy())
+            ])
+            sections.append(Section("rainfall_by_year", "Annual rainfall by year (mm):", rows,
+                                    [header], keep="ends"))
+        return sections
+
+    def _partial_rain_sections(self, rain_df: pd.DataFrame, overview: List[str]) -> List[Section]:
+        """Rainfall cut off by the row limit: what the rows received show, labelled as partial.
+
+        Only part of each year arrived, so no season or annual totals are
+        stated; the table gives the dates covered and the mean daily rainfall.
+        """
+        kept, total = rain_df.attrs.get("cut") or (len(rain_df), None)
+        label = f"first {kept:,} of {total:,} rows" if total else f"first {kept:,} rows"
+        overview.append(f"- Partial: the API row limit kept only the {label}, "
+                        f"so season and annual totals are not stated")
+        sections = [Section("rain_overview", "Rainfall data:", overview, min_rows=len(overview))]
+        if "Avg_rainfall" not in rain_df.columns or "Date" not in rain_df.columns:
+            return sections
+        per_state = rain_df.groupby(rain_df["State"].astype(str), observed=True).agg(
+            start=("Date", "min"), end=("Date", "max"), days=("Date", "nunique"), mm=("Avg_rainfall", "mean"))
+        header, rows = table(["state", "from", "to", "days", "mean_daily_mm"], [
+            (state, f"{row.start:%Y-%m-%d}", f"{row.end:%Y-%m-%d}", row.days, f"{row.mm:,.1f}")
+            for state, row in zip(per_state.index, per_state.itertuples(index=False))
+        ])
+        sections.append(Section("rainfall_by_state", f"Rainfall by state, partial ({label} only):",
+                                rows, [header]))
+        return sections
+
+    def _season_rainfall_section(self, crop_df: pd.DataFrame, rain_df: pd.DataFrame) -> List[Section]:
+        """Crop production per state and season beside that season's rainfall"""
+        if "season" not in crop_df.columns or "production_" not in crop_df.columns:
+            return []
+        seasons = self._rain_seasons(rain_df)
+        if self._rain_shortfall(rain_df, seasons):
+            return []  # the rainfall overview says why
+        seasons = seasons[seasons["coverage"] >= rainfall_seasons.MIN_COVERAGE]
+        joined = rainfall_seasons.crop_season_rainfall(crop_df, seasons)
+        if joined.empty:
+            return []
+        matched = bool(joined["matched"].iloc[0])
+        note = ("matched on crop year" if matched else
+                "the datasets share no years: mean production vs mean season rainfall of the years each covers")
+        header, rows = table(["state", "season", "production_t", "season_rain_mm"], [
+            (row.State.title(), row.Season, f"{row.production:,.0f}", f"{row.mm:,.0f}")
+            for row in joined.itertuples(index=False)
+        ])
+        return [Section("season_rainfall", "Production and rainfall by crop season:", rows, [note, header])]
+
+    def _crop_trend_sections(self, crop_df: pd.DataFrame) -> List[Section]:
+        """Per-state and per-district growth, CAGR and anomalies (see trends.py)"""
+        if "production_" not in crop_df.columns or crop_df["crop_year"].nunique() < 2:
+            return []
+        # Tonnes of different crops do not add up to a trend
+        by_crop = ["crop"] if crop_df["crop"].nunique() > 1 else []
+        first, last = self.coverage("crop_data")
+        notes = [f"crop table covers {first}-{last}; cagr = compound annual growth, "
+                 f"trend = least-squares change per year, avg_{trends.WINDOW}y = latest rolling mean"]
+
+        states = trends.analyze(crop_df, ["state_name"] + by_crop, "production_", "crop_year")
+        summary = states["summary"].sort_values("cagr", ascending=False, na_position="last")
+        label = lambda row: " ".join(str(getattr(row, k)) for k in ["state_name"] + by_crop)
+        header, rows = table(
+            ["state", "years", "first_t", "last_t", "change", "cagr", "trend_t_per_yr", f"avg_{trends.WINDOW}y_t", "anomalies"],
+            [(label(row), f"{row.first_year}-{row.last_year}", f"{row.first:,.0f}", f"{row.last:,.0f}",
+              trends.percent(row.change), trends.percent(row.cagr, 2), f"{row.slope:+,.0f}",
+              f"{row.rolling:,.0f}", row.anomalies)
+             for row in summary.itertuples(index=False)])
+        sections = [Section("state_trend", "Production trend by state (fastest growing first):",
+                            rows, notes + [header])]
+
+        districts = trends.analyze(crop_df, ["state_name", "district_name"] + by_crop, "production_", "crop_year")
+        summary = districts["summary"]
+        summary = summary[summary["years"] >= 2].dropna(subset=["cagr"]).sort_values("cagr", ascending=False)
+        if len(summary) > self.MAX_TABLE_ROWS:
+            half = self.MAX_TABLE_ROWS // 2
+            summary = pd.concat([summary.head(half), summary.tail(half)])
+        if len(summary):
+            header, rows = table(["district", "state", "years", "change", "cagr"], [
+                (f"{row.district_name} {row.crop}" if by_crop else row.district_name, row.state_name,
+                 f"{row.first_year}-{row.last_year}", trends.percent(row.change), trends.percent(row.cagr, 2))
+                for row in summary.itertuples(index=False)])
+            sections.append(Section("district_trend", "Districts by growth (fastest growing and declining):",
+                                    rows, [header], keep="ends"))
+
+        flagged = [df for df in (states["anomalies"].assign(district_name="(state)"), districts["anomalies"]) if len(df)]
+        if flagged:
+            flagged = pd.concat(flagged)
+            flagged = flagged.reindex(flagged["deviation"].abs().sort_values(ascending=False).index)
+            header, rows = table(["state", "district", "year", "production_t", "vs_trend"], [
+                (row.state_name, row.district_name, row.year, f"{row.value:,.0f}", trends.percent(row.deviation))
+                for row in flagged.head(self.MAX_TABLE_ROWS).itertuples(index=False)])
+            sections.append(Section("trend_anomalies",
+                                    f"Anomalous years (over {trends.ANOMALY_Z:g} sd from the trend line):",
+                                    rows, [header]))
+        return sections
+
+    def _rain_trend_sections(self, rain_df: pd.DataFrame) -> List[Section]:
+        """Annual rainfall trend and anomalous years per state"""
+        if "Year" not in rain_df.columns or rain_df["Year"].nunique() < 2:
+            return []
+        seasons = self._rain_seasons(rain_df)
+        if self._rain_shortfall(rain_df, seasons):
+            return []
+        annual = seasons[(seasons["Season"] == rainfall_seasons.ANNUAL)
+                         & (seasons["coverage"] >= rainfall_seasons.MIN_COVERAGE)]
+        if annual["Year"].nunique() < 2:
+            return []
+        annual = rainfall_seasons.by_state(annual, ["Year"])
+        yearly = trends.yearly_trends(annual.rename(columns={"State": "state", "Year": "year", "mm": "value"})
+                                      [["state", "year", "value"]], ["state"])
+        summary = trends.trend_summary(yearly, ["state"])
+        first, last = self.coverage("rainfall_data")
+        header, rows = table(["state", "years", "first_mm", "last_mm", "change", "trend_mm_per_yr", "anomaly_years"], [
+            (row.state.title(), f"{row.first_year}-{row.last_year}", f"{row.first:,.0f}", f"{row.last:,.0f}",
+             trends.percent(row.change), f"{row.slope:+,.1f}",
+             ", ".join(map(str, yearly.loc[yearly["anomaly"] & (yearly["state"] == row.state), "year"])) or "-")
+            for row in summary.itertuples(index=False)])
+        return [Section("rain_trend", "Annual rainfall trend by state:", rows,
+                        [f"rainfall table covers {first}-{last}", header])]
+
+    def _dataset_sections(self, dataset: str, df: Optional[pd.DataFrame], analysis: dict) -> List[Section]:
+        if df is None or df.empty:
+            return []
+        trend = analysis["query_type"] == "trend"
+        if dataset == "crop_data":
+            sections = self._crop_sections(df, analysis)
+            if trend:
+                with span("trends", dataset=dataset):
+                    sections.extend(self._crop_trend_sections(df))
+            return sections
+        sections = self._rain_sections(df)
+        if trend:
+            with span("trends", dataset=dataset):
+                sections.extend(self._rain_trend_sections(df))
+        return sections
+
     def analyze_data(self, data: dict, analysis: dict) -> str:
-        """Generate a text summary of the fetched data."""
-        summary = []
-
-        # Crop data
-        if data["crop_data"] is not None and not data["crop_data"].empty:
-            crop_df = data["crop_data"]
-            summary.append("Crop Data Summary:")
-            summary.append(f"- Total records: {len(crop_df)}")
-            summary.append(f"- States: {crop_df['state_name'].unique().tolist()}")
-            summary.append(f"- Crops: {crop_df['crop'].unique().tolist()}")
-            summary.append(f"- Districts: {crop_df['district_name'].nunique()}")
-
-            if "production_" in crop_df.columns:
-                state_production = crop_df.groupby("state_name")["production_"].sum()
-                summary.append("\nProduction by State:")
-                for state, prod in state_production.items():
-                    summary.append(f"  - {state}: {prod:,.0f} tonnes")
-
-                district_production = (
-                    crop_df.groupby(["state_name", "district_name"])["production_"]
-                    .sum()
-                    .sort_values(ascending=False)
-                    .head(3)
-                )
-                summary.append("\nTop 3 Districts:")
-                for (state, district), prod in district_production.items():
-                    summary.append(f"  - {district}, {state}: {prod:,.0f} tonnes")
+        """Generate a token-budgeted text summary of the fetched data.
 
-        # Rainfall data
-        if data["rainfall_data"] is not None and not data["rainfall_data"].empty:
-            rain_df = data["rainfall_data"]
-            summary.append("\n\nRainfall Data Summary:")
-            summary.append(f"- Total records: {len(rain_df)}")
-            summary.append(f"- States: {rain_df['State'].unique().tolist()}")
+        Every fact is built as a compact table, the tables are ordered by
+        how much they matter to the question's type (see SUMMARY_PRIORITY)
+        and the least relevant rows and tables are cut to fit
+        `summary_tokens`. The "prompt_budget" span records tokens saved.
+        """
+        sections = []
+        for dataset in ("crop_data", "rainfall_data"):
+            sections.extend(self._dataset_sections(dataset, data[dataset], analysis))
+        return self._compose_summary(sections, data, analysis)
 
-            if "Avg_rainfall" in rain_df.columns:
-                state_rainfall = rain_df.groupby("State")["Avg_rainfall"].mean()
-                summary.append("\nAverage Rainfall by State:")
-                for state, rain in state_rainfall.items():
-                    summary.append(f"  - {state}: {rain:.2f} mm")
+    def _compose_summary(self, sections: List[Section], data: dict, analysis: dict,
+                         late: Sequence[str] = ()) -> str:
+        """Add cross-dataset facts to per-dataset sections, rank and budget them"""
+        sections = list(sections)
+        if analysis["query_type"] == "correlation":
+            with span("correlate") as corr:
+                stats = correlate(data["crop_data"], data["rainfall_data"])
+                corr["mode"] = stats["mode"]
+            lines = format_stats(stats).split("\n")
+            header = lines[:2] if stats.get("mode") not in (None, "none") else []
+            sections.append(Section("correlation", "Crop-rainfall correlation:", lines[len(header):], header))
+        if (data["crop_data"] is not None and data["rainfall_data"] is not None
+                and (analysis["query_type"] == "correlation" or mentions_rain(analysis))):
+            with span("season_join"):
+                sections.extend(self._season_rainfall_section(data["crop_data"], data["rainfall_data"]))
 
-        return "\n".join(summary)
+        priority = self.SUMMARY_PRIORITY.get(analysis["query_type"], self.SUMMARY_PRIORITY["general"])
+        if analysis["query_type"] == "ranking" and "district" in analysis.get("original_query", "").lower():
+            # "Which district ..." is answered by the district table, not the state one
+            priority = ["crop_overview", "district_ranking"] + [k for k in priority if k not in
+                                                                ("crop_overview", "district_ranking")]
+        sections.sort(key=lambda section: priority.index(section.key) if section.key in priority else len(priority))
+        if late:
+            # Leads the summary so the model does not read missing data as zero
+            sections.insert(0, Section("late_data", "Not included:", [
+                f"- {self.DATASET_LABELS[dataset]} did not arrive within the {self.answer_sla:g} s answer deadline"
+                for dataset in late
+            ], min_rows=len(late)))
+        with span("prompt_budget") as budget:
+            summary, stats = fit_sections(sections, self.summary_tokens)
+            budget.update(tokens=stats["tokens"], tokens_full=stats["full_tokens"], tokens_saved=stats["saved"])
+        if stats["saved"]:
+            print(f"✂️ Summary: ~{stats['full_tokens']:,} → ~{stats['tokens']:,} tokens "
+                  f"(budget {stats['budget']:,}; cut {', '.join(stats['truncated'] + stats['omitted'])})")
+        return summary
 
     # ------------------------------------------------------------------
-    def generate_answer(self, query: str, data_summary: str, sources: list) -> str:
-        """Use Groq model to generate a natural language answer."""
+    def _build_messages(self, query: str, data_summary: str, sources: list) -> list:
+        """Chat messages for the Groq completion."""
         prompt = f"""You are an AI assistant analyzing Indian agricultural and climate data from data.gov.in APIs.
 
 User Question: {query}
@@ -136,56 +841,214 @@ Available Data Summary:
 {data_summary}
 
 Data Sources:
-{chr(10).join(['- ' + s for s in sources])}
+{chr(10).join(['- ' + s for s in compact_sources(sources)])}
 
 Provide a clear, factual, and concise answer (max 200 words).
 Always cite the specific data sources and mention key comparisons.
 If data is incomplete, explain what’s missing.
 """
+        return [
+            {"role": "system", "content": "You are a data analyst specializing in Indian agriculture and climate data. Always cite sources and use clear numbers."},
+            {"role": "user", "content": prompt},
+        ]
+
+    def _pace_llm(self):
+        if self.llm_limiter is not None:
+            with span("llm_rate_limit"):
+                self.llm_limiter.acquire()
+
+    def _llm_failed(self, error: Exception):
+        """Slow the shared Groq pace down when Groq itself says we are too fast"""
+        if self.llm_limiter is not None and isinstance(error, RateLimitError):
+            self.llm_limiter.throttle()
+
+    @staticmethod
+    def _prompt_tokens(messages: list) -> int:
+        """Estimated prompt size (see prompt_budget.estimate_tokens)"""
+        return sum(estimate_tokens(message["content"]) for message in messages)
+
+    def generate_answer(self, query: str, data_summary: str, sources: list,
+                        analysis: Optional[dict] = None) -> str:
+        """Use Groq model to generate a natural language answer.
+
+        Answers are cached on the normalized analysis plus the data they were
+        generated from, so a reworded repeat of a question returns instantly.
+        """
+        if analysis is None:
+            analysis = self.query_analyzer.analyze(query)
+        with span("answer_cache") as lookup:
+            cached = self.answer_cache.get_answer(self.MODEL, analysis, data_summary, sources)
+            lookup["cache_hit"] = cached is not None
+        if cached is not None:
+            print("✓ Answer served from cache")
+            return cached
 
         try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a data analyst specializing in Indian agriculture and climate data. Always cite sources and use clear numbers."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=500,
-            )
-            return response.choices[0].message.content
+            messages = self._build_messages(query, data_summary, sources)
+            self._pace_llm()
+            with span("llm", model=self.MODEL, prompt_tokens=self._prompt_tokens(messages)) as llm:
+                response = self.groq_client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500,
+                )
+                answer = response.choices[0].message.content
+                llm["bytes"] = len(answer.encode())
         except Exception as e:
+            self._llm_failed(e)
             return f"❌ Error generating answer: {e}"
+        if self.llm_limiter is not None:
+            self.llm_limiter.relax()
+
+        self.answer_cache.put_answer(self.MODEL, analysis, data_summary, sources, answer)
+        return answer
+
+    def generate_answer_stream(self, query: str, data_summary: str, sources: list,
+                               analysis: Optional[dict] = None) -> Iterator[str]:
+        """Like generate_answer, but yield tokens as the model produces them."""
+        if analysis is None:
+            analysis = self.query_analyzer.analyze(query)
+        with span("answer_cache") as lookup:
+            cached = self.answer_cache.get_answer(self.MODEL, analysis, data_summary, sources)
+            lookup["cache_hit"] = cached is not None
+        if cached is not None:
+            print("✓ Answer served from cache")
+            yield cached
+            return
+
+        parts = []
+        try:
+            messages = self._build_messages(query, data_summary, sources)
+            self._pace_llm()
+            with span("llm", model=self.MODEL, streamed=True,
+                      prompt_tokens=self._prompt_tokens(messages)) as llm:
+                started = time.perf_counter()
+                stream = self.groq_client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500,
+                    stream=True,
+                )
+                for chunk in stream:
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        if not parts:
+                            llm["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                        parts.append(token)
+                        yield token
+                llm["tokens"] = len(parts)
+        except Exception as e:
+            self._llm_failed(e)
+            yield f"❌ Error generating answer: {e}"
+            return
+        if self.llm_limiter is not None:
+            self.llm_limiter.relax()
+
+        self.answer_cache.put_answer(self.MODEL, analysis, data_summary, sources, "".join(parts))
 
     # ------------------------------------------------------------------
-    def answer_question(self, query: str) -> dict:
-        """End-to-end pipeline: analyze → fetch → summarize → answer."""
+    def answer_question(self, query: str, stream: bool = False) -> dict:
+        """End-to-end pipeline: analyze → fetch → summarize → answer.
+
+        Datasets are fetched concurrently and summarized as each one lands.
+        Generation starts once the datasets the question requires are in;
+        optional ones still loading `answer_sla` seconds after the question
+        was asked are left out. They are listed under `late`, and
+        `late_data` maps each to its still-running future (see late_summary).
+
+        With `stream=True` the result carries an `answer_stream` token
+        generator instead of a finished `answer`, so the caller can show the
+        answer as it is generated.
+        """
         print(f"\n{'='*60}")
         print(f"Question: {query}")
         print(f"{'='*60}\n")
 
-        print("🔍 Analyzing question...")
-        analysis = self.query_analyzer.analyze(query)
-        print(f"Query type: {analysis['query_type']}")
-        print(f"Detected states: {analysis['states']}")
-        print(f"Detected crops: {analysis['crops']}")
-        print(f"Detected years: {analysis['years']}\n")
+        trace = Trace(query)
+        token = current_trace.set(trace)
+        deadline = time.perf_counter() + self.answer_sla if self.answer_sla else None
+        try:
+            print("🔍 Analyzing question...")
+            with trace.span("analyze"):
+                analysis = self.query_analyzer.analyze(query)
+            print(f"Query type: {analysis['query_type']}")
+            print(f"Detected states: {analysis['states']}")
+            print(f"Detected crops: {analysis['crops']}")
+            print(f"Detected years: {analysis['years']}\n")
 
-        data = self.fetch_relevant_data(analysis)
+            print("\n📈 Fetching and summarizing data...")
+            with trace.span("fetch") as fetch:
+                plan = self._plan_for(analysis)
+                futures = self.start_fetches(analysis, plan)
+                data, sections, late = self._gather(futures, analysis, deadline)
+                fetch["late"] = late
+            with trace.span("summarize"):
+                data_summary = self._compose_summary(sections, data, analysis, late)
+            print(data_summary)
 
-        print("\n📈 Analyzing data...")
-        data_summary = self.analyze_data(data, analysis)
-        print(data_summary)
+            result = {
+                "question": query,
+                "sources": data["sources"],
+                "partial": data["partial"],
+                "analysis": analysis,
+                "late": late,
+                "late_data": {dataset: futures[dataset] for dataset in late},
+                # What the answer was built from: frame cache keys, not the frames
+                "jobs": [[request.dataset, request.kwargs] for request in plan.requests],
+                "trace_id": trace.trace_id,
+                # Live list: a streamed answer adds its spans when it finishes
+                "trace": trace.spans,
+            }
 
-        print("\n🤖 Generating answer...\n")
-        answer = self.generate_answer(query, data_summary, data["sources"])
+            print("\n🤖 Generating answer...\n")
+            if stream:
+                tokens = self.generate_answer_stream(query, data_summary, data["sources"], analysis)
+                result["answer_stream"] = self._traced_stream(trace, tokens)
+            else:
+                with trace.span("generate"):
+                    result["answer"] = self.generate_answer(query, data_summary, data["sources"], analysis)
+                self._finish_trace(trace)
+        finally:
+            current_trace.reset(token)
 
-        return {
-            "question": query,
-            "answer": answer,
-            "sources": data["sources"],
-            "analysis": analysis,
-        }
+        return result
+
+    def late_summary(self, dataset: str, future: Future, analysis: dict,
+                     timeout: Optional[float] = None) -> Optional[Tuple[str, List[str]]]:
+        """(summary, sources) of a dataset that missed the answer deadline.
+
+        Waits up to `timeout` seconds for it; None if it is still not in or
+        came back empty. Its frames are in the shared cache either way.
+        """
+        try:
+            piece = future.result(timeout)
+        except Exception:
+            return None
+        sections = self._dataset_sections(dataset, piece["frame"], analysis)
+        if not sections:
+            return None
+        summary, _ = fit_sections(sections, self.summary_tokens)
+        return summary, piece["sources"]
+
+    def _traced_stream(self, trace: Trace, tokens: Iterator[str]) -> Iterator[str]:
+        """Re-enter the question's trace around every token pulled from the model."""
+        with trace.span("generate", streamed=True):
+            while True:
+                ctx = current_trace.set(trace)
+                try:
+                    token = next(tokens)
+                except StopIteration:
+                    break
+                finally:
+                    current_trace.reset(ctx)
+                yield token
+        self._finish_trace(trace)
+
+    def _finish_trace(self, trace: Trace):
+        if self.trace_log:
+            trace.export(self.trace_log)
 
 
 # ----------------------------------------------------------------------
@@ -0,0 +1,43 @@
+import hashlib
+import os
+from typing import Optional
+
+from response_cache import ResponseCache
+
+
+class AnswerCache(ResponseCache):
+    """Persistent cache of generated answers.
+
+    Answers are keyed on what the model is actually given, not on the
+    question's wording: the normalized query analysis (type, ranking order,
+    entities, years) plus a hash of the data summary and the sources. So
+    "Compare rice in Punjab and Tamil Nadu 2013" and "rice production Punjab
+    vs Tamil Nadu, 2013" share an entry as long as the data is unchanged.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "answer_cache.sqlite")
+    ENTITY_KEYS = ("states", "crops", "districts", "seasons", "years")
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(path=path, default_ttl=ttl, max_bytes=max_bytes)
+
+    @classmethod
+    def fingerprint(cls, analysis: dict, data_summary: str, sources: list) -> dict:
+        key = {
+            "query_type": analysis.get("query_type"),
+            "ranking_order": analysis.get("ranking_order"),
+            "summary": hashlib.sha1(data_summary.encode()).hexdigest(),
+            "sources": hashlib.sha1("\n".join(sorted(sources)).encode()).hexdigest(),
+        }
+        for name in cls.ENTITY_KEYS:
+            key[name] = ",".join(sorted(str(v).lower() for v in analysis.get(name) or []))
+        return key
+
+    def get_answer(self, model: str, analysis: dict, data_summary: str, sources: list) -> Optional[str]:
+        return self.get(model, self.fingerprint(analysis, data_summary, sources))
+
+    def put_answer(self, model: str, analysis: dict, data_summary: str, sources: list, answer: str):
+        self.put(model, self.fingerprint(analysis, data_summary, sources), answer)
@@ -1,5 +1,10 @@
 import streamlit as st
+import pandas as pd
+import os
 from ai_system import IntelligentQASystem
+from cache_warmer import CacheWarmer
+from history_store import HistoryStore, SessionHistory
+from tracing import breakdown
 import time
 
 # Page config
@@ -33,11 +38,36 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+EXAMPLE_QUESTIONS = [
+    "Compare rice production in Punjab and Tamil Nadu for 2014",
+    "What is the wheat production trend in Haryana from 2010 to 2014?",
+    "Show rainfall patterns in Kerala for 2020",
+    "Which districts in Maharashtra have highest sugarcane production in 2013?"
+]
+
+# Shared across all sessions: API clients, connection pools and data caches
+@st.cache_resource
+def get_qa_system():
+    system = IntelligentQASystem()
+    # Prefetch example, popular and per-state slices without blocking the UI
+    system.cache_warmer = CacheWarmer(
+        system, EXAMPLE_QUESTIONS,
+        request_budget=int(os.getenv("SAMARTH_WARM_BUDGET", "150")),
+    ).start()
+    return system
+
+# Older answers of every session are archived here instead of in memory
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+qa_system = get_qa_system()
+PAGE_SIZE = 5
+
 # Initialize session state
-if 'qa_system' not in st.session_state:
-    st.session_state.qa_system = IntelligentQASystem()
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = SessionHistory(get_history_store())
+history = st.session_state.history
 
 # Header
 st.markdown('<h1 class="main-header">🌾 Project Samarth</h1>', unsafe_allow_html=True)
@@ -54,17 +84,20 @@ with st.sidebar:
     """)
     
     st.header("💡 Example Questions")
-    examples = [
-        "Compare rice production in Punjab and Tamil Nadu for 2014",
-        "What is the wheat production trend in Haryana from 2010 to 2014?",
-        "Show rainfall patterns in Kerala for 2020",
-        "Which districts in Maharashtra have highest sugarcane production in 2013?"
-    ]
-    
-    for example in examples:
+    for example in EXAMPLE_QUESTIONS:
         if st.button(example, key=example):
             st.session_state.current_question = example
     
+    st.header("⏱️ Diagnostics")
+    show_timing = st.checkbox("Show timing breakdown", value=False)
+    if show_timing:
+        warm = qa_system.cache_warmer.progress()
+        st.caption(f"Cache warmer: {warm['warmed']} slices warmed, {warm['pending']} pending, "
+                   f"{warm['requests_spent']}/{warm['request_budget']} requests used")
+        flights = qa_system.single_flight.stats()
+        st.caption(f"Shared fetches: {flights['leaders']} downloads, {flights['saved']} duplicate "
+                   f"requests joined them ({flights['subset_served']} as subsets)")
+    
     st.header("📚 Data Sources")
     st.write("""
     - **Crop Production**: District-wise, season-wise data (1997-2014)
@@ -92,23 +125,26 @@ with col1:
         clear_button = st.button("🗑️ Clear History")
     
     if clear_button:
-        st.session_state.history = []
+        history.clear()
+        st.session_state.pop('history_page', None)
         st.rerun()
     
     # Process question
     if ask_button and question:
         with st.spinner("🤔 Analyzing question and fetching data..."):
             try:
-                result = st.session_state.qa_system.answer_question(question)
-                st.session_state.history.insert(0, result)
+                # The answer itself is streamed into the results panel below
+                result = qa_system.answer_question(question, stream=True)
+                # Shown once with its live stream below, then kept compacted
+                st.session_state.live_result = result
                 
             except Exception as e:
                 st.error(f"Error: {e}")
 
 with col2:
     st.header("📈 Query Analysis")
-    if st.session_state.history:
-        latest = st.session_state.history[0]
+    latest = st.session_state.get('live_result') or history.latest()
+    if latest:
         st.info(f"**Type:** {latest['analysis']['query_type'].title()}")
         if latest['analysis']['states']:
             st.success(f"**States:** {', '.join(latest['analysis']['states'])}")
@@ -116,23 +152,67 @@ with col2:
             st.success(f"**Crops:** {', '.join(latest['analysis']['crops'])}")
         if latest['analysis']['years']:
             st.success(f"**Years:** {', '.join(map(str, latest['analysis']['years']))}")
+        if latest['analysis'].get('last_n'):
+            st.success(f"**Years:** last {latest['analysis']['last_n']} with data")
+
+def show_result(result: dict):
+    """Render one answer: a live result (streamed, late data pending) or a compact history record"""
+    # Answer
+    st.markdown("### 💡 Answer")
+    if 'answer_stream' in result:
+        result['answer'] = st.write_stream(result.pop('answer_stream'))
+    else:
+        st.write(result['answer'])
+    
+    # Data that missed the answer deadline is shown once it arrives
+    for dataset, future in result.pop('late_data', {}).items():
+        with st.spinner(f"Waiting for late {qa_system.DATASET_LABELS[dataset].lower()}..."):
+            late = qa_system.late_summary(dataset, future, result['analysis'], timeout=30)
+        if late:
+            result.setdefault('late_appendix', []).append((dataset, *late))
+    for dataset, summary, sources in result.get('late_appendix', []):
+        st.markdown(f"### ⏳ {qa_system.DATASET_LABELS[dataset]} (arrived after the answer)")
+        st.text(summary)
+        result['sources'] = result['sources'] + [s for s in sources if s not in result['sources']]
+
+    # Sources
+    st.markdown("### 📚 Data Sources")
+    if result.get('partial'):
+        st.warning("Some data could not be fetched in full or in time (failed pages, row limits or "
+                   "the answer deadline, see the sources); this answer is based on incomplete data.")
+    for source in result['sources']:
+        st.markdown(f"- ✅ {source}")
+    
+    timing = result.get('timing') or breakdown(result.get('trace') or [])
+    if show_timing and timing:
+        st.markdown("### ⏱️ Timing Breakdown")
+        st.dataframe(pd.DataFrame(timing), hide_index=True)
+    
+    st.markdown("---")
 
 # Display results
-if st.session_state.history:
+live = st.session_state.pop('live_result', None)
+if live or len(history):
     st.header("📝 Results")
     
-    for idx, result in enumerate(st.session_state.history):
-        with st.expander(f"Q: {result['question']}", expanded=(idx == 0)):
-            # Answer
-            st.markdown("### 💡 Answer")
-            st.write(result['answer'])
-            
-            # Sources
-            st.markdown("### 📚 Data Sources")
-            for source in result['sources']:
-                st.markdown(f"- ✅ {source}")
-            
-            st.markdown("---")
+    # The newest answer streams in once, then joins the history as a compact record
+    newest = live or history.latest()
+    with st.expander(f"Q: {newest['question']}", expanded=True):
+        show_result(newest)
+    if live:
+        history.add(live)
+    
+    # Only one page of earlier answers is rendered (and read from disk) per rerun
+    earlier = len(history) - 1
+    if earlier:
+        pages = -(-earlier // PAGE_SIZE)
+        page = 1
+        if pages > 1:
+            st.caption(f"{earlier} earlier answers")
+            page = st.number_input("Page", min_value=1, max_value=pages, key="history_page")
+        for record in history.page(page - 1, PAGE_SIZE, skip=1):
+            with st.expander(f"Q: {record['question']}"):
+                show_result(record)
 else:
     st.info("👆 Ask a question to get started!")
 
@@ -0,0 +1,342 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+
+import httpx
+import pandas as pd
+
+from data_handler import DataGovAPI, RateLimiter, crop_filters, mark_truncated, rainfall_filters
+from request_control import RETRYABLE_STATUS, CircuitBreaker, backoff_delay, parse_retry_after, yield_to
+from response_cache import ResponseCache
+from schemas import CROP_SCHEMA, RAINFALL_SCHEMA, apply_schema, assemble_chunks, records_to_frame
+from rainfall_store import RainfallStore
+from snapshot_store import CropSnapshotStore
+from tracing import span
+
+
+class AsyncRateLimiter(RateLimiter):
+    """data_handler.RateLimiter for coroutines: the same adaptive bucket,
+    but the wait between tries is slept with asyncio, off the lock."""
+
+    async def acquire(self):
+        while True:
+            wait = self.take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AsyncRunner:
+    """Event loop on a daemon thread that outlives individual calls.
+
+    Lets synchronous callers (Streamlit script threads) share one loop, and
+    therefore one httpx connection pool, instead of creating a fresh loop and
+    client per question with asyncio.run().
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+class AsyncDataGovAPI:
+    """asyncio counterpart of DataGovAPI over a shared httpx connection pool.
+
+    Blocking work (snapshot and local-copy reads, the sqlite response cache,
+    building frames from records) runs in worker threads, so one caller's
+    disk read never stalls the other fetches on the loop.
+
+    Use as an async context manager so the pool is closed with the loop:
+
+        async with AsyncDataGovAPI() as api:
+            crop, rain = await asyncio.gather(
+                api.fetch_crop_data(state="Punjab", crop="Rice"),
+                api.fetch_rainfall_data(state="Punjab", year=2020),
+            )
+    """
+
+    CROP_API_URL = DataGovAPI.CROP_API_URL
+    RAINFALL_API_URL = DataGovAPI.RAINFALL_API_URL
+    API_KEY = DataGovAPI.API_KEY
+    BATCH_SIZE = DataGovAPI.BATCH_SIZE
+    CACHE_TTLS = DataGovAPI.CACHE_TTLS
+
+    def __init__(self,
+                 use_snapshot: bool = True,
+                 max_connections: int = 8,
+                 requests_per_second: float = 3.0,
+                 burst: int = 4,
+                 timeout: float = 30.0,
+                 use_cache: bool = True,
+                 cache: Optional[ResponseCache] = None,
+                 max_retries: int = 4,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_requests_per_second: Optional[float] = None):
+        self.max_connections = max(1, max_connections)
+        self.requests_per_second = requests_per_second
+        self.max_requests_per_second = max_requests_per_second
+        self.burst = burst
+        self.timeout = timeout
+        self.crop_snapshot = CropSnapshotStore() if use_snapshot else None
+        self.rainfall_store = RainfallStore() if use_snapshot else None
+        self.cache = (cache or ResponseCache(ttls=self.CACHE_TTLS)) if use_cache else None
+        self.max_retries = max(0, max_retries)
+        self.breaker = breaker or CircuitBreaker()
+        self.client = None
+        self.semaphore = None
+        self.rate_limiter = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+        self.semaphore = asyncio.Semaphore(self.max_connections)
+        self.rate_limiter = AsyncRateLimiter(self.requests_per_second, self.burst,
+                                             max_rate=self.max_requests_per_second)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+
+    # ------------------------------------------------------------------
+    async def fetch_crop_data(self,
+                              state: Optional[str] = None,
+                              district: Optional[str] = None,
+                              crop: Optional[str] = None,
+                              year: Optional[int] = None,
+                              season: Optional[str] = None,
+                              limit: int = 5000) -> Optional[pd.DataFrame]:
+        """Fetch crop production data; attrs as in DataGovAPI.fetch_crop_data"""
+        if self.crop_snapshot is not None and await asyncio.to_thread(self.crop_snapshot.exists):
+            with span("snapshot_query", resource="crop") as query:
+                df = await asyncio.to_thread(self.crop_snapshot.query, state=state, district=district,
+                                             crop=crop, year=year, season=season, limit=limit)
+                query["records"] = 0 if df is None else len(df)
+            if df is not None:
+                df = await asyncio.to_thread(apply_schema, df, CROP_SCHEMA)
+                df.attrs["partial"] = False
+                mark_truncated(df, None, limit)
+                print(f"✓ Crop data (snapshot): {len(df)} records")
+            return df
+
+        filters = crop_filters(state, district, crop, year, season)
+        chunks, error, total = await self._fetch_chunks(self.CROP_API_URL, filters, limit, CROP_SCHEMA)
+        return await self._to_frame("Crop", chunks, error, total, limit)
+
+    async def fetch_rainfall_data(self,
+                                  state: Optional[str] = None,
+                                  year: Optional[int] = None,
+                                  limit: int = 5000) -> Optional[pd.DataFrame]:
+        """Fetch rainfall data; attrs as in DataGovAPI.fetch_crop_data.
+
+        The local copy serves only slices it fully holds, with the same API
+        fallback as DataGovAPI.iter_rainfall_data.
+        """
+        store = self.rainfall_store
+        if store is not None and await asyncio.to_thread(store.serves, state, year):
+            df = await self._local_rainfall(state, year, limit, partial=False)
+            if df is not None:
+                return df
+
+        filters = rainfall_filters(state, year)
+        chunks, error, total = await self._fetch_chunks(self.RAINFALL_API_URL, filters, limit, RAINFALL_SCHEMA)
+        if not chunks and error is not None and store is not None and await asyncio.to_thread(store.has_state, state):
+            df = await self._local_rainfall(state, year, limit, partial=True)
+            if df is not None:
+                print("⚠️ Rainfall API unavailable; falling back to the incomplete local copy")
+                return df
+        return await self._to_frame("Rainfall", chunks, error, total, limit)
+
+    async def _local_rainfall(self, state: Optional[str], year: Optional[int], limit: int,
+                              partial: bool) -> Optional[pd.DataFrame]:
+        with span("rainfall_store_query", resource="rainfall") as query:
+            df = await asyncio.to_thread(self.rainfall_store.query, state=state, year=year, limit=limit)
+            query["records"] = 0 if df is None else len(df)
+        if df is not None:
+            df = await asyncio.to_thread(apply_schema, df, RAINFALL_SCHEMA)
+            df.attrs["partial"] = partial
+            mark_truncated(df, None, limit)
+            print(f"✓ Rainfall data (local copy): {len(df)} records")
+        return df
+
+    @staticmethod
+    async def _to_frame(label: str, chunks: List[pd.DataFrame], error: Optional[Exception],
+                        total: int, limit: int):
+        if error is not None:
+            print(f"⚠️ {label} data incomplete: {error!r}")
+        if not chunks:
+            return None
+        df = await asyncio.to_thread(assemble_chunks, chunks)
+        df.attrs["partial"] = error is not None
+        mark_truncated(df, total, limit)
+        print(f"✓ {label} data: {len(df)} records")
+        return df
+
+    # ------------------------------------------------------------------
+    async def _fetch_page(self, url: str, filters: dict, offset: int, limit: int) -> dict:
+        params = {
+            'api-key': self.API_KEY,
+            'format': 'json',
+            'limit': limit,
+            'offset': offset,
+            **filters
+        }
+        with span("page", resource=DataGovAPI.RESOURCE_NAMES.get(url, url), offset=offset, limit=limit) as page:
+            if self.cache is not None:
+                cached = await asyncio.to_thread(self.cache.get, url, params)
+                if cached is not None:
+                    page.update(cache_hit=True, records=len(cached.get('records', [])))
+                    return cached
+
+            data = await self._request(url, params, page)
+            page.update(cache_hit=False, records=len(data.get('records', [])))
+
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, url, params, data)
+            return data
+
+    async def _request(self, url: str, params: dict, page: dict) -> dict:
+        """GET with the same retry, pacing and circuit-breaker policy as DataGovAPI._request"""
+        attempt = 0
+        page["retries"] = 0
+        gate = yield_to.get()
+        while True:
+            # Polled rather than waited on in a thread, so background pages
+            # never tie up the executor the user's fetch needs
+            while gate is not None and gate.busy():
+                await asyncio.sleep(0.05)
+            self.breaker.before_request()
+            retry_after = None
+            async with self.semaphore:
+                waited = time.perf_counter()
+                await self.rate_limiter.acquire()
+                page["wait_ms"] = round(page.get("wait_ms", 0) + (time.perf_counter() - waited) * 1000, 2)
+                if gate is not None and gate.busy():
+                    continue  # a user fetch started while this one queued
+                try:
+                    response = await self.client.get(url, params=params)
+                except httpx.TransportError as e:
+                    response = None
+                    self.breaker.record_failure()
+                    error = e
+
+            if response is not None:
+                page.update(status=response.status_code, bytes=len(response.content))
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    self.rate_limiter.relax()
+                    return response.json()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.rate_limiter.throttle(retry_after)
+                else:
+                    self.breaker.record_failure()
+                error = httpx.HTTPStatusError(f"{response.status_code} from {url}",
+                                              request=response.request, response=response)
+
+            if attempt >= self.max_retries:
+                raise error
+            await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+            attempt += 1
+            page["retries"] = attempt
+
+    async def _build_chunk(self, url: str, records: List[dict], schema: dict) -> pd.DataFrame:
+        with span("build_frame", resource=DataGovAPI.RESOURCE_NAMES.get(url, url), records=len(records)):
+            return await asyncio.to_thread(records_to_frame, records, schema)
+
+    async def _fetch_chunks(self, url: str, filters: dict, limit: int, schema: dict):
+        """Fetch up to `limit` rows as typed chunks, one per page, in offset order.
+
+        Same paging contract as DataGovAPI._iter_pages: the first page gives
+        the `total`, the rest are fetched concurrently through a window of
+        at most `max_connections` pages, and the result stops at the first
+        failed or short page, cancelling the pages after it. Each page becomes a chunk as soon
+        as it lands, so its record dicts are dropped at once rather than
+        held until every page is in.
+
+        Returns (chunks, error, total); `error` is the page failure that
+        truncated the result, or None if it is complete, and `total` the
+        resource's reported row count (0 if unknown).
+        """
+        batch_size = self.BATCH_SIZE
+        try:
+            first = await self._fetch_page(url, filters, 0, min(batch_size, limit))
+        except Exception as e:
+            print(f"Error: {e}")
+            return [], e, 0
+
+        try:
+            total = int(first.get('total', 0))
+        except (TypeError, ValueError):
+            total = 0
+        records = first.get('records', [])[:limit]
+        if not records:
+            return [], None, total
+        chunks = [await self._build_chunk(url, records, schema)]
+        if len(records) < batch_size or len(records) >= limit:
+            return chunks, None, total
+        del first, records
+
+        end = min(total, limit) if total > 0 else limit
+
+        async def page(offset: int, size: int):
+            records = (await self._fetch_page(url, filters, offset, size)).get('records', [])[:size]
+            return len(records), (await self._build_chunk(url, records, schema) if records else None)
+
+        offsets = iter(range(batch_size, end, batch_size))
+        pending = deque()
+
+        def submit(offset: int):
+            size = min(batch_size, end - offset)
+            pending.append((size, asyncio.ensure_future(page(offset, size))))
+
+        # At most max_connections pages in flight or buffered, as in _iter_pages
+        try:
+            for offset in islice(offsets, self.max_connections):
+                submit(offset)
+            while pending:
+                size, task = pending.popleft()
+                try:
+                    count, chunk = await task
+                except Exception as e:
+                    print(f"Error: {e}")
+                    return chunks, e, total
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+                if count < size:
+                    break
+                offset = next(offsets, None)
+                if offset is not None:
+                    submit(offset)
+        finally:
+            # Pages past a failed or short one are not needed
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+        return chunks, None, total
+
+if __name__ == "__main__":
+    async def main():
+        async with AsyncDataGovAPI() as api:
+            start = time.time()
+            results = await asyncio.gather(
+                api.fetch_crop_data(state="Punjab", crop="Rice", year=2013, limit=50),
+                api.fetch_crop_data(state="Tamil Nadu", crop="Rice", year=2013, limit=50),
+                api.fetch_rainfall_data(state="Punjab", year=2020, limit=50),
+            )
+            print(f"Fetched {sum(df is not None for df in results)} datasets in {time.time() - start:.2f}s")
+
+    asyncio.run(main())
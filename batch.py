@@ -0,0 +1,210 @@
+"""Answer a file of questions offline.
+
+    python batch.py questions.txt -o answers.jsonl
+    python batch.py questions.txt --workers 8 --data-rps 3 --groq-rps 0.5
+    python batch.py questions.txt --answer-sla 8    # interactive deadline
+
+Questions are read one per line (blank lines and # comments are skipped),
+or as JSON lines with a "question" field. Every question is analyzed and
+planned first; each distinct fetch job across the whole batch is then
+downloaded once into the shared caches, and the questions are answered on
+a thread pool sharing one IntelligentQASystem, so data.gov.in and Groq are
+each paced by a single process-wide rate limiter. Repeated questions are
+answered once. Every dataset a question plans is waited for unless
+--answer-sla is given. Answers are written as JSON lines in input order,
+and a throughput report is printed at the end.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from frame_cache import FrameCache
+
+
+def read_questions(path: str) -> List[str]:
+    questions = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            questions.append(json.loads(line)["question"] if line.startswith("{") else line)
+    return questions
+
+
+def normalize(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class BatchRunner:
+    """Runs many questions through one shared IntelligentQASystem"""
+
+    def __init__(self, system, workers: int = 4, prefetch_chunk: int = 32):
+        self.system = system
+        self.workers = max(1, workers)
+        self.prefetch_chunk = max(1, prefetch_chunk)
+        self.stats: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------
+    def prefetch(self, questions: List[str]) -> Dict[str, int]:
+        """Fetch every distinct job the batch will need, once.
+
+        Plans are built before anything is fetched, so identical slices
+        asked by different questions collapse to one job here and the
+        answering stage finds them in the frame cache.
+        """
+        analyzer, system = self.system.query_analyzer, self.system
+        planned, unique = 0, {}
+        for question in questions:
+            for job in system.plan_fetches(analyzer.analyze(question), verbose=False):
+                planned += 1
+                unique.setdefault(FrameCache.make_key(job[0], job[1]), job)
+
+        todo = [job for job in unique.values() if system.needs_fetch(job[0], job[1])]
+        for start in range(0, len(todo), self.prefetch_chunk):
+            system.run_jobs(todo[start:start + self.prefetch_chunk])
+        return {"jobs_planned": planned, "jobs_unique": len(unique), "jobs_fetched": len(todo)}
+
+    def answer(self, index: int, question: str) -> dict:
+        started = time.perf_counter()
+        record = {"index": index, "question": question}
+        try:
+            result = self.system.answer_question(question)
+        except Exception as e:
+            record["error"] = repr(e)
+        else:
+            record.update({
+                "answer": result["answer"],
+                "query_type": result["analysis"]["query_type"],
+                "sources": result["sources"],
+                "partial": result["partial"],
+                "trace_id": result["trace_id"],
+                "llm_calls": sum(s["name"] == "llm" for s in result["trace"]),
+            })
+            if result["answer"].startswith("❌"):
+                record["error"] = result["answer"]
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return record
+
+    # ------------------------------------------------------------------
+    def run(self, questions: List[str], out, progress=sys.stderr) -> dict:
+        """Answer `questions`, writing one JSON line each to `out` in input order"""
+        started = time.perf_counter()
+        pages_before = self.system.response_cache.stats()["misses"]
+        flights_before = self.system.single_flight.stats()
+
+        # Identical questions are answered once and copied
+        first: Dict[str, int] = {}
+        distinct = []
+        for i, question in enumerate(questions):
+            if first.setdefault(normalize(question), i) == i:
+                distinct.append(i)
+
+        prefetch_started = time.perf_counter()
+        report = self.prefetch([questions[i] for i in distinct])
+        report["prefetch_s"] = round(time.perf_counter() - prefetch_started, 2)
+
+        cache_before = self.system.frame_cache.stats()
+        records: Dict[int, dict] = {}
+        written = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.answer, i, questions[i]) for i in distinct]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                records[record["index"]] = record
+                # Write the longest finished prefix, so output keeps input order
+                while written < len(questions):
+                    source = first[normalize(questions[written])]
+                    if source not in records:
+                        break
+                    record = dict(records[source], index=written, question=questions[written])
+                    if source != written:
+                        record.update(duplicate_of=source, latency_ms=0.0, llm_calls=0)
+                    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    written += 1
+                out.flush()
+                elapsed = time.perf_counter() - started
+                print(f"[{done}/{len(distinct)}] {done / elapsed:.2f} questions/s", file=progress)
+
+        elapsed = time.perf_counter() - started
+        latencies = sorted(r["latency_ms"] for r in records.values())
+        report.update({
+            "questions": len(questions),
+            "distinct_questions": len(distinct),
+            "elapsed_s": round(elapsed, 2),
+            "questions_per_s": round(len(questions) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+            "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+            "errors": sum("error" in r for r in records.values()),
+            "llm_calls": sum(r.get("llm_calls", 0) for r in records.values()),
+            "api_pages": self.system.response_cache.stats()["misses"] - pages_before,
+        })
+        flights = self.system.single_flight.stats()
+        report["fetches_coalesced"] = flights["saved"] - flights_before["saved"]
+        # Over the answering stage only: prefetch lookups are misses by design
+        cache_after = self.system.frame_cache.stats()
+        hits = cache_after["hits"] - cache_before["hits"]
+        lookups = hits + cache_after["misses"] - cache_before["misses"]
+        report["frame_cache_hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        self.stats = report
+        return report
+
+
+def print_report(report: dict, file=sys.stderr):
+    print("\nBatch report", file=file)
+    print("-" * 40, file=file)
+    for key, value in report.items():
+        print(f"{key:<24} {value}", file=file)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="text file (one question per line) or JSONL")
+    parser.add_argument("-o", "--output", help="answers JSONL (default: <questions>.answers.jsonl)")
+    parser.add_argument("--workers", type=int, default=4, help="questions answered concurrently")
+    parser.add_argument("--data-rps", type=float, default=3.0,
+                        help="data.gov.in requests per second (a ceiling; 429s slow it further)")
+    parser.add_argument("--groq-rps", type=float, default=0.5,
+                        help="Groq completions per second (free tier: 30/min)")
+    parser.add_argument("--summary-tokens", type=int, default=None, help="data summary token budget")
+    parser.add_argument("--answer-sla", type=float, default=0,
+                        help="seconds before optional data is left out (default 0: wait for all of it)")
+    parser.add_argument("--report", help="also write the throughput report to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="keep per-question pipeline output")
+    args = parser.parse_args(argv)
+
+    questions = read_questions(args.questions)
+    output = args.output or os.path.splitext(args.questions)[0] + ".answers.jsonl"
+
+    from ai_system import IntelligentQASystem
+
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        # Offline answers are not raced against the interactive deadline
+        system = IntelligentQASystem(summary_tokens=args.summary_tokens,
+                                     answer_sla=args.answer_sla,
+                                     requests_per_second=args.data_rps,
+                                     max_requests_per_second=args.data_rps,
+                                     llm_requests_per_second=args.groq_rps)
+        runner = BatchRunner(system, workers=args.workers)
+        with open(output, "w") as out:
+            report = runner.run(questions, out)
+
+    print_report(report)
+    print(f"✓ {report['questions']} answers written to {output}", file=sys.stderr)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Per-query cost of QueryAnalyzer.analyze as the vocabulary grows.
+
+Compares the compiled single-pass matcher against the old approach of one
+substring check per vocabulary entry. Run from the repo root:
+
+    python -m benchmarks.bench_query_analyzer
+"""
+import random
+import string
+import time
+
+from query_analyzer import QueryAnalyzer
+
+QUERIES = [
+    "Compare rice production in Punjab and Tamil Nadu for 2013",
+    "What is the wheat production trend in Haryana from 2010 to 2014?",
+    "Show rainfall patterns in Kerala for 2020",
+    "Which districts in Maharashtra have highest sugarcane production in 2013?",
+    "How does rainfall affect cotton yield in Gujarat over the last 5 years",
+]
+
+
+def synthetic_names(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_uppercase, k=rng.randint(5, 12))) for _ in range(n)]
+
+
+def naive_analyze(query: str, vocabulary: list) -> list:
+    """The previous strategy: one lowercase substring test per entry"""
+    query_lower = query.lower()
+    return [name for name in vocabulary if name.lower() in query_lower]
+
+
+def time_per_query(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+def main(sizes=(50, 700, 5000, 20000), repeat: int = 200):
+    print(f"{'vocabulary':>10} | {'compiled µs/query':>18} | {'naive µs/query':>15}")
+    print("-" * 50)
+    for size in sizes:
+        districts = synthetic_names(size)
+        analyzer = QueryAnalyzer(vocabulary={'districts': districts})
+        vocabulary = QueryAnalyzer.INDIAN_STATES + QueryAnalyzer.COMMON_CROPS + districts
+
+        compiled = time_per_query(analyzer.analyze, repeat)
+        naive = time_per_query(lambda q: naive_analyze(q, vocabulary), repeat)
+        print(f"{size:>10} | {compiled:>18.1f} | {naive:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
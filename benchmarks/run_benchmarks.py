@@ -0,0 +1,263 @@
+"""Offline benchmark suite.
+
+Runs a fixed question corpus against a local stub of data.gov.in and the
+Groq endpoint (benchmarks/stub_server.py), so results are repeatable and
+need no network or API quota:
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --latency 0.08 --llm-latency 0.3 --repeat 3
+
+Each scenario reports throughput, p50/p95/p99 latency and peak traced
+memory. Results are written to benchmarks/results/<timestamp>-<sha>.json
+and compared with the previous results file.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.stub_server import StubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Fixed corpus: every question names states/crops present in the fixtures
+QUESTIONS = [
+    "Compare rice production in Punjab and Tamil Nadu for 2013",
+    "What is the wheat production trend in Haryana over the last 5 years?",
+    "Which district in Maharashtra has the highest sugarcane production in 2012?",
+    "Compare rainfall in Kerala and Tamil Nadu",
+    "How does rainfall affect cotton production in Maharashtra?",
+    "Which state has the lowest maize production in 2010?",
+    "Show groundnut production in Uttar Pradesh for 2011",
+    "Compare rainfall in Punjab and Haryana for 2019",
+]
+
+
+# ----------------------------------------------------------------------
+def summarize(latencies: List[float], elapsed: float, peak_bytes: int) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "runs": len(ordered),
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "peak_mb": round(peak_bytes / 1024 / 1024, 2),
+    }
+
+
+def measure(calls: List[Callable[[], object]]) -> Dict[str, float]:
+    """Time each call; peak memory is traced across the whole scenario"""
+    latencies = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            call()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(latencies, elapsed, peak)
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    """Run with an empty working directory so cache/ starts cold"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="samarth-bench-") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(previous)
+
+
+# ----------------------------------------------------------------------
+def bench_analyzer(repeat: int) -> Dict[str, float]:
+    from query_analyzer import QueryAnalyzer
+
+    analyzer = QueryAnalyzer(vocabulary={})
+    return measure([lambda q=q: analyzer.analyze(q) for q in QUESTIONS * 50 * repeat])
+
+
+def bench_fetch(repeat: int) -> Dict[str, float]:
+    from data_handler import DataGovAPI
+
+    api = DataGovAPI(use_snapshot=False, use_cache=False)
+    calls = []
+    for _ in range(repeat):
+        for state in ("Punjab", "Tamil Nadu", "Maharashtra"):
+            calls.append(lambda s=state: api.fetch_crop_data(state=s, limit=2000))
+            calls.append(lambda s=state: api.fetch_rainfall_data(state=s, limit=2000))
+    return measure(calls)
+
+
+def bench_answers(repeat: int, use_async: bool) -> Dict[str, Dict[str, float]]:
+    """Cold pass (empty caches) then warm pass (same questions) per repeat"""
+    from ai_system import IntelligentQASystem
+
+    cold, warm = [], []
+    for _ in range(repeat):
+        with scratch_dir():
+            with contextlib.redirect_stdout(io.StringIO()):
+                system = IntelligentQASystem(use_async=use_async)
+            cold.append(measure([lambda q=q: system.answer_question(q) for q in QUESTIONS]))
+            warm.append(measure([lambda q=q: system.answer_question(q) for q in QUESTIONS]))
+    return {"cold": merge(cold), "warm": merge(warm)}
+
+
+def bench_stream(repeat: int) -> Dict[str, float]:
+    """Time to first token and to the last token of a streamed answer"""
+    from ai_system import IntelligentQASystem
+
+    first_token, complete = [], []
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with scratch_dir():
+            with contextlib.redirect_stdout(io.StringIO()):
+                system = IntelligentQASystem()
+                for question in QUESTIONS:
+                    t0 = time.perf_counter()
+                    result = system.answer_question(question, stream=True)
+                    tokens = iter(result["answer_stream"])
+                    next(tokens, None)
+                    first_token.append(time.perf_counter() - t0)
+                    for _token in tokens:
+                        pass
+                    complete.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report = summarize(complete, elapsed, peak)
+    report["first_token_p50_ms"] = summarize(first_token, elapsed, peak)["p50_ms"]
+    report["first_token_p95_ms"] = summarize(first_token, elapsed, peak)["p95_ms"]
+    return report
+
+
+def merge(reports: List[Dict[str, float]]) -> Dict[str, float]:
+    """Average per-repeat reports; peak memory is the worst repeat"""
+    merged = {key: round(statistics.mean(r[key] for r in reports), 2) for key in reports[0]}
+    merged["runs"] = sum(r["runs"] for r in reports)
+    merged["peak_mb"] = max(r["peak_mb"] for r in reports)
+    return merged
+
+
+# ----------------------------------------------------------------------
+def git_sha() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "nogit"
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def print_report(results: Dict, previous: Dict = None):
+    current = flatten(results["scenarios"])
+    before = flatten(previous["scenarios"]) if previous else {}
+    print(f"\n{'metric':<44} {'value':>12} {'delta':>10}")
+    print("-" * 68)
+    for name, value in current.items():
+        delta = ""
+        if before.get(name):
+            delta = f"{(value - before[name]) / before[name] * 100:+.1f}%"
+        print(f"{name:<44} {value:>12} {delta:>10}")
+    print(f"\nmax RSS: {results['max_rss_mb']} MB")
+
+
+def previous_results() -> Dict:
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not files:
+        return None
+    with open(files[-1]) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="data.gov.in response delay (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="extra random delay per response (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="Groq time to first byte (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="delay between streamed tokens (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of data requests failed with 429/503")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-save", action="store_true", help="print results without writing a file")
+    args = parser.parse_args(argv)
+
+    stub = StubServer(latency=args.latency, jitter=args.jitter,
+                      llm_latency=args.llm_latency, token_delay=args.token_delay,
+                      error_rate=args.error_rate).start()
+    # Must be set before the repo modules are imported: the URLs are class attributes
+    os.environ["DATA_GOV_API_BASE"] = stub.url
+    os.environ["GROQ_BASE_URL"] = stub.url
+    os.environ["GROQ_API_KEY"] = "stub-key"
+    sys.path.insert(0, ROOT)
+
+    try:
+        scenarios = {}
+        print("⏱️  query analyzer...")
+        scenarios["analyzer"] = bench_analyzer(args.repeat)
+        print("⏱️  data.gov.in fetches...")
+        with scratch_dir():
+            scenarios["fetch"] = bench_fetch(args.repeat)
+        print("⏱️  answer_question (sync fetch)...")
+        scenarios["answer_sync"] = bench_answers(args.repeat, use_async=False)
+        print("⏱️  answer_question (async fetch)...")
+        scenarios["answer_async"] = bench_answers(args.repeat, use_async=True)
+        print("⏱️  streamed answers...")
+        scenarios["answer_stream"] = bench_stream(args.repeat)
+    finally:
+        stub.stop()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_sha": git_sha(),
+        "config": vars(args),
+        "stub_requests": stub.requests,
+        # ru_maxrss is KiB on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scenarios": scenarios,
+    }
+
+    print_report(results, previous_results())
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['git_sha']}.json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved to {os.path.relpath(path, ROOT)}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
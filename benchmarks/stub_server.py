@@ -0,0 +1,265 @@
+"""Local stand-in for the data.gov.in resources and the Groq chat endpoint.
+
+Serves recorded fixture records (benchmarks/fixtures/*.json) with the same
+filter/offset/limit/total semantics as api.data.gov.in, and canned chat
+completions (plain or streamed) at Groq's /openai/v1/chat/completions.
+Every response can be delayed by a fixed latency plus jitter, and a share
+of data requests can be failed with 429 (Retry-After) or 503 responses.
+
+Record fresh fixtures from the live API (needs network):
+
+    python -m benchmarks.stub_server --record
+
+Without fixture files a deterministic synthetic dataset of the same shape
+is generated instead.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CROP_RESOURCE = "35be999b-0208-4354-b557-f6ca9a5355de"
+RAINFALL_RESOURCE = "6c05cd1b-ed59-40c2-bc31-e314f39c6971"
+
+STATES = ["Punjab", "Haryana", "Tamil Nadu", "Kerala", "Maharashtra", "Uttar Pradesh"]
+CROPS = ["Rice", "Wheat", "Sugarcane", "Cotton", "Maize", "Groundnut"]
+SEASONS = ["Kharif", "Rabi"]
+
+ANSWER = ("Based on the data.gov.in Crop Production API, Punjab produced more rice than "
+          "Tamil Nadu in the selected year, led by its top districts. Rainfall figures "
+          "come from the Daily District Rainfall API.")
+
+
+# ----------------------------------------------------------------------
+def synthetic_fixtures(seed: int = 42, districts_per_state: int = 8) -> Dict[str, List[dict]]:
+    """Deterministic records shaped like the two real resources"""
+    rng = random.Random(seed)
+    crop, rainfall = [], []
+    for state in STATES:
+        districts = [f"{state[:3].upper()}DIST{i}" for i in range(districts_per_state)]
+        for district in districts:
+            for year in range(1997, 2015):
+                for name in CROPS:
+                    for season in SEASONS:
+                        area = rng.uniform(100, 50000)
+                        crop.append({
+                            "state_name": state, "district_name": district,
+                            "crop_year": str(year), "season": season, "crop": name,
+                            "area_": f"{area:.1f}",
+                            "production_": f"{area * rng.uniform(0.5, 4):.1f}",
+                        })
+            for year in range(2018, 2022):
+                for day in range(0, 365, 3):
+                    date = datetime.date(year, 1, 1) + datetime.timedelta(days=day)
+                    rainfall.append({
+                        "State": state, "District": district, "Date": date.isoformat(),
+                        "Year": str(year), "Month": str(date.month),
+                        "Avg_rainfall": f"{max(0.0, rng.gauss(3, 6)):.2f}",
+                        "Agency_name": "IMD",
+                    })
+    return {CROP_RESOURCE: crop, RAINFALL_RESOURCE: rainfall}
+
+
+def load_fixtures(directory: str = FIXTURE_DIR) -> Dict[str, List[dict]]:
+    """Recorded fixtures if present, otherwise the synthetic dataset"""
+    fixtures = {}
+    for resource, name in ((CROP_RESOURCE, "crop"), (RAINFALL_RESOURCE, "rainfall")):
+        path = os.path.join(directory, f"{name}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                fixtures[resource] = json.load(f)
+    if len(fixtures) < 2:
+        synthetic = synthetic_fixtures()
+        for resource, records in synthetic.items():
+            fixtures.setdefault(resource, records)
+    return fixtures
+
+
+def record_fixtures(directory: str = FIXTURE_DIR, states=STATES, limit: int = 20000):
+    """Download real slices for the benchmark states into fixture files"""
+    from data_handler import DataGovAPI
+
+    api = DataGovAPI(use_snapshot=False, use_cache=False)
+    os.makedirs(directory, exist_ok=True)
+    for name, url, key in (("crop", api.CROP_API_URL, "state_name"),
+                           ("rainfall", api.RAINFALL_API_URL, "State")):
+        records = []
+        for state in states:
+            for page in api._iter_pages(url, {f"filters[{key}]": state}, limit):
+                records.extend(page)
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump(records, f)
+        print(f"✓ Recorded {len(records)} {name} records")
+
+
+# ----------------------------------------------------------------------
+class StubServer:
+    """Threaded HTTP server replaying fixtures with injected latency"""
+
+    def __init__(self,
+                 fixtures: Optional[Dict[str, List[dict]]] = None,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 llm_latency: float = 0.0,
+                 token_delay: float = 0.0,
+                 error_rate: float = 0.0,
+                 retry_after: float = 0.2,
+                 port: int = 0):
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.llm_latency = llm_latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = {"data": 0, "llm": 0, "errors": 0}
+        self.filtered: Dict[tuple, List[dict]] = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def delay(self, base: float):
+        if base or self.jitter:
+            time.sleep(base + random.uniform(0, self.jitter))
+
+    def select(self, resource: str, filters: Dict[str, str]) -> List[dict]:
+        """Records of a resource matching every filter (memoized per filter set)"""
+        key = (resource, tuple(sorted(filters.items())))
+        with self.lock:
+            if key not in self.filtered:
+                self.filtered[key] = [
+                    r for r in self.fixtures.get(resource, [])
+                    if all(str(r.get(field, "")).strip() == value.strip() for field, value in filters.items())
+                ]
+            return self.filtered[key]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                resource = parsed.path.rstrip("/").split("/")[-1]
+                if resource not in server.fixtures:
+                    return self.send_json({"error": "unknown resource"}, 404)
+                params = dict(parse_qsl(parsed.query))
+                filters = {k[len("filters["):-1]: v for k, v in params.items() if k.startswith("filters[")}
+                offset = int(params.get("offset", 0))
+                limit = int(params.get("limit", 10))
+
+                with server.lock:
+                    server.requests["data"] += 1
+                server.delay(server.latency)
+                if server.error_rate and random.random() < server.error_rate:
+                    with server.lock:
+                        server.requests["errors"] += 1
+                    if random.random() < 0.5:
+                        self.send_response(429)
+                        self.send_header("Retry-After", str(server.retry_after))
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    return self.send_json({"error": "service unavailable"}, 503)
+                rows = server.select(resource, filters)
+                self.send_json({
+                    "status": "ok",
+                    "total": len(rows),
+                    "count": len(rows[offset:offset + limit]),
+                    "offset": offset,
+                    "limit": limit,
+                    "records": rows[offset:offset + limit],
+                })
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self.send_json({"error": "not found"}, 404)
+
+                with server.lock:
+                    server.requests["llm"] += 1
+                server.delay(server.llm_latency)
+                created = int(time.time())
+                model = request.get("model", "stub")
+
+                if not request.get("stream"):
+                    return self.send_json({
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": ANSWER}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in ANSWER.split(" "):
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                             "created": created, "model": model,
+                             "choices": [{"index": 0, "delta": {"content": word + " "},
+                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="record fixtures from the live API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+    else:
+        stub = StubServer(latency=args.latency, error_rate=args.error_rate, port=args.port).start()
+        print(f"Stub serving on {stub.url} (Ctrl+C to stop)")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            stub.stop()
@@ -0,0 +1,239 @@
+import itertools
+import json
+import math
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from typing import Iterable, List, Optional, Tuple
+
+from frame_cache import FrameCache
+
+
+class QueryLog:
+    """JSONL log of the fetch jobs real questions planned.
+
+    The warmer replays the most frequent jobs after a restart, so the slices
+    users actually ask about are cached before anyone asks again. Only the
+    newest `max_lines` entries count: once the file holds twice that many it
+    is rewritten with just those, and reads are cached until it changes.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "query_log.jsonl")
+
+    def __init__(self, path: Optional[str] = None, max_lines: int = 20000):
+        self.path = path or self.DEFAULT_PATH
+        self.max_lines = max(1, max_lines)
+        self.lock = threading.Lock()
+        self.lines: Optional[int] = None  # counted on the first append
+        self.cached: Tuple[Optional[tuple], List[dict]] = (None, [])
+
+    def record(self, jobs: List[tuple]):
+        if not jobs:
+            return
+        line = json.dumps({"ts": time.time(),
+                           "jobs": [[dataset, kwargs] for dataset, kwargs, _ in jobs]}, default=str)
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self.lines is None:
+                self.lines = len(self._tail(None))
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+            self.lines += 1
+            if self.lines >= 2 * self.max_lines:
+                self._rotate()
+
+    def _tail(self, n: Optional[int]) -> deque:
+        """Last `n` lines of the file (all if None); lock held"""
+        if not os.path.exists(self.path):
+            return deque()
+        with open(self.path) as f:
+            return deque(f, maxlen=n)
+
+    def _rotate(self):
+        """Rewrite the file with only its newest `max_lines` lines; lock held"""
+        lines = self._tail(self.max_lines)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp, self.path)
+        self.lines = len(lines)
+
+    def entries(self) -> List[dict]:
+        with self.lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return []
+            version = (stat.st_mtime_ns, stat.st_size)
+            if self.cached[0] == version:
+                return self.cached[1]
+            lines = self._tail(self.max_lines)
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # a torn last line from a crash
+            self.cached = (version, entries)
+            return entries
+
+    def top_jobs(self, n: int = 50) -> List[Tuple[str, dict]]:
+        """Most frequently planned (dataset, kwargs) pairs, most common first"""
+        counts = Counter()
+        for entry in self.entries():
+            for dataset, kwargs in entry["jobs"]:
+                counts[(dataset, json.dumps(kwargs, sort_keys=True))] += 1
+        return [(dataset, json.loads(kwargs)) for (dataset, kwargs), _ in counts.most_common(n)]
+
+
+class ForegroundGate:
+    """Tracks user-initiated fetches so background work can stand aside.
+
+    User code wraps its fetches in `with gate:`; background workers call
+    `wait_idle()` before each job, and warming fetches wait on it again
+    before every page (see request_control.yield_to), so they never compete
+    with a user for the rate limiter or connection pool.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.condition:
+            self.active -= 1
+            if self.active == 0:
+                self.condition.notify_all()
+
+    def busy(self) -> bool:
+        return self.active > 0
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self.condition:
+            return self.condition.wait_for(lambda: self.active == 0, timeout)
+
+
+class CacheWarmer:
+    """Prefetch likely slices into the shared caches on background threads.
+
+    Work is prioritized: the UI's example questions first, then the most
+    frequent slices in the query log, then each state's default slices.
+    Jobs are planned with the system's own planner, so warmed entries have
+    exactly the keys later questions look up. A page budget caps how many
+    API requests warming may spend, and workers pause whenever a user fetch
+    is running, including between the pages of a job already started.
+    """
+
+    EXAMPLES, POPULAR, STATES = 0, 1, 2
+    STATE_CROPS = ["Rice", "Wheat"]
+
+    def __init__(self, system, examples: Iterable[str] = (), request_budget: int = 150,
+                 workers: int = 2, popular: int = 30):
+        self.system = system
+        self.examples = list(examples)
+        self.request_budget = request_budget
+        self.workers = max(1, workers)
+        self.popular = popular
+        self.jobs: "queue.PriorityQueue" = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.spent = 0
+        self.stats = {"queued": 0, "warmed": 0, "skipped": 0, "failed": 0, "over_budget": 0}
+        self.stopped = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    # ------------------------------------------------------------------
+    def enqueue(self, priority: int, dataset: str, kwargs: dict):
+        key = FrameCache.make_key(dataset, kwargs)
+        with self.lock:
+            if key in self.seen:
+                return
+            self.seen.add(key)
+            self.stats["queued"] += 1
+        self.jobs.put((priority, next(self.seq), dataset, kwargs))
+
+    def _plan(self, analysis: dict) -> List[tuple]:
+        return self.system.plan_fetches(analysis, verbose=False)
+
+    def schedule(self):
+        """Queue every warm-up job (cheap: planning only, no I/O)"""
+        analyzer = self.system.query_analyzer
+        for question in self.examples:
+            for dataset, kwargs, _ in self._plan(analyzer.analyze(question)):
+                self.enqueue(self.EXAMPLES, dataset, kwargs)
+
+        for dataset, kwargs in self.system.query_log.top_jobs(self.popular):
+            self.enqueue(self.POPULAR, dataset, kwargs)
+
+        for state in analyzer.INDIAN_STATES:
+            analysis = {"query_type": "general", "states": [state], "crops": self.STATE_CROPS,
+                        "districts": [], "seasons": [], "years": []}
+            for dataset, kwargs, _ in self._plan(analysis):
+                self.enqueue(self.STATES, dataset, kwargs)
+
+    def start(self) -> "CacheWarmer":
+        """Schedule and start warming on daemon threads; returns at once"""
+        def run():
+            self.schedule()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"cache-warmer-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+        threading.Thread(target=run, name="cache-warmer", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    # ------------------------------------------------------------------
+    def _cost(self, kwargs: dict) -> int:
+        """Upper bound on API pages a job needs"""
+        return max(1, math.ceil(kwargs.get("limit", 5000) / self.system.data_api.BATCH_SIZE))
+
+    def _worker(self):
+        while not self.stopped.is_set():
+            try:
+                priority, _, dataset, kwargs = self.jobs.get(timeout=1)
+            except queue.Empty:
+                return
+
+            # Yield to users: never start warming while a question is fetching
+            while not self.stopped.is_set() and not self.system.foreground.wait_idle(timeout=1):
+                pass
+            if self.stopped.is_set():
+                return
+
+            if not self.system.needs_fetch(dataset, kwargs):
+                with self.lock:
+                    self.stats["skipped"] += 1
+                continue
+
+            cost = self._cost(kwargs)
+            with self.lock:
+                if self.spent + cost > self.request_budget:
+                    self.stats["over_budget"] += 1
+                    continue
+                self.spent += cost
+
+            try:
+                self.system.warm(dataset, kwargs)
+                outcome = "warmed"
+            except Exception as e:
+                print(f"Cache warmer: {dataset} {kwargs} failed: {e}")
+                outcome = "failed"
+            with self.lock:
+                self.stats[outcome] += 1
+
+    def progress(self) -> dict:
+        with self.lock:
+            return {**self.stats, "pending": self.jobs.qsize(), "requests_spent": self.spent,
+                    "request_budget": self.request_budget}
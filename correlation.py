@@ -0,0 +1,272 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import rainfall_seasons
+from rainfall_seasons import names
+
+# Join keys per level; names are normalized (stripped, upper-cased) because
+# the two resources spell districts differently ("AMRITSAR" vs "Amritsar").
+LEVEL_KEYS = {"state": ["state"], "district": ["state", "district"]}
+MIN_PAIRS = 3
+# Per-chunk month tables are merged every this many chunks to bound memory
+FOLD_EVERY = 8
+
+
+def _fold(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    keys = rainfall_seasons.KEYS + ["Year", "Month"]
+    return pd.concat(parts).groupby(keys, sort=True)[["rain_sum", "days"]].sum().reset_index()
+
+
+def rainfall_months(chunks: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> pd.DataFrame:
+    """rainfall_seasons.monthly() rows for one frame or an iterable of chunks.
+
+    Chunks are reduced one at a time, so memory is bounded by one chunk
+    plus the month table.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    parts = []
+    for df in chunks:
+        if df is None or df.empty:
+            continue
+        parts.append(rainfall_seasons.monthly(df))
+        if len(parts) >= FOLD_EVERY:
+            parts = [_fold(parts)]
+    return _fold(parts) if parts else rainfall_seasons.monthly(None)
+
+
+def annual_rainfall(months: pd.DataFrame, level: str) -> pd.DataFrame:
+    """Annual rainfall (mm) per level key x year from rainfall_months.
+
+    The same figures as the summaries' annual tables: rainfall_seasons.annual
+    per district, averaged over districts per state. Years with less than
+    MIN_COVERAGE of their days reported are left out.
+    """
+    table = rainfall_seasons.annual(months)
+    table = table[table["coverage"] >= rainfall_seasons.MIN_COVERAGE]
+    if level == "district":
+        table = table[table["District"] != ""]
+    else:
+        table = rainfall_seasons.by_state(table, ["Year"])
+    annual = pd.DataFrame({
+        "state": names(table["State"], upper=True),
+        "year": table["Year"].to_numpy(dtype="int64"),
+        "annual_mm": table["mm"].to_numpy(dtype=float),
+    })
+    if level == "district":
+        annual.insert(1, "district", names(table["District"], upper=True))
+    return annual
+
+
+def crop_totals(crop_df: pd.DataFrame, level: str) -> pd.DataFrame:
+    """Production, area and yield per level key x crop x year"""
+    keys = LEVEL_KEYS[level] + ["crop", "year"]
+    frame = pd.DataFrame({
+        "state": names(crop_df["state_name"], upper=True),
+        "crop": crop_df["crop"].astype(str).to_numpy(dtype=object),
+        "year": crop_df["crop_year"].to_numpy(dtype=float, na_value=np.nan),
+        "production": crop_df["production_"].to_numpy(dtype=float, na_value=np.nan),
+        "area": crop_df["area_"].to_numpy(dtype=float, na_value=np.nan),
+    })
+    if level == "district":
+        frame["district"] = names(crop_df["district_name"], upper=True)
+    frame = frame.dropna(subset=keys + ["production", "area"])
+    totals = frame.groupby(keys, sort=False)[["production", "area"]].sum().reset_index()
+    totals = totals[totals["area"] > 0]
+    totals["year"] = totals["year"].astype("int64")
+    totals["yield"] = totals["production"] / totals["area"]
+    return totals
+
+
+# ----------------------------------------------------------------------
+def _pearson(df: pd.DataFrame, by: List[str], x: str, y: str,
+             center_by: Optional[List[str]] = None) -> pd.DataFrame:
+    """Pearson r of x and y within each `by` group, all groups at once.
+
+    With `center_by`, values are first demeaned within those (finer)
+    groups, so e.g. a per-crop r pools year-to-year anomalies of every
+    district instead of comparing wet and dry districts.
+    """
+    center = center_by or by
+    dx = df[x] - df.groupby(center, sort=False)[x].transform("mean")
+    dy = df[y] - df.groupby(center, sort=False)[y].transform("mean")
+    parts = pd.DataFrame({"sxy": dx * dy, "sxx": dx * dx, "syy": dy * dy})
+    for col in by:
+        parts[col] = df[col].to_numpy()
+    sums = parts.groupby(by, sort=False).agg(
+        n=("sxy", "size"), sxy=("sxy", "sum"), sxx=("sxx", "sum"), syy=("syy", "sum"))
+    denom = np.sqrt(sums["sxx"] * sums["syy"])
+    sums["r"] = (sums["sxy"] / denom.where(denom > 0)).where(sums["n"] >= MIN_PAIRS)
+    return sums[["n", "r"]]
+
+
+def _spearman(df: pd.DataFrame, by: List[str], x: str, y: str,
+              rank_by: Optional[List[str]] = None) -> pd.Series:
+    """Spearman rho per `by` group; ranks are taken within `rank_by` groups"""
+    rank_by = rank_by or by
+    cols = list(dict.fromkeys(by + rank_by))
+    grouped = df.groupby(rank_by, sort=False)
+    ranked = df[cols].copy()
+    ranked["rx"] = grouped[x].rank()
+    ranked["ry"] = grouped[y].rank()
+    return _pearson(ranked, by, "rx", "ry", center_by=rank_by)["r"]
+
+
+def _aligned(crops: pd.DataFrame, rain: pd.DataFrame, keys: List[str], lag: int) -> pd.DataFrame:
+    """Crop years joined to the rainfall of `lag` years earlier"""
+    shifted = rain[keys + ["year", "annual_mm"]].assign(year=rain["year"] + lag)
+    return crops.merge(shifted, on=keys + ["year"], how="inner")
+
+
+def correlate(crop_df: Optional[pd.DataFrame],
+              rain: Union[pd.DataFrame, Iterable[pd.DataFrame], None],
+              level: Optional[str] = None,
+              max_lag: int = 2) -> Dict:
+    """Relate crop yield to rainfall for every crop, district and lag at once.
+
+    Crop rows are aligned with annual rainfall at district x year
+    granularity (state x year when the rainfall has no districts, e.g. it
+    came from the monthly rollup). If the two datasets share no years the
+    engine falls back to a cross-sectional comparison: each district's mean
+    yield against its mean annual rainfall.
+
+    Frames flagged `attrs["truncated"]` (rows cut off by a fetch limit) are
+    refused: annual totals from the first rows of a table are biased.
+    """
+    if crop_df is None or crop_df.empty or rain is None:
+        return {"mode": "none", "reason": "crop and rainfall data are both needed"}
+    cut = [name for name, df in (("crop", crop_df), ("rainfall", rain))
+           if isinstance(df, pd.DataFrame) and df.attrs.get("truncated")]
+    if cut:
+        return {"mode": "none", "reason": f"the {' and '.join(cut)} rows were cut off by the API row limit "
+                                          "(see sources), so only part of each year is known and a "
+                                          "correlation would be biased"}
+
+    months = rainfall_months(rain)
+    if level is None:
+        has_districts = "district_name" in crop_df.columns and (months["District"] != "").any()
+        level = "district" if has_districts else "state"
+    keys = LEVEL_KEYS[level]
+
+    rain_t = annual_rainfall(months, level)
+    crops = crop_totals(crop_df, level)
+    if rain_t.empty or crops.empty:
+        return {"mode": "none", "reason": "no usable rows after cleaning"}
+
+    stats: Dict = {
+        "level": level,
+        "crop_years": [int(crops["year"].min()), int(crops["year"].max())],
+        "rain_years": [int(rain_t["year"].min()), int(rain_t["year"].max())],
+        "crops": {},
+    }
+
+    pairs = _aligned(crops, rain_t, keys, 0)
+    if len(pairs) >= MIN_PAIRS:
+        stats["mode"] = "time-series"
+        group = keys + ["crop"]
+        per_group = _pearson(pairs, group, "annual_mm", "yield")
+        pooled = _pearson(pairs, ["crop"], "annual_mm", "yield", center_by=group)
+        spearman = _spearman(pairs, ["crop"], "annual_mm", "yield", rank_by=group)
+        lags = {lag: _pearson(_aligned(crops, rain_t, keys, lag), ["crop"], "annual_mm", "yield",
+                              center_by=group)["r"]
+                for lag in range(1, max_lag + 1)}
+    else:
+        # No common years: compare places rather than years
+        stats["mode"] = "cross-sectional"
+        pairs = crops.groupby(keys + ["crop"], sort=False)["yield"].mean().reset_index().merge(
+            rain_t.groupby(keys, sort=False)["annual_mm"].mean().reset_index(), on=keys)
+        per_group = None
+        pooled = _pearson(pairs, ["crop"], "annual_mm", "yield")
+        spearman = _spearman(pairs, ["crop"], "annual_mm", "yield")
+        lags = {}
+
+    # kg/ha of yield per mm of annual rainfall (yield is tonnes/ha)
+    pairs = pairs.assign(kg_per_mm=1000.0 * pairs["yield"] / pairs["annual_mm"].where(pairs["annual_mm"] > 0))
+    per_mm = pairs.groupby("crop", sort=False)["kg_per_mm"].median()
+
+    for crop, row in pooled.iterrows():
+        entry = {
+            "pairs": int(row["n"]),
+            "pearson": _round(row["r"]),
+            "spearman": _round(spearman.get(crop)),
+            "yield_kg_ha_per_mm": _round(per_mm.get(crop), 2),
+        }
+        if lags:
+            entry["lagged_pearson"] = {lag: _round(r.get(crop)) for lag, r in lags.items()}
+        if per_group is not None:
+            rs = per_group["r"].xs(crop, level="crop").dropna()
+            entry["groups"] = int(len(rs))
+            entry["median_group_r"] = _round(rs.median() if len(rs) else None)
+            ranked = rs.sort_values()
+            entry["lowest"] = [(_label(k), _round(v)) for k, v in ranked.head(2).items()]
+            entry["highest"] = [(_label(k), _round(v)) for k, v in ranked.tail(2)[::-1].items()]
+        stats["crops"][crop] = entry
+    return stats
+
+
+def _round(value, digits: int = 3):
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def _label(key) -> str:
+    return ", ".join(str(part).title() for part in (key if isinstance(key, tuple) else (key,)))
+
+
+def format_stats(stats: Dict) -> str:
+    """Compact text block for the LLM prompt"""
+    if stats.get("mode") in (None, "none"):
+        return f"- Correlation not computed: {stats.get('reason', 'no data')}"
+
+    lines = [
+        f"- Level: {stats['level']}; crop years {stats['crop_years'][0]}-{stats['crop_years'][1]}, "
+        f"rainfall years {stats['rain_years'][0]}-{stats['rain_years'][1]}",
+    ]
+    if stats["mode"] == "cross-sectional":
+        lines.append("- The datasets share no years, so this compares places, not years: "
+                     f"each {stats['level']}'s mean yield vs its mean annual rainfall")
+    else:
+        lines.append("- Year-to-year yield anomalies vs annual rainfall, pooled within each "
+                     f"{stats['level']}")
+    for crop, s in stats["crops"].items():
+        line = (f"- {crop}: Pearson r={s['pearson']}, Spearman rho={s['spearman']} "
+                f"(n={s['pairs']}), yield per mm={s['yield_kg_ha_per_mm']} kg/ha")
+        if s.get("lagged_pearson"):
+            line += ", lagged r " + ", ".join(f"{lag}y={r}" for lag, r in s["lagged_pearson"].items())
+        lines.append(line)
+        if s.get("groups"):
+            lines.append(f"  median per-{stats['level']} r={s['median_group_r']} over {s['groups']}; "
+                         f"highest: {s['highest']}, lowest: {s['lowest']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    districts = [f"D{i}" for i in range(600)]
+    years = np.arange(2000, 2015)
+    rain_rows = pd.DataFrame({
+        "State": "S", "District": np.repeat(districts, len(years) * 12),
+        "Year": np.tile(np.repeat(years, 12), len(districts)),
+        "Month": np.tile(np.arange(1, 13), len(districts) * len(years)),
+        # Monthly rollup rows: a month's total and the days it covers
+        "Avg_rainfall_sum": 30 * rng.gamma(2.0, 1.5, len(districts) * len(years) * 12),
+        "records": 30,
+    })
+    annual = rain_rows.groupby(["District", "Year"])["Avg_rainfall_sum"].mean() / 30
+    crop_rows = pd.DataFrame({
+        "state_name": "S", "district_name": annual.index.get_level_values(0),
+        "crop": "Rice", "crop_year": annual.index.get_level_values(1),
+        "area_": 1000.0,
+    })
+    crop_rows["production_"] = 1000.0 * (2 + 0.5 * annual.to_numpy() + rng.normal(0, 0.2, len(annual)))
+
+    start = time.perf_counter()
+    result = correlate(crop_rows, rain_rows)
+    print(format_stats(result))
+    print(f"({len(crop_rows)} crop rows x {len(rain_rows)} rainfall rows in "
+          f"{time.perf_counter() - start:.2f}s)")
@@ -1,18 +1,191 @@
 import requests
 import pandas as pd
-from typing import Optional, List
+from typing import Iterator, Optional, List
+import contextvars
+import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from snapshot_store import CropSnapshotStore
+from rainfall_store import RainfallStore
+from response_cache import ResponseCache
+from request_control import RETRYABLE_STATUS, CircuitBreaker, backoff_delay, parse_retry_after, yield_to
+from schemas import CROP_SCHEMA, RAINFALL_SCHEMA, apply_schema, assemble_chunks, records_to_frame
+from tracing import span
+
+
+def crop_filters(state: Optional[str] = None,
+                 district: Optional[str] = None,
+                 crop: Optional[str] = None,
+                 year: Optional[int] = None,
+                 season: Optional[str] = None) -> dict:
+    """Build data.gov.in filter params for the crop resource"""
+    filters = {}
+    if state:
+        filters['filters[state_name]'] = state
+    if district:
+        filters['filters[district_name]'] = district
+    if crop:
+        filters['filters[crop]'] = crop
+    if year:
+        filters['filters[crop_year]'] = year
+    if season:
+        filters['filters[season]'] = season
+    return filters
+
+
+def rainfall_filters(state: Optional[str] = None, year: Optional[int] = None) -> dict:
+    """Build data.gov.in filter params for the rainfall resource"""
+    filters = {}
+    if state:
+        filters['filters[State]'] = state
+    if year:
+        filters['filters[Year]'] = str(year)
+    return filters
+
+
+def mark_truncated(df: pd.DataFrame, total: Optional[int], limit: int):
+    """Record in `df.attrs` whether rows beyond `limit` were left out, and the total"""
+    df.attrs["total"] = total or None
+    df.attrs["truncated"] = total > len(df) if total else len(df) >= limit
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by all page fetches.
+
+    The rate adapts to the server: a 429 halves it (never below `min_rate`)
+    and pauses every caller for the Retry-After period; each success adds
+    back a tenth of the starting rate, up to `max_rate`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1,
+                 min_rate: Optional[float] = None, max_rate: Optional[float] = None):
+        self.rate = rate
+        self.initial_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.max_rate = max_rate if max_rate is not None else rate * 2
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token if one is free and return 0, else the seconds to wait
+        before trying again. Never blocks, so coroutines can share the bucket."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            wait = self.take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Back off after a 429"""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def relax(self):
+        """Speed back up after a successful response"""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.initial_rate / 10)
+
 
 class DataGovAPI:
     """Handler for data.gov.in API"""
     
-    CROP_API_URL = "https://api.data.gov.in/resource/35be999b-0208-4354-b557-f6ca9a5355de"
-    RAINFALL_API_URL = "https://api.data.gov.in/resource/6c05cd1b-ed59-40c2-bc31-e314f39c6971"
+    # Overridable so benchmarks can point the client at a local stub server
+    API_BASE = os.getenv("DATA_GOV_API_BASE", "https://api.data.gov.in")
+    CROP_API_URL = f"{API_BASE}/resource/35be999b-0208-4354-b557-f6ca9a5355de"
+    RAINFALL_API_URL = f"{API_BASE}/resource/6c05cd1b-ed59-40c2-bc31-e314f39c6971"
     API_KEY = "579b464db66ec23bdd000001955640b6e396463b64c7bc5545fd6530"
     
-    def __init__(self):
+    BATCH_SIZE = 1000
+    
+    RESOURCE_NAMES = {CROP_API_URL: "crop", RAINFALL_API_URL: "rainfall"}
+    
+    # The crop table is frozen; rainfall gains new days continuously.
+    CACHE_TTLS = {
+        CROP_API_URL: 365 * 24 * 3600,
+        RAINFALL_API_URL: 6 * 3600,
+    }
+    
+    def __init__(self,
+                 use_snapshot: bool = True,
+                 max_workers: int = 4,
+                 requests_per_second: float = 3.0,
+                 burst: int = 4,
+                 use_cache: bool = True,
+                 cache: Optional[ResponseCache] = None,
+                 max_retries: int = 4,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_requests_per_second: Optional[float] = None):
         self.session = requests.Session()
+        # Size the connection pool for the page workers sharing this session
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(10, max_workers))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = (cache or ResponseCache(ttls=self.CACHE_TTLS)) if use_cache else None
+        self.max_workers = max(1, max_workers)
+        # Successes speed pacing back up to twice the rate unless capped
+        self.rate_limiter = RateLimiter(requests_per_second, burst, max_rate=max_requests_per_second)
+        self.max_retries = max(0, max_retries)
+        self.breaker = breaker or CircuitBreaker()
+        self.crop_snapshot = CropSnapshotStore() if use_snapshot else None
+        self.rainfall_store = RainfallStore() if use_snapshot else None
     
+    def iter_crop_data(self,
+                       state: Optional[str] = None,
+                       district: Optional[str] = None,
+                       crop: Optional[str] = None,
+                       year: Optional[int] = None,
+                       season: Optional[str] = None,
+                       limit: int = 5000,
+                       status: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+        """Yield crop production data as typed chunks, one per page.
+
+        If `status` is given, it gets `partial=True` and the `error` when
+        paging stopped early on a failure.
+        """
+        if self.crop_snapshot is not None and self.crop_snapshot.exists():
+            with span("snapshot_query", resource="crop") as query:
+                df = self.crop_snapshot.query(state=state, district=district, crop=crop,
+                                              year=year, season=season, limit=limit)
+                query["records"] = 0 if df is None else len(df)
+            if df is not None:
+                print("✓ Crop data served from local snapshot")
+                yield apply_schema(df, CROP_SCHEMA)
+            return
+
+        filters = crop_filters(state, district, crop, year, season)
+        for records in self._iter_pages(self.CROP_API_URL, filters, limit, status):
+            with span("build_frame", resource="crop", records=len(records)):
+                chunk = records_to_frame(records, CROP_SCHEMA)
+            yield chunk
+
     def fetch_crop_data(self, 
                        state: Optional[str] = None,
                        district: Optional[str] = None, 
@@ -20,105 +193,224 @@ class DataGovAPI:
                        year: Optional[int] = None,
                        season: Optional[str] = None,
                        limit: int = 5000) -> Optional[pd.DataFrame]:
-        """Fetch crop production data"""
-        all_records = []
-        offset = 0
-        batch_size = 1000
-        
-        while len(all_records) < limit:
-            params = {
-                'api-key': self.API_KEY,
-                'format': 'json',
-                'limit': min(batch_size, limit - len(all_records)),
-                'offset': offset
-            }
-            
-            if state:
-                params['filters[state_name]'] = state
-            if district:
-                params['filters[district_name]'] = district
-            if crop:
-                params['filters[crop]'] = crop
-            if year:
-                params['filters[crop_year]'] = year
-            if season:
-                params['filters[season]'] = season
-            
-            try:
-                response = self.session.get(self.CROP_API_URL, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                
-                records = data.get('records', [])
-                if not records:
-                    break
-                    
-                all_records.extend(records)
-                
-                if len(records) < batch_size:
-                    break
-                    
-                offset += batch_size
-                time.sleep(0.3)
-                
-            except Exception as e:
-                print(f"Error: {e}")
-                break
-        
-        if all_records:
-            df = pd.DataFrame(all_records)
-            print(f"✓ Crop data: {len(df)} records")
-            return df
-        return None
+        """Fetch crop production data.
+
+        `df.attrs["partial"]` flags pages that failed; `df.attrs["truncated"]`
+        flags rows cut off by `limit` (see _finish).
+        """
+        status = {}
+        df = assemble_chunks(self.iter_crop_data(state, district, crop, year, season, limit, status))
+        return self._finish("Crop", df, status, limit)
     
+    def iter_rainfall_data(self,
+                           state: Optional[str] = None,
+                           year: Optional[int] = None,
+                           limit: int = 5000,
+                           status: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+        """Yield rainfall data as typed chunks, one per page (see iter_crop_data).
+
+        Slices the local rainfall copy fully holds (see RainfallStore.serves)
+        are read from it instead of the API. Anything else, such as an
+        unfinished sync or a year past the last sync, goes to the API; if
+        that fails, whatever rows the copy has are returned, marked partial.
+        """
+        store = self.rainfall_store
+        if store is not None and store.serves(state, year):
+            df = self._query_rainfall_store(state, year, limit)
+            if df is not None:
+                print("✓ Rainfall data served from local copy")
+                yield apply_schema(df, RAINFALL_SCHEMA)
+                return
+
+        status = status if status is not None else {}
+        filters = rainfall_filters(state, year)
+        fetched = False
+        for records in self._iter_pages(self.RAINFALL_API_URL, filters, limit, status):
+            fetched = True
+            with span("build_frame", resource="rainfall", records=len(records)):
+                chunk = records_to_frame(records, RAINFALL_SCHEMA)
+            yield chunk
+        if not fetched and status.get("partial") and store is not None and store.has_state(state):
+            df = self._query_rainfall_store(state, year, limit)
+            if df is not None:
+                print("⚠️ Rainfall API unavailable; falling back to the incomplete local copy")
+                yield apply_schema(df, RAINFALL_SCHEMA)
+
+    def _query_rainfall_store(self, state: Optional[str], year: Optional[int],
+                              limit: int) -> Optional[pd.DataFrame]:
+        with span("rainfall_store_query", resource="rainfall") as query:
+            df = self.rainfall_store.query(state=state, year=year, limit=limit)
+            query["records"] = 0 if df is None else len(df)
+        return df
+
     def fetch_rainfall_data(self,
                            state: Optional[str] = None,
                            year: Optional[int] = None,
                            limit: int = 5000) -> Optional[pd.DataFrame]:
-        """Fetch rainfall data"""
-        all_records = []
-        offset = 0
-        batch_size = 1000
-        
-        while len(all_records) < limit:
-            params = {
-                'api-key': self.API_KEY,
-                'format': 'json',
-                'limit': min(batch_size, limit - len(all_records)),
-                'offset': offset
-            }
-            
-            if state:
-                params['filters[State]'] = state
-            if year:
-                params['filters[Year]'] = str(year)
-            
+        """Fetch rainfall data; attrs as in fetch_crop_data"""
+        status = {}
+        df = assemble_chunks(self.iter_rainfall_data(state, year, limit, status))
+        return self._finish("Rainfall", df, status, limit)
+
+    @staticmethod
+    def _finish(label: str, df: Optional[pd.DataFrame], status: dict, limit: int) -> Optional[pd.DataFrame]:
+        """Flag a frame partial (pages failed) and truncated (more rows than `limit`).
+
+        Truncation is read from the API's reported total; local copies report
+        none, so there a frame that filled its limit counts as truncated.
+        """
+        partial = status.get("partial", False)
+        if df is not None:
+            df.attrs["partial"] = partial
+            mark_truncated(df, status.get("total"), limit)
+            print(f"✓ {label} data: {len(df)} records")
+            if df.attrs["truncated"]:
+                print(f"⚠️ {label} data cut at the {limit:,}-row limit")
+        if partial:
+            print(f"⚠️ {label} data incomplete: {status.get('error')}")
+        return df
+
+    # ------------------------------------------------------------------
+    def _fetch_page(self, url: str, filters: dict, offset: int, limit: int) -> dict:
+        """Fetch a single page from the cache, or the API after the rate limiter"""
+        params = {
+            'api-key': self.API_KEY,
+            'format': 'json',
+            'limit': limit,
+            'offset': offset,
+            **filters
+        }
+        with span("page", resource=self.RESOURCE_NAMES.get(url, url), offset=offset, limit=limit) as page:
+            if self.cache is not None:
+                cached = self.cache.get(url, params)
+                if cached is not None:
+                    page.update(cache_hit=True, records=len(cached.get('records', [])))
+                    return cached
+
+            data = self._request(url, params, page)
+            page.update(cache_hit=False, records=len(data.get('records', [])))
+
+            if self.cache is not None:
+                self.cache.put(url, params, data)
+            return data
+
+    def _request(self, url: str, params: dict, page: dict) -> dict:
+        """GET with retries: jittered exponential backoff on transport errors
+        and retryable statuses, Retry-After honoured, 429s slow the shared
+        rate limiter, and the circuit breaker fails fast while the API is down.
+        Background callers (see request_control.yield_to) wait for user
+        fetches to finish before each attempt."""
+        attempt = 0
+        page["retries"] = 0
+        gate = yield_to.get()
+        while True:
+            if gate is not None:
+                gate.wait_idle()
+            self.breaker.before_request()
+            waited = time.perf_counter()
+            self.rate_limiter.acquire()
+            page["wait_ms"] = round(page.get("wait_ms", 0) + (time.perf_counter() - waited) * 1000, 2)
+            if gate is not None and gate.busy():
+                continue  # a user fetch started while this one queued
+
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.record_failure()
+                error = e
+            else:
+                page.update(status=response.status_code, bytes=len(response.content))
+                if response.status_code not in RETRYABLE_STATUS:
+                    # Any other answer, even a 4xx, shows the API is reachable
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    self.rate_limiter.relax()
+                    return response.json()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.rate_limiter.throttle(retry_after)
+                else:
+                    self.breaker.record_failure()
+                error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+
+            if attempt >= self.max_retries:
+                raise error
+            time.sleep(backoff_delay(attempt, retry_after=retry_after))
+            attempt += 1
+            page["retries"] = attempt
+
+    def _iter_pages(self, url: str, filters: dict, limit: int,
+                    status: Optional[dict] = None, start: int = 0) -> Iterator[List[dict]]:
+        """Yield pages of up to `limit` records in offset order, from `start`.
+
+        The first page is fetched on its own to learn the `total` count. The
+        remaining offsets are fetched concurrently, but at most `max_workers`
+        pages are in flight or buffered at once, so memory stays bounded no
+        matter how large the pull. A page that still fails after its retries
+        ends the stream there and marks `status` partial. `status["total"]`
+        receives the resource's reported row count.
+        """
+        status = status if status is not None else {}
+        status["partial"] = False
+        batch_size = self.BATCH_SIZE
+        try:
+            first = self._fetch_page(url, filters, start, min(batch_size, limit))
+        except Exception as e:
+            print(f"Error: {e}")
+            status.update(partial=True, error=repr(e))
+            return
+
+        try:
+            total = int(first.get('total', 0))
+        except (TypeError, ValueError):
+            total = 0
+        status["total"] = total
+
+        records = first.get('records', [])[:limit]
+        if not records:
+            return
+        yield records
+        if len(records) < batch_size or len(records) >= limit:
+            return
+
+        if total <= 0:
+            # No usable total: probe every offset up to the limit.
+            total = start + limit
+        end = min(total, start + limit)
+
+        offsets = iter(range(start + batch_size, end, batch_size))
+        pending = deque()
+
+        def submit(pool, offset):
+            size = min(batch_size, end - offset)
+            # Each worker runs in a copy of this context so page spans reach the trace
+            pending.append((size, pool.submit(contextvars.copy_context().run,
+                                              self._fetch_page, url, filters, offset, size)))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
             try:
-                response = self.session.get(self.RAINFALL_API_URL, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                
-                records = data.get('records', [])
-                if not records:
-                    break
-                    
-                all_records.extend(records)
-                
-                if len(records) < batch_size:
-                    break
-                    
-                offset += batch_size
-                time.sleep(0.3)
-                
-            except Exception as e:
-                print(f"Error: {e}")
-                break
-        
-        if all_records:
-            df = pd.DataFrame(all_records)
-            print(f"✓ Rainfall data: {len(df)} records")
-            return df
-        return None
+                for offset in islice(offsets, self.max_workers):
+                    submit(pool, offset)
+                while pending:
+                    size, future = pending.popleft()
+                    try:
+                        page = future.result().get('records', [])
+                    except Exception as e:
+                        print(f"Error: {e}")
+                        status.update(partial=True, error=repr(e))
+                        return
+                    if not page:
+                        return
+                    yield page
+                    if len(page) < size:
+                        return
+                    offset = next(offsets, None)
+                    if offset is not None:
+                        submit(pool, offset)
+            finally:
+                for _, future in pending:
+                    future.cancel()
 
 
 # Test both APIs
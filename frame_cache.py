@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import pandas as pd
+
+
+class FrameCache:
+    """Thread-safe in-memory LRU of fetched DataFrames, bounded by bytes.
+
+    Shared by every Streamlit session in the process, so a slice fetched for
+    one user is served from memory to the next. Cached frames are shared
+    objects: callers must treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(dataset: str, kwargs: dict) -> Hashable:
+        return (dataset, tuple(sorted((k, str(v)) for k, v in kwargs.items() if v is not None)))
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self.lock:
+            df = self.frames.get(key)
+            if df is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def contains(self, key: Hashable) -> bool:
+        """Membership test for planning: touches neither LRU order nor hit stats"""
+        with self.lock:
+            return key in self.frames
+
+    def put(self, key: Hashable, df: Optional[pd.DataFrame]):
+        """Store a frame; frames larger than the whole budget are skipped"""
+        if df is None:
+            return
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.frames:
+                self.total_bytes -= self.sizes.pop(key)
+                del self.frames[key]
+            self.frames[key] = df
+            self.sizes[key] = size
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                old_key, _ = self.frames.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(old_key)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.frames),
+                "bytes": self.total_bytes,
+            }
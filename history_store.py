@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+
+from tracing import breakdown
+
+# Answers a session keeps in memory before older ones move to disk
+HISTORY_SIZE = int(os.getenv("SAMARTH_HISTORY_SIZE", "20"))
+ANALYSIS_FIELDS = ("query_type", "states", "crops", "districts", "seasons", "years", "year_range", "last_n")
+
+
+def compact(result: dict) -> dict:
+    """The parts of an answer_question result worth keeping once it is shown.
+
+    The live answer stream, late-data futures and span list are dropped.
+    Data is referenced by the fetch jobs (frame cache keys) and trace id
+    the answer was built from, never copied; timing is kept as the small
+    per-stage breakdown.
+    """
+    analysis = result["analysis"]
+    return {
+        "question": result["question"],
+        "answer": result.get("answer") or "",
+        "sources": list(result.get("sources", [])),
+        "partial": bool(result.get("partial")),
+        "analysis": {field: analysis.get(field) for field in ANALYSIS_FIELDS},
+        "late_appendix": [list(entry) for entry in result.get("late_appendix", [])],
+        "jobs": result.get("jobs", []),
+        "trace_id": result.get("trace_id"),
+        "timing": breakdown(result.get("trace") or []),
+        "asked": time.time(),
+    }
+
+
+class HistoryStore:
+    """On-disk archive of answered questions, shared by every session.
+
+    Records are JSON rows keyed by session id. Each session keeps at most
+    `max_per_session` rows (oldest dropped first), and rows of sessions
+    idle for longer than `ttl` are removed when the store is opened.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "history.sqlite")
+
+    def __init__(self, path: Optional[str] = None, max_per_session: int = 500,
+                 ttl: float = 7 * 24 * 3600):
+        self.path = path or self.DEFAULT_PATH
+        self.max_per_session = max_per_session
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT, record TEXT, created REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_session ON entries (session, id)")
+        self.conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - ttl,))
+
+    # ------------------------------------------------------------------
+    def append(self, session: str, record: dict):
+        """Archive one record as the session's newest, trimming its oldest"""
+        payload = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.conn.execute("INSERT INTO entries (session, record, created) VALUES (?, ?, ?)",
+                              (session, payload, time.time()))
+            self.conn.execute(
+                "DELETE FROM entries WHERE session = ? AND id NOT IN"
+                " (SELECT id FROM entries WHERE session = ? ORDER BY id DESC LIMIT ?)",
+                (session, session, self.max_per_session),
+            )
+
+    def page(self, session: str, offset: int, limit: int) -> List[dict]:
+        """Records `offset` .. `offset + limit` of a session, newest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT record FROM entries WHERE session = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (session, limit, offset),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, session: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries WHERE session = ?", (session,)).fetchone()[0]
+
+    def clear(self, session: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM entries WHERE session = ?", (session,))
+
+
+class SessionHistory:
+    """One session's answers, newest first, with bounded memory.
+
+    The newest `max_entries` compact records stay in memory; older ones
+    move to the shared HistoryStore (or are dropped without one). Pages
+    are read on demand, so the cost of showing history depends on the
+    page size, not on how many questions the session has asked.
+    """
+
+    def __init__(self, store: Optional[HistoryStore] = None, max_entries: int = HISTORY_SIZE,
+                 session_id: Optional[str] = None):
+        self.store = store
+        self.max_entries = max(1, max_entries)
+        self.session_id = session_id or uuid.uuid4().hex
+        self.recent: deque = deque()
+        self.archived = 0
+
+    def add(self, result: dict) -> dict:
+        """Compact a shown result and make it the newest entry"""
+        record = compact(result)
+        self.recent.appendleft(record)
+        while len(self.recent) > self.max_entries:
+            oldest = self.recent.pop()
+            if self.store is not None:
+                self.store.append(self.session_id, oldest)
+                self.archived = min(self.archived + 1, self.store.max_per_session)
+        return record
+
+    def latest(self) -> Optional[dict]:
+        return self.recent[0] if self.recent else None
+
+    def __len__(self) -> int:
+        return len(self.recent) + self.archived
+
+    def pages(self, size: int) -> int:
+        return max(1, -(-len(self) // size))
+
+    def page(self, number: int, size: int, skip: int = 0) -> List[dict]:
+        """Entries on page `number` (0 = newest) after the first `skip`, from memory then disk"""
+        start = skip + number * size
+        end = start + size
+        records = list(islice(self.recent, start, end))
+        if end > len(self.recent) and self.archived:
+            offset = max(0, start - len(self.recent))
+            records += self.store.page(self.session_id, offset, end - start - len(records))
+        return records
+
+    def clear(self):
+        self.recent.clear()
+        self.archived = 0
+        if self.store is not None:
+            self.store.clear(self.session_id)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    store = HistoryStore(os.path.join(tempfile.mkdtemp(), "history.sqlite"))
+    history = SessionHistory(store, max_entries=5)
+    analysis = {"query_type": "comparison", "states": ["Punjab"], "crops": ["Rice"], "years": [2014]}
+    for i in range(1000):
+        history.add({"question": f"Question {i}", "answer": "x" * 2000, "sources": ["crop_data"],
+                     "analysis": analysis, "trace": [{"name": "llm", "duration_ms": 1.0}]})
+
+    for number in (0, 1, 50, history.pages(5) - 1):
+        start = time.perf_counter()
+        questions = [r["question"] for r in history.page(number, 5)]
+        print(f"page {number}: {questions} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+    print(f"{len(history)} entries: {len(history.recent)} in memory, {store.count(history.session_id)} on disk")
@@ -0,0 +1,122 @@
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Llama 3 tokenizes most English words as one token (long names as several),
+# digits in groups of up to three and punctuation/newlines one each.
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|\n|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Llama 3 token count, without loading a tokenizer"""
+    return sum(math.ceil(len(piece) / 6) if piece[0].isalpha() else 1
+               for piece in _PIECES.findall(text))
+
+
+def table(columns: Sequence[str], rows: Sequence[Sequence[object]]) -> Tuple[str, List[str]]:
+    """Header and rows of a pipe-separated table (far fewer tokens than prose)"""
+    return "|".join(columns), ["|".join(str(value) for value in row) for row in rows]
+
+
+class Section:
+    """A titled block of summary lines, ranked against the prompt budget.
+
+    `rows` are ordered most relevant first; if the section does not fit,
+    trailing rows are cut and replaced by a count of what was left out.
+    With `keep="ends"` the middle is cut instead, for chronological series
+    whose first and last years matter most.
+    """
+
+    def __init__(self, key: str, title: str, rows: Sequence[str], header: Sequence[str] = (),
+                 keep: str = "head", min_rows: int = 1):
+        self.key = key
+        self.title = title
+        self.rows = list(rows)
+        self.header = list(header)
+        self.keep = keep
+        self.min_rows = min(min_rows, len(self.rows))
+
+    def render(self, n: Optional[int] = None) -> str:
+        rows = self.rows
+        if n is not None and n < len(rows):
+            cut = len(rows) - n
+            if self.keep == "ends":
+                head = (n + 1) // 2
+                rows = rows[:head] + [f"… {cut} {'row' if cut == 1 else 'rows'} omitted"] + rows[len(rows) - (n - head):]
+            else:
+                rows = rows[:n] + [f"… {cut} more {'row' if cut == 1 else 'rows'} omitted"]
+        return "\n".join([self.title] + self.header + rows)
+
+    def fit(self, budget: int) -> Optional[str]:
+        """Longest rendering within `budget` tokens, or None if even the minimum is over"""
+        text = self.render()
+        if estimate_tokens(text) <= budget:
+            return text
+        low, high, best = self.min_rows, len(self.rows) - 1, None
+        while low <= high:
+            mid = (low + high) // 2
+            text = self.render(mid)
+            if estimate_tokens(text) <= budget:
+                best, low = text, mid + 1
+            else:
+                high = mid - 1
+        return best
+
+
+def fit_sections(sections: List[Section], budget: int) -> Tuple[str, Dict[str, object]]:
+    """Fill `budget` tokens with `sections`, most relevant (first) first.
+
+    Sections that do not fit even at their minimum size are dropped and
+    named on a closing line, which is not counted against the budget.
+    Returns the summary and stats: its token estimate, that of the full
+    untruncated summary, the tokens saved and which sections were cut.
+    """
+    full = "\n\n".join(section.render() for section in sections)
+    parts, truncated, omitted = [], [], []
+    remaining = budget
+    for section in sections:
+        text = section.fit(remaining)
+        if text is None:
+            omitted.append(section.key)
+            continue
+        if text != section.render():
+            truncated.append(section.key)
+        parts.append(text)
+        remaining -= estimate_tokens(text) + 2  # blank line between sections
+    if omitted:
+        parts.append("Omitted for length: " + ", ".join(key.replace("_", " ") for key in omitted))
+    summary = "\n\n".join(parts)
+    tokens, full_tokens = estimate_tokens(summary), estimate_tokens(full)
+    return summary, {
+        "budget": budget,
+        "tokens": tokens,
+        "full_tokens": full_tokens,
+        "saved": max(0, full_tokens - tokens),
+        "truncated": truncated,
+        "omitted": omitted,
+    }
+
+
+def compact_sources(sources: Sequence[str]) -> List[str]:
+    """One line per API: "Name: slice; slice" instead of repeating the name"""
+    grouped: Dict[str, List[str]] = {}
+    for source in sources:
+        name, _, detail = source.partition(" - ")
+        grouped.setdefault(name, [])
+        if detail:
+            grouped[name].append(detail)
+    return [f"{name}: {'; '.join(details)}" if details else name for name, details in grouped.items()]
+
+
+if __name__ == "__main__":
+    rows = [f"D{i}|{1000 * (40 - i):,}" for i in range(40)]
+    header, _ = table(["district", "production_t"], [])
+    sections = [
+        Section("overview", "Overview:", ["- Records: 1,200", "- States: Punjab, Haryana"]),
+        Section("districts", "Districts by production (tonnes):", rows, [header]),
+        Section("years", "Production by year:", [f"{2000 + i}|{i * 100}" for i in range(15)],
+                ["year|production_t"], keep="ends"),
+    ]
+    for budget in (1000, 150, 60):
+        summary, stats = fit_sections(sections, budget)
+        print(f"\n--- budget {budget}: {stats}\n{summary}")
@@ -1,97 +1,263 @@
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+
+class EntityMatcher:
+    """Single-pass matcher for every entity kind in a query.
+
+    All vocabulary terms are folded into one trie-shaped regex, so a scan
+    costs roughly the query length regardless of vocabulary size, and every
+    term is anchored on word boundaries ("Gram" no longer matches "Program").
+    Years, year ranges ("2010 to 2014", "between 2010 and 2014") and
+    "last N years" are matched by the same pattern.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Dict[str, str]]):
+        # vocabulary: kind -> {surface form: canonical value}
+        self.lookup: Dict[str, Tuple[str, str]] = {}
+        for kind, terms in vocabulary.items():
+            for surface, canonical in terms.items():
+                key = self._normalize(surface)
+                if key and key not in self.lookup:
+                    self.lookup[key] = (kind, canonical)
+
+        self.pattern = re.compile(
+            r"(?<!\w)(?:"
+            r"(?P<last_n>last\s+(?P<n>\d+)\s+years?)"
+            r"|(?:from\s+)?(?P<start>(?:19|20)\d{2})\s*(?:-|–|to|till|until|through)\s*(?P<end>(?:19|20)\d{2})"
+            r"|between\s+(?P<since>(?:19|20)\d{2})\s+and\s+(?P<until>(?:19|20)\d{2})"
+            r"|(?P<year>(?:19|20)\d{2})"
+            r"|(?P<term>" + self._trie_regex(self.lookup.keys()) + r")"
+            r")(?!\w)"
+        )
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text.strip().lower())
+
+    @classmethod
+    def _trie_regex(cls, words) -> str:
+        trie: dict = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        return cls._render(trie) or "(?!)"
+
+    @classmethod
+    def _render(cls, node: dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + cls._render(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # Greedy optional tail: the longest term at a position wins
+            return "(?:" + body + ")?" if len(branches) == 1 else body + "?"
+        return body
+
+    def scan(self, query: str) -> List[Tuple[str, object]]:
+        """Return (kind, value) pairs in order of appearance"""
+        found = []
+        for match in self.pattern.finditer(self._normalize(query)):
+            if match.group("last_n"):
+                found.append(("last_n", int(match.group("n"))))
+            elif match.group("start") or match.group("since"):
+                bounds = [int(match.group(g)) for g in ("start", "end", "since", "until") if match.group(g)]
+                found.append(("year_range", (min(bounds), max(bounds))))
+            elif match.group("year"):
+                found.append(("year", int(match.group("year"))))
+            else:
+                found.append(self.lookup[match.group("term")])
+        return found
+
 
 class QueryAnalyzer:
     """Analyzes user questions to extract parameters"""
-    
+
     INDIAN_STATES = [
-        "Punjab", "Haryana", "Uttar Pradesh", "Madhya Pradesh", 
+        "Punjab", "Haryana", "Uttar Pradesh", "Madhya Pradesh",
         "Karnataka", "Bihar", "Assam", "Odisha", "Tamil Nadu",
         "Maharashtra", "Rajasthan", "Chhattisgarh", "Andhra Pradesh",
-        "West Bengal", "Gujarat", "Telangana", "Kerala"
+        "West Bengal", "Gujarat", "Telangana", "Kerala",
+        "Arunachal Pradesh", "Goa", "Himachal Pradesh", "Jharkhand",
+        "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Sikkim",
+        "Tripura", "Uttarakhand", "Andaman and Nicobar Islands",
+        "Chandigarh", "Dadra and Nagar Haveli", "Daman and Diu",
+        "Delhi", "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry"
     ]
-    
+
     COMMON_CROPS = [
         "Rice", "Wheat", "Sugarcane", "Cotton", "Maize", "Bajra",
         "Jowar", "Gram", "Tur", "Groundnut", "Soyabean", "Sunflower"
     ]
-    
+
+    SEASONS = ["Kharif", "Rabi", "Whole Year", "Summer", "Winter", "Autumn"]
+
+    # Checked in this order; the first intent found decides the query type.
+    # Matched as whole words, so inflections are listed explicitly.
+    INTENT_KEYWORDS = {
+        'comparison': ['compare', 'compared', 'comparing', 'comparison', 'versus', 'vs'],
+        'trend': ['trend', 'trends', 'over time', 'decade', 'decades', 'years'],
+        'ranking': ['highest', 'lowest', 'maximum', 'minimum', 'top', 'bottom'],
+        'correlation': ['correlate', 'correlates', 'correlation', 'relationship',
+                        'impact', 'impacts', 'affect', 'affects', 'affected'],
+    }
+    ASCENDING_WORDS = {'lowest', 'minimum', 'bottom'}
+
+    def __init__(self, vocabulary: Optional[Dict[str, List[str]]] = None):
+        """Build the matcher from `vocabulary` (kind -> names), or from the
+        local crop snapshot when one exists, on top of the built-in lists."""
+        if vocabulary is None:
+            vocabulary = self.load_vocabulary()
+
+        # Dataset spellings come first so they win as canonical filter values
+        states = list(vocabulary.get('states', [])) + list(self.INDIAN_STATES)
+        crops = list(vocabulary.get('crops', [])) + list(self.COMMON_CROPS)
+        seasons = list(vocabulary.get('seasons', [])) + list(self.SEASONS)
+        districts = list(vocabulary.get('districts', []))
+
+        self.matcher = EntityMatcher({
+            'state': {name: name for name in states},
+            'crop': self._with_aliases(crops),
+            'season': {name: name for name in seasons},
+            'district': {name: name for name in districts},
+            'intent': {word: (query_type, word)
+                       for query_type, words in self.INTENT_KEYWORDS.items()
+                       for word in words},
+        })
+
+    @staticmethod
+    def load_vocabulary() -> Dict[str, List[str]]:
+        """Read state/district/crop/season names from the crop snapshot"""
+        from snapshot_store import CropSnapshotStore
+
+        store = CropSnapshotStore()
+        if not store.exists():
+            return {}
+        return store.vocabulary()
+
+    @staticmethod
+    def _with_aliases(names: List[str]) -> Dict[str, str]:
+        """Map dataset names like 'Arhar/Tur' or 'Moong(Green Gram)' to
+        each of their parts as well as the full name."""
+        terms = {}
+        for name in names:
+            terms.setdefault(name, name)
+            for part in re.split(r"[/()]", name):
+                if part.strip():
+                    terms.setdefault(part.strip(), name)
+        return terms
+
+    @staticmethod
+    def _collect(matches: List[Tuple[str, object]], kind: str) -> List:
+        found = []
+        for match_kind, value in matches:
+            if match_kind == kind and value not in found:
+                found.append(value)
+        return found
+
+    def _scan(self, query: str, kind: str) -> List:
+        return self._collect(self.matcher.scan(query), kind)
+
     def extract_states(self, query: str) -> List[str]:
         """Extract state names from query"""
-        query_upper = query.title()
-        found_states = []
-        
-        for state in self.INDIAN_STATES:
-            if state.lower() in query.lower():
-                found_states.append(state)
-        
-        return found_states
-    
+        return self._scan(query, 'state')
+
     def extract_crops(self, query: str) -> List[str]:
         """Extract crop names from query"""
-        query_lower = query.lower()
-        found_crops = []
-        
-        for crop in self.COMMON_CROPS:
-            if crop.lower() in query_lower:
-                found_crops.append(crop)
-        
-        return found_crops
-    
+        return self._scan(query, 'crop')
+
+    def extract_districts(self, query: str) -> List[str]:
+        """Extract district names from query"""
+        return self._scan(query, 'district')
+
+    def extract_seasons(self, query: str) -> List[str]:
+        """Extract crop seasons from query"""
+        return self._scan(query, 'season')
+
     def extract_years(self, query: str) -> List[int]:
         """Extract years from query"""
-        # Find 4-digit years
-        years = re.findall(r'\b(19\d{2}|20\d{2})\b', query)
-        
-        # Handle "last N years"
-        last_n = re.search(r'last (\d+) years?', query.lower())
-        if last_n:
-            n = int(last_n.group(1))
-            current_year = 2023  # Latest data year
-            years = list(range(current_year - n + 1, current_year + 1))
-        
-        return [int(y) for y in years] if isinstance(years, list) and years and isinstance(years[0], str) else years
-    
+        return self._years(self.matcher.scan(query))
+
+    @staticmethod
+    def _years(matches: List[Tuple[str, object]]) -> List[int]:
+        """Years named in the query; range endpoints are included as named"""
+        years = []
+        for kind, value in matches:
+            if kind == 'year':
+                years.append(value)
+            elif kind == 'year_range':
+                years.extend(value)
+        return years
+
+    @staticmethod
+    def _last_n(matches: List[Tuple[str, object]]) -> Optional[int]:
+        """N of "last N years"; which years those are depends on each dataset's coverage"""
+        counts = [value for kind, value in matches if kind == 'last_n']
+        return counts[0] if counts else None
+
+    @staticmethod
+    def _year_range(matches: List[Tuple[str, object]]) -> Optional[Tuple[int, int]]:
+        """(first, last) of the first explicit year range in the query"""
+        ranges = [value for kind, value in matches if kind == 'year_range']
+        return ranges[0] if ranges else None
+
     def determine_query_type(self, query: str) -> str:
         """Determine the type of query"""
-        query_lower = query.lower()
-        
-        if any(word in query_lower for word in ['compare', 'comparison', 'versus', 'vs']):
-            return 'comparison'
-        elif any(word in query_lower for word in ['trend', 'over time', 'decade', 'years']):
-            return 'trend'
-        elif any(word in query_lower for word in ['highest', 'lowest', 'maximum', 'minimum', 'top', 'bottom']):
-            return 'ranking'
-        elif any(word in query_lower for word in ['correlate', 'relationship', 'impact', 'affect']):
-            return 'correlation'
-        else:
-            return 'general'
-    
+        return self._query_type(self.matcher.scan(query))
+
+    def _query_type(self, matches: List[Tuple[str, object]]) -> str:
+        intents = {value[0] for kind, value in matches if kind == 'intent'}
+        # "last N years" counts as a trend cue, as the bare word "years" does
+        if any(kind == 'last_n' for kind, _ in matches):
+            intents.add('trend')
+        for query_type in self.INTENT_KEYWORDS:
+            if query_type in intents:
+                return query_type
+        return 'general'
+
+    def _ranking_order(self, matches: List[Tuple[str, object]], query_type: str) -> Optional[str]:
+        """'asc' for lowest/minimum/bottom questions, 'desc' for other rankings"""
+        if query_type != 'ranking':
+            return None
+        words = {value[1] for kind, value in matches if kind == 'intent'}
+        return 'asc' if words & self.ASCENDING_WORDS else 'desc'
+
     def analyze(self, query: str) -> Dict:
-        """Analyze query and extract all parameters"""
+        """Analyze query and extract all parameters in a single scan"""
+        matches = self.matcher.scan(query)
+        query_type = self._query_type(matches)
         return {
             'original_query': query,
-            'query_type': self.determine_query_type(query),
-            'states': self.extract_states(query),
-            'crops': self.extract_crops(query),
-            'years': self.extract_years(query)
+            'query_type': query_type,
+            'ranking_order': self._ranking_order(matches, query_type),
+            'states': self._collect(matches, 'state'),
+            'crops': self._collect(matches, 'crop'),
+            'districts': self._collect(matches, 'district'),
+            'seasons': self._collect(matches, 'season'),
+            'years': self._years(matches),
+            'year_range': self._year_range(matches),
+            'last_n': self._last_n(matches),
         }
 
 
 # Test it
 if __name__ == "__main__":
     analyzer = QueryAnalyzer()
-    
+
     test_queries = [
         "Compare rainfall in Punjab and Kerala for last 5 years",
         "What is the rice production trend in Tamil Nadu from 2015 to 2020?",
         "Which district in Maharashtra has highest wheat production in 2021?"
     ]
-    
+
     for query in test_queries:
         print(f"\nQuery: {query}")
         result = analyzer.analyze(query)
         print(f"Type: {result['query_type']}")
         print(f"States: {result['states']}")
         print(f"Crops: {result['crops']}")
-        print(f"Years: {result['years']}")
\ No newline at end of file
+        print(f"Years: {result['years']} (range {result['year_range']}, last {result['last_n']})")
@@ -0,0 +1,338 @@
+import datetime
+import itertools
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+def last_complete_year(newest: datetime.date) -> int:
+    """Latest year every day of which is in, given the newest day there is"""
+    return newest.year if (newest.month, newest.day) == (12, 31) else newest.year - 1
+
+
+# Years each table covers when no local copy says otherwise: the crop table
+# is frozen, the rainfall table grows daily from 2018, so its current year
+# is still incomplete and is not counted
+DEFAULT_COVERAGE = {
+    "crop_data": (1997, 2014),
+    "rainfall_data": (2018, last_complete_year(datetime.date.today())),
+}
+# Rainfall year fetched when a question names none
+DEFAULT_RAIN_YEAR = 2020
+# Words that make rainfall required for a crop question
+RAIN_WORDS = ("rain", "monsoon", "precipitation")
+
+
+def mentions_rain(analysis: dict) -> bool:
+    """True if the question itself asks about rainfall"""
+    query = analysis.get("original_query", "").lower()
+    return any(word in query for word in RAIN_WORDS)
+
+
+def _year_label(years: List[int]) -> str:
+    years = sorted(years)
+    if len(years) > 2 and years == list(range(years[0], years[-1] + 1)):
+        return f"{years[0]}-{years[-1]}"
+    return ", ".join(map(str, years))
+
+
+def _count(n: int, noun: str) -> str:
+    return f"{n} {noun}{'' if n == 1 else 's'}"
+
+
+def isin(series: pd.Series, values: list) -> pd.Series:
+    """Row mask for `values`, matching names case-insensitively as the API filters do"""
+    if isinstance(values[0], str):
+        wanted = {str(v).strip().lower() for v in values}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            return series.isin(categories[categories.astype(str).str.lower().isin(wanted)])
+        return series.astype(str).str.strip().str.lower().isin(wanted)
+    return series.isin(values)
+
+
+class PlannedRequest:
+    """One fetch job of a plan, plus the local filter narrowing its rows.
+
+    `kwargs` are sent to the fetcher as they are; dimensions left as None are
+    fetched whole and cut down to `local` (dimension -> wanted values) once
+    the frame arrives. `rows` is the estimate of rows fetched, and
+    `truncated` is set when the estimate exceeds the limit; the fetched
+    frame's own `truncated` attr, from the API's total, overrides it.
+    `status` is "cached", "local" or "api".
+    """
+
+    def __init__(self, dataset: str, kwargs: dict, local: Dict[str, list],
+                 rows: int, truncated: bool, pages: int, status: str, needs: int, source: str):
+        self.dataset = dataset
+        self.kwargs = kwargs
+        self.local = local
+        self.rows = rows
+        self.truncated = truncated
+        self.pages = pages
+        self.status = status
+        self.needs = needs
+        self.source = source
+
+    @property
+    def job(self) -> tuple:
+        return self.dataset, self.kwargs, self.source
+
+    @property
+    def round_trips(self) -> int:
+        return self.pages if self.status == "api" else 0
+
+    def select(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Keep only the rows the question asked for"""
+        if df is None or not self.local:
+            return df
+        columns = QueryPlanner.DATASETS[self.dataset]["columns"]
+        mask = pd.Series(True, index=df.index)
+        for dim, values in self.local.items():
+            column = columns[dim]
+            if column in df.columns:
+                mask &= isin(df[column], values)
+        return df[mask]
+
+    def describe(self) -> str:
+        fixed = " ".join(f"{dim}={value if value is not None else '*'}"
+                         for dim, value in self.kwargs.items() if dim != "limit")
+        line = f"  {self.dataset:<14} {fixed}"
+        if self.local:
+            kept = "; ".join(f"{dim} in {_year_label(v) if dim == 'year' else ', '.join(v)}"
+                             for dim, v in self.local.items())
+            line += f" | keep {kept}"
+        if self.status == "api":
+            line += f" | ~{self.rows:,} rows, {_count(self.pages, 'page')}"
+            if self.truncated:
+                line += " | truncated by limit"
+        else:
+            line += f" | {self.status}"
+        if self.needs > 1:
+            line += f" | covers {self.needs} slices"
+        return line
+
+
+class FetchPlan:
+    """The requests chosen for one question and what they will cost"""
+
+    def __init__(self, requests: List[PlannedRequest]):
+        self.requests = requests
+
+    @property
+    def jobs(self) -> List[tuple]:
+        return [request.job for request in self.requests]
+
+    @property
+    def estimated_requests(self) -> int:
+        """API round trips (pages) the plan is expected to send"""
+        return sum(request.round_trips for request in self.requests)
+
+    def explain(self) -> str:
+        served = sum(request.status != "api" for request in self.requests)
+        slices = sum(request.needs for request in self.requests)
+        lines = [f"Fetch plan: {_count(len(self.requests), 'job')} for {_count(slices, 'slice')}, "
+                 f"~{_count(self.estimated_requests, 'API request')} "
+                 f"({served} served from cache or local data)"]
+        lines.extend(request.describe() for request in self.requests)
+        return "\n".join(lines)
+
+
+class QueryPlanner:
+    """Turn a QueryAnalyzer result into a minimal fetch plan.
+
+    The question needs one slice per combination of its states, crops and
+    years. For each dataset every way of covering them is costed: a
+    dimension is either split into one filtered request per value, or
+    dropped from the request and filtered locally. Costs are estimated API
+    pages, with requests the caches or local stores can serve costing
+    nothing; the cheapest plan wins, and among equal costs the one
+    reading fewest rows. A dimension is only dropped if the broader request
+    fits its row limit, so local filtering never works on a truncated
+    frame. Questions over a dataset's whole history (correlations, trends
+    naming no years) ask for every covered year, so they get one bulk
+    request when it fits the limit and one bulk request per year otherwise.
+    """
+
+    DATASETS = {
+        "crop_data": {
+            "dims": ("state", "crop", "year"),
+            "columns": {"state": "state_name", "crop": "crop", "year": "crop_year"},
+            # Rough rows per state/crop/year and the growth when a filter is dropped
+            "cell_rows": 60,
+            "spread": {"state": 20, "crop": 40, "year": 18},
+            "limit": 200,
+            "bulk_limit": 20000,
+            "source": "Crop Production API (data.gov.in)",
+            "all": {"state": "all states", "crop": "all crops", "year": "all years"},
+        },
+        "rainfall_data": {
+            "dims": ("state", "year"),
+            "columns": {"state": "State", "year": "Year"},
+            "cell_rows": 11000,  # ~30 districts x 365 days
+            "spread": {"state": 30, "year": 10},
+            "limit": 300,
+            # Room for a whole state-year, so every year is fetched uncut
+            "bulk_limit": 12000,
+            "source": "Daily District Rainfall API (data.gov.in)",
+            "all": {"state": "all states", "year": "all years"},
+        },
+    }
+
+    def __init__(self,
+                 batch_size: int = 1000,
+                 is_cached: Optional[Callable[[str, dict], bool]] = None,
+                 is_local: Optional[Callable[[str, dict], bool]] = None,
+                 coverage: Optional[Callable[[str], Tuple[int, int]]] = None):
+        self.batch_size = batch_size
+        self.is_cached = is_cached or (lambda dataset, kwargs: False)
+        self.is_local = is_local or (lambda dataset, kwargs: False)
+        self.coverage = coverage or DEFAULT_COVERAGE.get
+
+    # ------------------------------------------------------------------
+    def years(self, analysis: dict, dataset: str) -> List[int]:
+        """Every year of `dataset` the question covers.
+
+        Ranges are expanded and "last N years" counts back from the
+        dataset's last covered year. Years the dataset does not cover are
+        dropped; if that leaves no crop years they are clamped to the
+        table's nearest end instead, as the frozen table is the best answer
+        there is.
+        """
+        first, last = self.coverage(dataset)
+        years = list(analysis.get("years") or [])
+        if analysis.get("year_range"):
+            lo, hi = analysis["year_range"]
+            years.extend(range(lo, hi + 1))
+        if analysis.get("last_n"):
+            years.extend(range(last - analysis["last_n"] + 1, last + 1))
+        covered = sorted({year for year in years if first <= year <= last})
+        if dataset == "crop_data" and not covered:
+            return sorted({min(max(year, first), last) for year in years})
+        return covered
+
+    def history(self, analysis: dict) -> List[str]:
+        """Datasets the question needs every covered year of.
+
+        Correlations, and trends naming no years, need every year rather
+        than one; a crop trend only needs the crop history.
+        """
+        asked = bool(analysis.get("years") or analysis.get("year_range") or analysis.get("last_n"))
+        correlation = analysis["query_type"] == "correlation"
+        history = correlation or analysis["query_type"] == "trend" and not asked
+        datasets = ["crop_data"] if history else []
+        if correlation or history and not analysis["crops"]:
+            datasets.append("rainfall_data")
+        return datasets
+
+    def needs(self, analysis: dict) -> Dict[str, Dict[str, list]]:
+        """dataset -> dimension -> values; [None] means every value, unfiltered"""
+        states = analysis["states"]
+        crops = analysis["crops"]
+        asked = bool(analysis.get("years") or analysis.get("year_range") or analysis.get("last_n"))
+        history = self.history(analysis)
+
+        def every_year(dataset: str) -> List[int]:
+            first, last = self.coverage(dataset)
+            return list(range(first, last + 1))
+
+        needs = {}
+        # A cross-state ranking needs the crop in every state
+        if crops and (states or analysis["query_type"] == "ranking"):
+            crop_years = self.years(analysis, "crop_data") or [self.coverage("crop_data")[1]]
+            needs["crop_data"] = {
+                "state": states or [None],
+                "crop": crops,
+                "year": every_year("crop_data") if "crop_data" in history else crop_years,
+            }
+        rain_years = self.years(analysis, "rainfall_data")
+        # Named years the rainfall table does not cover need no request at all,
+        # and a crop trend only uses rainfall when the question asks about it
+        rain_history = "rainfall_data" in history
+        crop_trend = bool(crops) and analysis["query_type"] == "trend" and not mentions_rain(analysis)
+        if states and not crop_trend and (rain_history or rain_years or not asked):
+            first, last = self.coverage("rainfall_data")
+            needs["rainfall_data"] = {
+                "state": states,
+                "year": every_year("rainfall_data") if rain_history
+                else (rain_years or [min(max(DEFAULT_RAIN_YEAR, first), last)]),
+            }
+        return needs
+
+    def _request(self, dataset: str, kwargs: dict, local: Dict[str, list], needs: int,
+                 whole: bool = False) -> PlannedRequest:
+        """Cost one request.
+
+        The limit is sized from the estimated rows: slices that fit the
+        sampling limit use it, while `whole` slices and anything larger (a
+        dropped filter, or a state-year of daily rainfall) are read up to
+        the bulk limit, so only requests too big for even that are truncated.
+        """
+        spec = self.DATASETS[dataset]
+        rows = spec["cell_rows"]
+        for dim in spec["dims"]:
+            if kwargs[dim] is None:
+                rows *= spec["spread"][dim]
+        bulk = whole or rows > spec["limit"]
+        kwargs["limit"] = spec["bulk_limit"] if bulk else spec["limit"]
+        truncated = rows > kwargs["limit"]
+        rows = min(rows, kwargs["limit"])
+        pages = max(1, math.ceil(rows / self.batch_size))
+        status = ("cached" if self.is_cached(dataset, kwargs)
+                  else "local" if self.is_local(dataset, kwargs) else "api")
+
+        labels = []
+        for dim in spec["dims"]:
+            if dim in local:
+                values = local[dim]
+                labels.append(_year_label(values) if dim == "year" else ", ".join(values))
+            else:
+                labels.append(str(kwargs[dim]) if kwargs[dim] is not None else spec["all"][dim])
+        source = f"{spec['source']} - {', '.join(labels)}"
+        return PlannedRequest(dataset, kwargs, local, rows, truncated, pages, status, needs, source)
+
+    def _candidates(self, dataset: str, need: Dict[str, list], whole: bool = False):
+        """Every split/drop choice over the dimensions with concrete values"""
+        spec = self.DATASETS[dataset]
+        concrete = [dim for dim in spec["dims"] if need[dim] != [None]]
+        for dropped in itertools.product((False, True), repeat=len(concrete)):
+            dropped = {dim for dim, drop in zip(concrete, dropped) if drop}
+            split = [need[dim] if dim not in dropped else [None] for dim in spec["dims"]]
+            local = {dim: need[dim] for dim in spec["dims"] if dim in dropped}
+            covered = math.prod(len(need[dim]) for dim in dropped) if dropped else 1
+            requests = [self._request(dataset, dict(zip(spec["dims"], values)), local, covered, whole)
+                        for values in itertools.product(*split)]
+            # Dropping a filter is only safe if the broader request is not truncated
+            if dropped and any(r.truncated for r in requests):
+                continue
+            yield requests
+
+    def plan(self, analysis: dict) -> FetchPlan:
+        requests = []
+        history = self.history(analysis)
+        for dataset, need in self.needs(analysis).items():
+            requests.extend(min(
+                self._candidates(dataset, need, dataset in history),
+                key=lambda c: (sum(r.round_trips for r in c),
+                               sum(r.rows for r in c if r.status == "api"),
+                               len(c)),
+            ))
+        return FetchPlan(requests)
+
+
+if __name__ == "__main__":
+    from query_analyzer import QueryAnalyzer
+
+    analyzer = QueryAnalyzer(vocabulary={})
+    planner = QueryPlanner()
+    for question in [
+        "Compare rice production in Punjab and Tamil Nadu for 2013",
+        "What is the wheat production trend in Haryana from 2005 to 2014?",
+        "Compare rice, wheat and maize production in Punjab, Haryana and Bihar in 2010",
+        "Which state has the lowest maize production in 2010?",
+        "How does rainfall affect cotton production in Maharashtra?",
+        "Wheat production trend in Haryana over the last 5 years",
+        "Rainfall trend in Kerala",
+    ]:
+        print(f"\n{question}\n{planner.plan(analyzer.analyze(question)).explain()}")
@@ -0,0 +1,171 @@
+import calendar
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Calendar months of each crop season, as the crop table spells them, plus
+# the southwest monsoon. Seasons running into the next calendar year (Rabi,
+# Winter) belong to the crop year they start in: January-March 2011 rain
+# counts towards Rabi 2010.
+SEASON_MONTHS: Dict[str, Tuple[int, ...]] = {
+    "Kharif": (6, 7, 8, 9, 10),
+    "Rabi": (11, 12, 1, 2, 3),
+    "Autumn": (6, 7, 8, 9),
+    "Summer": (3, 4, 5, 6),
+    "Winter": (11, 12, 1, 2),
+    "Whole Year": tuple(range(1, 13)),
+    "Monsoon": (6, 7, 8, 9),
+}
+ANNUAL = "Whole Year"
+
+KEYS = ["State", "District"]
+# Below this share of a period's days reported, its totals are not stated:
+# scaling up from so few days says more about the gaps than the rain
+MIN_COVERAGE = 0.25
+
+
+def _season_table() -> pd.DataFrame:
+    """Month -> (season, year offset, days in month) membership rows"""
+    rows = []
+    for season, months in SEASON_MONTHS.items():
+        for month in months:
+            # Months before the season's first month are in the following calendar year
+            rows.append((month, season, -1 if month < months[0] else 0))
+    table = pd.DataFrame(rows, columns=["Month", "Season", "offset"])
+    table["Month"] = table["Month"].astype("int64")
+    return table
+
+
+SEASON_TABLE = _season_table()
+SEASON_DAYS = {season: sum(calendar.monthrange(2001, m)[1] for m in months)
+               for season, months in SEASON_MONTHS.items()}
+
+
+def names(series: pd.Series, upper: bool = False) -> np.ndarray:
+    """Stripped (optionally upper-cased) names; categoricals are mapped per category, not per row"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = series.cat.categories.astype(str).str.strip()
+        labels = (labels.str.upper() if upper else labels).to_numpy(dtype=object)
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, labels[codes], None)
+    stripped = series.astype("string").str.strip()
+    return (stripped.str.upper() if upper else stripped).to_numpy(dtype=object)
+
+
+def monthly(df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Rainfall sum (mm) and days reported per State x District x Year x Month.
+
+    Accepts raw daily rows (Avg_rainfall) and/or monthly rollup rows
+    (Avg_rainfall_sum with a `records` day count). Rows with no district
+    (state-level rollups) get District "".
+    """
+    columns = KEYS + ["Year", "Month", "rain_sum", "days"]
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columns)
+    sums = np.zeros(len(df))
+    days = np.zeros(len(df))
+    if "Avg_rainfall" in df.columns:
+        raw = df["Avg_rainfall"].to_numpy(dtype=float, na_value=np.nan)
+        sums = np.where(np.isnan(raw), 0.0, raw)
+        days = (~np.isnan(raw)).astype(float)
+    if "Avg_rainfall_sum" in df.columns:
+        rolled = df["Avg_rainfall_sum"].to_numpy(dtype=float, na_value=np.nan)
+        is_rolled = ~np.isnan(rolled)
+        sums = np.where(is_rolled, rolled, sums)
+        days = np.where(is_rolled, df["records"].to_numpy(dtype=float, na_value=0.0), days)
+    month = df["Month"] if "Month" in df.columns else pd.to_datetime(df["Date"], errors="coerce").dt.month
+    frame = pd.DataFrame({
+        "State": names(df["State"]),
+        "District": names(df["District"]) if "District" in df.columns else "",
+        "Year": df["Year"].to_numpy(dtype=float, na_value=np.nan),
+        "Month": month.to_numpy(dtype=float, na_value=np.nan),
+        "rain_sum": sums,
+        "days": days,
+    })
+    frame["District"] = frame["District"].fillna("")
+    frame = frame.dropna(subset=["State", "Year", "Month"])
+    out = frame.groupby(KEYS + ["Year", "Month"], sort=True)[["rain_sum", "days"]].sum().reset_index()
+    out[["Year", "Month"]] = out[["Year", "Month"]].astype("int64")
+    return out[out["days"] > 0].reset_index(drop=True)
+
+
+def seasonal(months: pd.DataFrame, seasons: Optional[List[str]] = None) -> pd.DataFrame:
+    """Season totals per State x District x season year from monthly() rows.
+
+    `mm` scales the mean daily rainfall to the season's full length, so a
+    season with missing days still compares with complete ones; `coverage`
+    is the share of the season's days actually reported.
+    """
+    table = SEASON_TABLE if seasons is None else SEASON_TABLE[SEASON_TABLE["Season"].isin(seasons)]
+    joined = months.merge(table, on="Month")
+    joined["Year"] = joined["Year"] + joined["offset"]
+    out = joined.groupby(KEYS + ["Year", "Season"], sort=True)[["rain_sum", "days"]].sum().reset_index()
+    length = out["Season"].map(SEASON_DAYS).astype(float)
+    out["mm"] = out["rain_sum"] / out["days"] * length
+    out["coverage"] = (out["days"] / length).clip(upper=1.0)
+    return out
+
+
+def annual(months: pd.DataFrame) -> pd.DataFrame:
+    """Calendar-year totals per State x District (see seasonal)"""
+    return seasonal(months, [ANNUAL]).drop(columns="Season")
+
+
+def by_state(table: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """District totals averaged per state: mm, coverage and districts reporting"""
+    return table.groupby(["State"] + by, sort=True).agg(
+        mm=("mm", "mean"), coverage=("coverage", "mean"), districts=("District", "nunique"),
+    ).reset_index()
+
+
+def crop_season_rainfall(crop_df: pd.DataFrame, seasons_table: pd.DataFrame) -> pd.DataFrame:
+    """Crop production per state x season next to that season's rainfall.
+
+    Matched on state, season and crop year where the datasets overlap;
+    where they share no years, each side's mean over its own years is used
+    and `matched` is False.
+    """
+    crops = pd.DataFrame({
+        "State": names(crop_df["state_name"], upper=True),
+        "Season": pd.Series(names(crop_df["season"])),
+        "Year": crop_df["crop_year"].to_numpy(dtype=float, na_value=np.nan),
+        "production": crop_df["production_"].to_numpy(dtype=float, na_value=np.nan),
+    }).dropna(subset=["Year"])
+    crops = crops.groupby(["State", "Season", "Year"], sort=False)["production"].sum().reset_index()
+    rain = by_state(seasons_table, ["Season", "Year"])
+    rain["State"] = rain["State"].str.upper()
+
+    matched = crops.merge(rain, on=["State", "Season", "Year"])
+    if len(matched):
+        out = matched.groupby(["State", "Season"], sort=True).agg(
+            production=("production", "mean"), mm=("mm", "mean"), years=("Year", "nunique"))
+        out["matched"] = True
+    else:
+        out = crops.groupby(["State", "Season"])["production"].mean().to_frame().join(
+            rain.groupby(["State", "Season"])["mm"].mean(), how="inner")
+        out["years"] = 0
+        out["matched"] = False
+    return out.reset_index()
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2018-01-01", "2021-12-31", freq="D")
+    districts = [f"D{i}" for i in range(100)]
+    daily = pd.DataFrame({
+        "State": np.repeat(["Punjab", "Kerala"], len(dates) * 50),
+        "District": np.repeat(districts, len(dates)),
+        "Date": np.tile(dates, len(districts)),
+        "Avg_rainfall": rng.gamma(0.5, 6.0, len(dates) * len(districts)).astype("float32"),
+    })
+    daily["Year"], daily["Month"] = daily["Date"].dt.year, daily["Date"].dt.month
+
+    start = time.perf_counter()
+    months = monthly(daily)
+    seasons = seasonal(months)
+    elapsed = time.perf_counter() - start
+    print(by_state(seasons[seasons["Season"].isin(["Monsoon", "Kharif", "Rabi"])], ["Season", "Year"]).to_string())
+    print(f"({len(daily):,} daily rows -> {len(months):,} monthly, {len(seasons):,} seasonal in {elapsed:.2f}s)")
@@ -0,0 +1,235 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from schemas import RAINFALL_SCHEMA, apply_schema, assemble_chunks, records_to_frame
+
+
+class RainfallStore:
+    """Local copy of the daily rainfall dataset, kept current by incremental sync.
+
+    Rows live in a Parquet dataset partitioned by State/Year. For each synced
+    state the manifest keeps a high-water mark: how many of the API's rows
+    for that state have been copied, the newest Date among them and when the
+    sync ran. A sync asks the API only for rows past that offset, so each run
+    downloads what was appended since the last one instead of the whole
+    history. Rows dated on or before the previous newest date are checked
+    against the copy, so a re-ordered page cannot create duplicates.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "rainfall_store")
+    PARTITION_COLS = ["State", "Year"]
+    KEY_COLS = ["District", "Date"]
+    MANIFEST = "_manifest.json"  # underscore keeps it out of dataset discovery
+    MAX_ROWS_PER_SYNC = 500000
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or self.DEFAULT_PATH
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, self.MANIFEST)
+
+    def manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"states": {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def watermark(self, state: str) -> Optional[dict]:
+        return self.manifest()["states"].get(state)
+
+    def has_state(self, state: Optional[str]) -> bool:
+        return bool(state) and self.watermark(state) is not None
+
+    def serves(self, state: Optional[str], year: Optional[int] = None) -> bool:
+        """True if the copy holds everything the API has for `state` and `year`.
+
+        That needs a completed sync, and a year that ended before the newest
+        synced day; the current year keeps growing upstream. A whole-history
+        read is served up to the newest synced day (see freshness).
+        """
+        mark = self.watermark(state) if state else None
+        if mark is None or not mark.get("complete") or not mark.get("max_date"):
+            return False
+        return year is None or int(year) < int(mark["max_date"][:4])
+
+    def freshness(self, state: Optional[str]) -> Optional[str]:
+        """Human-readable age of a state's local copy, for source listings"""
+        mark = self.watermark(state) if state else None
+        if mark is None:
+            return None
+        note = f"local copy synced {mark['synced_at'][:16].replace('T', ' ')}"
+        if mark.get("max_date"):
+            note += f", data through {mark['max_date'][:10]}"
+        return note
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def to_typed(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Schema types, with plain partition columns and no undated rows"""
+        df = apply_schema(df.copy(), RAINFALL_SCHEMA)
+        df["State"] = df["State"].astype(str)
+        df = df.dropna(subset=["Year", "Date"])
+        df["Year"] = df["Year"].astype("int16")
+        return df
+
+    def _append(self, df: pd.DataFrame):
+        # A fresh file name per batch: existing partition files are kept
+        df.to_parquet(self.path, engine="pyarrow", partition_cols=self.PARTITION_COLS, index=False,
+                      basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+                      existing_data_behavior="overwrite_or_ignore")
+
+    def _drop_state(self, state: str):
+        """Rewrite the dataset without one state (its upstream rows changed)"""
+        rest = self.query_frame([("State", "!=", state)])
+        manifest = self.manifest()
+        manifest["states"].pop(state, None)
+        shutil.rmtree(self.path, ignore_errors=True)
+        if rest is not None:
+            self._append(rest)
+        self._save_manifest(manifest)
+
+    def _unseen(self, state: str, df: pd.DataFrame, max_date: Optional[str]) -> pd.DataFrame:
+        """Drop rows already in the copy (only possible up to the old max date)"""
+        if not max_date:
+            return df
+        overlap = df["Date"] <= pd.Timestamp(max_date)
+        if not overlap.any():
+            return df
+        years = sorted(int(y) for y in df.loc[overlap, "Year"].unique())
+        existing = self.query_frame([("State", "=", state), ("Year", "in", years)], columns=self.KEY_COLS)
+        if existing is None:
+            return df
+        existing["District"] = existing["District"].astype(str)
+        keys = df[self.KEY_COLS].astype({"District": str})
+        seen = keys.merge(existing.drop_duplicates(), on=self.KEY_COLS, how="left", indicator=True)
+        return df[(seen["_merge"] == "left_only").to_numpy()]
+
+    # ------------------------------------------------------------------
+    def sync_state(self, api, state: str, rollups=None, max_rows: Optional[int] = None) -> int:
+        """Append the rows the API gained for `state` since its watermark.
+
+        `rollups` (a RollupStore) is fed exactly the appended rows. Returns
+        the number of new rows stored.
+        """
+        from data_handler import rainfall_filters
+
+        mark = self.watermark(state) or {"rows": 0, "max_date": None}
+        status: Dict[str, object] = {}
+        pages = api._iter_pages(api.RAINFALL_API_URL, rainfall_filters(state),
+                                max_rows or self.MAX_ROWS_PER_SYNC, status, start=mark["rows"])
+        chunks, fetched = [], 0
+        for records in pages:
+            fetched += len(records)
+            chunks.append(records_to_frame(records, RAINFALL_SCHEMA))
+
+        total = status.get("total") or 0
+        if status.get("partial") and not fetched and not total:
+            print(f"⚠️ Rainfall sync for {state} failed: {status.get('error')}")
+            return 0
+        if 0 < total < mark["rows"]:
+            # Upstream shrank: offsets no longer line up, start this state over
+            print(f"⚠️ {state}: API reports {total} rows, below watermark {mark['rows']}; re-syncing")
+            self._drop_state(state)
+            added = self.sync_state(api, state, None, max_rows)
+            if rollups is not None:
+                # The cube still holds the dropped rows, so rebuild it whole
+                rows = self.query_frame()
+                if rows is not None:
+                    rollups.build_rainfall(rows)
+            return added
+
+        new = assemble_chunks(chunks)
+        added = 0
+        if new is not None:
+            new = self._unseen(state, self.to_typed(new), mark.get("max_date"))
+            added = len(new)
+            if added:
+                self._append(new)
+                if rollups is not None:
+                    rollups.update_rainfall(new)
+
+        # Only contiguous pages are yielded, so the mark advances by exactly
+        # what was read even if a later page failed.
+        newest = mark.get("max_date")
+        if new is not None and added:
+            latest = new["Date"].max().strftime("%Y-%m-%d")
+            newest = max(newest, latest) if newest else latest
+        manifest = self.manifest()
+        manifest["states"][state] = {
+            "rows": mark["rows"] + fetched,
+            "total": total,
+            "max_date": newest,
+            "synced_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "complete": not status.get("partial") and mark["rows"] + fetched >= total,
+        }
+        self._save_manifest(manifest)
+        print(f"✓ Rainfall sync {state}: +{added} rows ({mark['rows'] + fetched}/{total})")
+        return added
+
+    def sync(self, api, states: Iterable[str], rollups=None) -> Dict[str, int]:
+        """Incrementally sync each state in turn"""
+        if rollups is not None and rollups.cube("rain_district") is None:
+            # Copies synced before the district/season cubes existed: backfill them once
+            rows = self.query_frame()
+            if rows is not None:
+                rollups.build_rainfall(rows)
+        return {state: self.sync_state(api, state, rollups) for state in states}
+
+    # ------------------------------------------------------------------
+    def query_frame(self, filters: Optional[List[tuple]] = None,
+                    columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        if not os.path.exists(self.path):
+            return None
+        df = pd.read_parquet(self.path, engine="pyarrow", filters=filters or None, columns=columns)
+        if df.empty:
+            return None
+        # Partition keys come back as dictionary columns; return plain ones
+        if "State" in df.columns:
+            df["State"] = df["State"].astype(str)
+        if "Year" in df.columns:
+            df["Year"] = df["Year"].astype("int64")
+        return df
+
+    def query(self,
+              state: Optional[str] = None,
+              year: Optional[int] = None,
+              limit: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Read matching rows, pruning partitions on state and year"""
+        filters = []
+        if state:
+            filters.append(("State", "=", state))
+        if year:
+            filters.append(("Year", "=", int(year)))
+        df = self.query_frame(filters)
+        if df is None:
+            return None
+        df = df.sort_values("Date", kind="stable")
+        if limit:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from data_handler import DataGovAPI
+    from query_analyzer import QueryAnalyzer
+    from rollups import RollupStore
+
+    states = sys.argv[1:] or QueryAnalyzer.INDIAN_STATES
+    store = RainfallStore()
+    added = store.sync(DataGovAPI(use_snapshot=False, use_cache=False), states, RollupStore())
+    print(f"✓ {sum(added.values())} new rainfall rows across {len(added)} states")
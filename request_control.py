@@ -0,0 +1,106 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Set by background work (cache warming) to a gate with busy()/wait_idle():
+# the API clients then hold every request until no user fetch is running
+yield_to: ContextVar = ContextVar("yield_to", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the API is considered down"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def backoff_delay(attempt: int,
+                  base: float = 0.5,
+                  cap: float = 30.0,
+                  retry_after: Optional[float] = None) -> float:
+    """Delay before retry number `attempt` (0-based).
+
+    Full jitter over an exponentially growing window, so concurrent workers
+    that failed together do not retry together. A server-supplied
+    Retry-After is honoured as a lower bound.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures.
+
+    closed:    requests flow; `failure_threshold` consecutive failures open it
+    open:      every request fails immediately with CircuitOpenError
+    half-open: after `reset_timeout` seconds one probe request is let through;
+               its success closes the circuit, its failure re-opens it
+
+    Only transport errors and 5xx responses count as failures; a 429 means
+    the API is up but busy and is handled by pacing instead.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        with self.lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"data.gov.in circuit open; retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """Persistent cache of decoded data.gov.in pages.
+
+    Each entry is keyed by the resource URL plus its normalized request
+    params (filters, offset, limit; the API key is ignored). Entries expire
+    after a per-resource TTL and the file is kept under `max_bytes` by
+    evicting the least recently used pages first. Pages are stored as JSON,
+    so reading the cache file never executes anything; rows that do not
+    decode (e.g. written by an older version) count as misses and are
+    dropped.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "http_cache.sqlite")
+    IGNORED_PARAMS = {"api-key", "format"}
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.path = path or self.DEFAULT_PATH
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, url TEXT, payload BLOB, size INTEGER,"
+            " created REAL, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+
+    @classmethod
+    def make_key(cls, url: str, params: dict) -> str:
+        """Stable key for a request, independent of param order and types"""
+        normalized = {
+            k: str(v).strip() for k, v in params.items()
+            if k not in cls.IGNORED_PARAMS and v is not None
+        }
+        blob = json.dumps([url, sorted(normalized.items())])
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        return self.ttls.get(url, self.default_ttl)
+
+    # ------------------------------------------------------------------
+    def get(self, url: str, params: dict) -> Optional[dict]:
+        """Return the cached page, or None on a miss or expired entry"""
+        key = self.make_key(url, params)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload, created FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_for(url):
+                if row is not None:
+                    self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            try:
+                data = json.loads(row[0])
+            except ValueError:
+                self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE pages SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return data
+
+    def put(self, url: str, params: dict, data: dict):
+        """Store a decoded page and evict LRU entries beyond max_bytes"""
+        key = self.make_key(url, params)
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, payload, len(payload), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM pages ORDER BY accessed"
+        ).fetchall():
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM pages")
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
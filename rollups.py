@@ -0,0 +1,207 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import rainfall_seasons
+
+
+class RollupStore:
+    """Materialized aggregates of the crop and rainfall data.
+
+    Each cube is a small Parquet table indexed for lookup:
+
+    - crop_state:    state x crop x year x season -> production, area, records
+    - crop_district: state x crop x year x district -> production, area, records
+    - rain_state:    state x year x month -> rainfall sum, records
+    - rain_district: state x district x year x month -> rainfall sum, records
+    - rain_season:   state x district x season year x season -> mm, coverage
+                     (crop seasons, monsoon and whole year; see rainfall_seasons.py)
+
+    Cubes are built once from raw rows (build_*) and refreshed by folding in
+    new rows (update_*). update_* must only be given rows that have not been
+    folded in before, e.g. the rows appended by an incremental sync.
+    rain_season is derived from rain_district whenever that changes.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "rollups")
+
+    CUBES: Dict[str, dict] = {
+        "crop_state": {
+            "keys": ["state_name", "crop", "crop_year", "season"],
+            "sums": {"production_": "production_", "area_": "area_"},
+        },
+        "crop_district": {
+            "keys": ["state_name", "crop", "crop_year", "district_name"],
+            "sums": {"production_": "production_", "area_": "area_"},
+        },
+        "rain_state": {
+            "keys": ["State", "Year", "Month"],
+            "sums": {"Avg_rainfall": "Avg_rainfall_sum"},
+        },
+        "rain_district": {
+            "keys": ["State", "District", "Year", "Month"],
+            "sums": {"Avg_rainfall": "Avg_rainfall_sum"},
+        },
+        "rain_season": {
+            "keys": ["State", "District", "Year", "Season"],
+            "derived": True,
+        },
+    }
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or self.DEFAULT_PATH
+        self.cubes: Dict[str, Optional[pd.DataFrame]] = {}
+        self.lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.parquet")
+
+    def cube(self, name: str) -> Optional[pd.DataFrame]:
+        """Load a cube on first use; None if it has not been built"""
+        if name not in self.cubes:
+            with self.lock:
+                if name not in self.cubes:
+                    path = self._file(name)
+                    df = pd.read_parquet(path) if os.path.exists(path) else None
+                    self.cubes[name] = self._index(name, df) if df is not None else None
+        return self.cubes[name]
+
+    def _index(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        return df.set_index(self.CUBES[name]["keys"]).sort_index()
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def aggregate(cls, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Roll raw rows up into one cube (flat, not indexed)"""
+        spec = cls.CUBES[name]
+        value_col = next(iter(spec["sums"]))
+        df = df.dropna(subset=spec["keys"])
+        agg = df.groupby(spec["keys"], observed=True).agg(
+            **{out: (col, "sum") for col, out in spec["sums"].items()},
+            records=(value_col, "count"),
+        ).reset_index()
+        for key in spec["keys"]:
+            if isinstance(agg[key].dtype, pd.CategoricalDtype) or agg[key].dtype == object:
+                agg[key] = agg[key].astype(str)
+            else:
+                agg[key] = agg[key].astype("int64")
+        return agg
+
+    def _save(self, name: str, flat: pd.DataFrame):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(name) + ".tmp"
+        flat.to_parquet(tmp, index=False)
+        os.replace(tmp, self._file(name))
+        with self.lock:
+            self.cubes[name] = self._index(name, flat)
+
+    def _fold(self, name: str, df: pd.DataFrame):
+        spec = self.CUBES[name]
+        new = self.aggregate(name, df)
+        current = self.cube(name)
+        if current is not None:
+            merged = pd.concat([current.reset_index(), new], ignore_index=True)
+            new = merged.groupby(spec["keys"], as_index=False).sum()
+        self._save(name, new)
+
+    def build_crop(self, df: pd.DataFrame):
+        """Rebuild both crop cubes from the full crop table"""
+        for name in ("crop_state", "crop_district"):
+            self._save(name, self.aggregate(name, df))
+
+    def update_crop(self, df: pd.DataFrame):
+        for name in ("crop_state", "crop_district"):
+            self._fold(name, df)
+
+    def build_rainfall(self, df: pd.DataFrame):
+        """Rebuild the rainfall cubes from typed daily rows"""
+        for name in ("rain_state", "rain_district"):
+            self._save(name, self.aggregate(name, df))
+        self._derive_seasons()
+
+    def update_rainfall(self, df: pd.DataFrame):
+        for name in ("rain_state", "rain_district"):
+            self._fold(name, df)
+        self._derive_seasons()
+
+    def _derive_seasons(self):
+        """Resample the district-month cube into season and annual totals"""
+        months = rainfall_seasons.monthly(self.cube("rain_district").reset_index())
+        seasons = rainfall_seasons.seasonal(months)
+        self._save("rain_season", seasons[self.CUBES["rain_season"]["keys"] + ["mm", "coverage", "days"]])
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _slice(cube: pd.DataFrame, filters: Dict[str, object]) -> Optional[pd.DataFrame]:
+        filters = {k: v for k, v in filters.items() if v is not None}
+        try:
+            if filters:
+                rows = cube.xs(tuple(filters.values()), level=list(filters.keys()), drop_level=False)
+            else:
+                rows = cube
+        except KeyError:
+            return None
+        return rows.reset_index() if len(rows) else None
+
+    def lookup(self, dataset: str, **kwargs) -> Optional[pd.DataFrame]:
+        """Serve a fetch job from the cubes, or None if they cannot answer it.
+
+        Crop jobs return district-level rows (state_name, district_name,
+        crop, crop_year, production_, area_, records); rainfall jobs return
+        monthly rows (State, Year, Month, Avg_rainfall_sum, records).
+        """
+        if dataset == "crop_data":
+            if kwargs.get("season"):
+                return None
+            cube = self.cube("crop_district")
+            if cube is None:
+                return None
+            year = kwargs.get("year")
+            return self._slice(cube, {
+                "state_name": kwargs.get("state"),
+                "crop": kwargs.get("crop"),
+                "crop_year": int(year) if year else None,
+                "district_name": kwargs.get("district"),
+            })
+
+        if dataset == "rainfall_data":
+            # District months when synced that way, else the older state cube
+            cube = self.cube("rain_district")
+            if cube is None:
+                cube = self.cube("rain_state")
+            if cube is None:
+                return None
+            year = kwargs.get("year")
+            return self._slice(cube, {
+                "State": kwargs.get("state"),
+                "Year": int(year) if year else None,
+            })
+
+        return None
+
+    def seasons(self, state: Optional[str] = None, year: Optional[int] = None,
+                season: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Precomputed season/annual rainfall rows, or None if not built"""
+        cube = self.cube("rain_season")
+        if cube is None:
+            return None
+        return self._slice(cube, {"State": state, "District": None,
+                                  "Year": int(year) if year else None, "Season": season})
+
+    def available(self) -> List[str]:
+        return [name for name in self.CUBES if self.cube(name) is not None]
+
+
+if __name__ == "__main__":
+    from snapshot_store import CropSnapshotStore
+
+    snapshot = CropSnapshotStore()
+    if not snapshot.exists():
+        raise SystemExit("Crop snapshot missing; run `python snapshot_store.py` first")
+
+    store = RollupStore()
+    store.build_crop(snapshot.query())
+    for name in store.available():
+        print(f"✓ {name}: {len(store.cube(name))} rows")
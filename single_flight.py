@@ -0,0 +1,153 @@
+import threading
+from concurrent.futures import Future
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from frame_cache import FrameCache
+from query_planner import isin
+
+# Fetcher arguments that filter rows, and the column each one filters
+FILTER_COLUMNS = {
+    "crop_data": {"state": "state_name", "district": "district_name", "crop": "crop",
+                  "year": "crop_year", "season": "season"},
+    "rainfall_data": {"state": "State", "year": "Year"},
+}
+
+
+class Flight:
+    """One fetch in progress; `future` resolves to its frame (or None)"""
+
+    def __init__(self, dataset: str, kwargs: dict):
+        self.dataset = dataset
+        self.kwargs = dict(kwargs)
+        self.future: Future = Future()
+
+
+class SingleFlight:
+    """Collapses concurrent identical fetches into one download.
+
+    Every fetch that misses the frame cache joins here first. The first
+    caller for a job leads it and fetches; callers arriving while it is in
+    flight wait on the leader's result instead of sending the same pages.
+    A job that is a narrower slice of an in-flight fetch (one crop of a
+    running state-level fetch, say) waits on that fetch and filters its
+    frame locally, unless the broader result turns out partial or cut off
+    by its limit, in which case the caller fetches for itself.
+
+    Shared by every thread and Streamlit session using one
+    IntelligentQASystem.
+    """
+
+    def __init__(self):
+        self.flights: Dict[Hashable, Flight] = {}
+        self.lock = threading.Lock()
+        self.counters = {"leaders": 0, "coalesced": 0, "subset_served": 0, "subset_refetched": 0}
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def covers(dataset: str, broad: dict, narrow: dict) -> bool:
+        """True if every row `narrow` asks for is also requested by `broad`"""
+        for name in FILTER_COLUMNS[dataset]:
+            wanted = broad.get(name)
+            if wanted is not None and str(wanted).strip().lower() != str(narrow.get(name) or "").strip().lower():
+                return False
+        return True
+
+    @staticmethod
+    def narrow(dataset: str, df: Optional[pd.DataFrame], broad: dict, kwargs: dict) -> Optional[pd.DataFrame]:
+        """Rows of a broader fetch's frame that `kwargs` asks for, or None if it cannot tell.
+
+        A broader frame that is partial or filled its limit may be missing
+        rows of the narrow slice, so it is not used.
+        """
+        if df is None:
+            return None
+        if df.attrs.get("partial") or len(df) >= broad.get("limit", 5000):
+            return None
+        mask = pd.Series(True, index=df.index)
+        for name, column in FILTER_COLUMNS[dataset].items():
+            value = kwargs.get(name)
+            if value is not None and broad.get(name) is None:
+                if column not in df.columns:
+                    return None
+                mask &= isin(df[column], [value])
+        rows = df[mask].head(kwargs.get("limit", 5000))
+        rows.attrs.update(partial=False, truncated=False, total=None)
+        return rows
+
+    # ------------------------------------------------------------------
+    def join(self, dataset: str, kwargs: dict, broader: bool = True) -> Tuple[Flight, str]:
+        """Attach to a fetch of `kwargs`: returns (flight, role).
+
+        role is "leader" (the caller must fetch and then call finish),
+        "coalesced" (an identical fetch is running) or "subset" (a broader
+        fetch is running; see narrow). `broader=False` skips subset matching.
+        """
+        key = FrameCache.make_key(dataset, kwargs)
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                self.counters["coalesced"] += 1
+                return flight, "coalesced"
+            if broader:
+                for flight in self.flights.values():
+                    if flight.dataset == dataset and self.covers(dataset, flight.kwargs, kwargs):
+                        return flight, "subset"
+            flight = self.flights[key] = Flight(dataset, kwargs)
+            self.counters["leaders"] += 1
+            return flight, "leader"
+
+    def in_flight(self, dataset: str, kwargs: dict) -> bool:
+        with self.lock:
+            return FrameCache.make_key(dataset, kwargs) in self.flights
+
+    def finish(self, flight: Flight, df: Optional[pd.DataFrame] = None, error: Optional[BaseException] = None):
+        """Publish a leader's result to its waiters and retire the flight"""
+        with self.lock:
+            self.flights.pop(FrameCache.make_key(flight.dataset, flight.kwargs), None)
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(df)
+
+    def count(self, outcome: str):
+        with self.lock:
+            self.counters[outcome] += 1
+
+    def stats(self) -> dict:
+        """Fetches led, requests saved by joining them, and subset outcomes"""
+        with self.lock:
+            stats = dict(self.counters, in_flight=len(self.flights))
+        stats["saved"] = stats["coalesced"] + stats["subset_served"]
+        return stats
+
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    flights = SingleFlight()
+    frame = pd.DataFrame({"state_name": ["Punjab"] * 3, "crop": ["Rice", "Wheat", "Rice"],
+                          "crop_year": [2013] * 3, "production_": [10.0, 20.0, 30.0]})
+
+    def fetch(kwargs: dict) -> Optional[pd.DataFrame]:
+        flight, role = flights.join("crop_data", kwargs)
+        if role == "leader":
+            time.sleep(0.2)  # the download
+            flights.finish(flight, frame)
+            return frame
+        df = flight.future.result()
+        if role == "subset":
+            df = SingleFlight.narrow("crop_data", df, flight.kwargs, kwargs)
+            flights.count("subset_served" if df is not None else "subset_refetched")
+        return df
+
+    broad = {"state": "Punjab", "crop": None, "year": 2013, "limit": 200}
+    rice = {"state": "Punjab", "crop": "Rice", "year": 2013, "limit": 200}
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        first = pool.submit(fetch, broad)
+        time.sleep(0.05)
+        results = list(pool.map(fetch, [broad] * 3 + [rice] * 2))
+    print(f"rows per caller: {[len(df) for df in [first.result()] + results]}")
+    print(f"stats: {flights.stats()}")
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import time
+from typing import Optional
+
+import pandas as pd
+
+
+class CropSnapshotStore:
+    """Local columnar snapshot of the crop production dataset.
+
+    The crop resource is a frozen 1997-2014 table, so it is ingested once
+    into a Parquet dataset partitioned by state_name/crop_year. Queries push
+    their filters down so only the matching partitions are read.
+    """
+
+    DEFAULT_PATH = os.path.join("cache", "crop_snapshot")
+    PARTITION_COLS = ["state_name", "crop_year"]
+    TEXT_COLS = ["state_name", "district_name", "season", "crop"]
+    NUMERIC_COLS = ["area_", "production_"]
+    MANIFEST = "_manifest.json"  # underscore keeps it out of dataset discovery
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or self.DEFAULT_PATH
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, self.MANIFEST)
+
+    def exists(self) -> bool:
+        """True once a complete snapshot has been written"""
+        return os.path.exists(self.manifest_path)
+
+    def manifest(self) -> dict:
+        if not self.exists():
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def to_typed(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Coerce raw API string columns to their real types"""
+        df = df.copy()
+        for col in cls.TEXT_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype(str).str.strip()
+        for col in cls.NUMERIC_COLS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        if "crop_year" in df.columns:
+            df["crop_year"] = pd.to_numeric(df["crop_year"], errors="coerce")
+            df = df.dropna(subset=["crop_year"])
+            df["crop_year"] = df["crop_year"].astype("int16")
+        return df
+
+    def write(self, df: pd.DataFrame) -> int:
+        """Replace the snapshot with the given raw or typed crop records"""
+        df = self.to_typed(df)
+        tmp_path = self.path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        df.to_parquet(tmp_path, engine="pyarrow", partition_cols=self.PARTITION_COLS, index=False)
+
+        with open(os.path.join(tmp_path, self.MANIFEST), "w") as f:
+            json.dump({
+                "rows": len(df),
+                "states": int(df["state_name"].nunique()),
+                "years": [int(df["crop_year"].min()), int(df["crop_year"].max())],
+                "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, f, indent=2)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp_path, self.path)
+        return len(df)
+
+    def ingest(self, api, page_limit: int = 300000) -> int:
+        """One-time bulk download of the whole crop resource into the snapshot"""
+        df = api.fetch_crop_data(limit=page_limit)
+        if df is None or df.empty:
+            raise RuntimeError("Crop snapshot ingest returned no records")
+        rows = self.write(df)
+        print(f"✓ Crop snapshot: {rows} records written to {self.path}")
+        return rows
+
+    def vocabulary(self) -> dict:
+        """Distinct state, district, crop and season names in the snapshot"""
+        df = pd.read_parquet(self.path, engine="pyarrow",
+                             columns=["state_name", "district_name", "crop", "season"])
+        return {
+            "states": sorted(df["state_name"].astype(str).unique()),
+            "districts": sorted(df["district_name"].astype(str).unique()),
+            "crops": sorted(df["crop"].astype(str).unique()),
+            "seasons": sorted(df["season"].astype(str).unique()),
+        }
+
+    # ------------------------------------------------------------------
+    def query(self,
+              state: Optional[str] = None,
+              district: Optional[str] = None,
+              crop: Optional[str] = None,
+              year: Optional[int] = None,
+              season: Optional[str] = None,
+              limit: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Read matching rows, pruning partitions on state and year"""
+        filters = []
+        if state:
+            filters.append(("state_name", "=", state))
+        if year:
+            filters.append(("crop_year", "=", int(year)))
+        if district:
+            filters.append(("district_name", "=", district))
+        if crop:
+            filters.append(("crop", "=", crop))
+        if season:
+            filters.append(("season", "=", season.strip()))
+
+        df = pd.read_parquet(self.path, engine="pyarrow", filters=filters or None)
+        if df.empty:
+            return None
+
+        # Partition keys come back as dictionary columns holding every
+        # partition value; return them as plain columns like the API does.
+        df["state_name"] = df["state_name"].astype(str)
+        df["crop_year"] = df["crop_year"].astype("int64")
+        if limit:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from data_handler import DataGovAPI
+    from rollups import RollupStore
+
+    store = CropSnapshotStore()
+    store.ingest(DataGovAPI(use_snapshot=False))
+    print(store.manifest())
+
+    RollupStore().build_crop(store.query())
+    print("✓ Crop rollups rebuilt")
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+# One stub data.gov.in/Groq for the session; the clients read their base URLs
+# from the environment at import time, so it is started before any test module
+STUB = StubServer().start()
+os.environ.update(DATA_GOV_API_BASE=STUB.url, GROQ_BASE_URL=STUB.url + "/openai/v1", GROQ_API_KEY="test")
+
+
+def pytest_unconfigure(config):
+    STUB.stop()
+
+
+@pytest.fixture
+def stub():
+    """The shared stub server, with request counts reset and no injected faults"""
+    STUB.requests.update(data=0, llm=0, errors=0)
+    yield STUB
+    STUB.latency = STUB.error_rate = 0.0
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    """Run each test in its own directory, so default cache paths never touch the repo"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
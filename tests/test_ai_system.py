@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from query_planner import DEFAULT_COVERAGE, PlannedRequest
+
+
+@pytest.fixture
+def qa(stub):
+    from ai_system import IntelligentQASystem
+
+    return IntelligentQASystem(use_async=False, answer_sla=0)
+
+
+def rainfall_request(limit, truncated=False):
+    kwargs = {"state": "Kerala", "year": 2020, "limit": limit}
+    return PlannedRequest("rainfall_data", kwargs, {}, limit, truncated, 1, "api", 1, "Rainfall - Kerala, 2020")
+
+
+def test_a_whole_rainfall_year_gets_season_totals(qa):
+    piece = qa._fetch_dataset("rainfall_data", [rainfall_request(12000)])
+    assert not piece["partial"]
+    keys = [section.key for section in qa._rain_sections(piece["frame"])]
+    assert keys == ["rain_overview", "rainfall_by_state"]
+
+
+def test_truncated_rainfall_is_labelled_partial(qa):
+    piece = qa._fetch_dataset("rainfall_data", [rainfall_request(300, truncated=True)])
+    assert piece["partial"]
+    assert piece["sources"] == ["Rainfall - Kerala, 2020 (truncated: first 300 of 976 rows)"]
+    assert piece["frame"].attrs["cut"] == (300, 976)
+
+    overview, partial = qa._rain_sections(piece["frame"])
+    assert "first 300 of 976 rows" in overview.rows[-1]
+    assert partial.title == "Rainfall by state, partial (first 300 of 976 rows only):"
+    state, start, end, days, mm = partial.rows[0].split("|")
+    assert (state, start, end, days) == ("Kerala", "2020-01-01", "2020-12-29", "122")
+
+
+def test_rainfall_coverage_follows_the_finished_syncs(qa):
+    from data_handler import DataGovAPI
+
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+    store = qa.data_api.rainfall_store
+    store.sync_state(api, "Punjab", max_rows=1500)
+    assert qa.coverage("rainfall_data") == DEFAULT_COVERAGE["rainfall_data"]
+    # Synced through 2021-12-30, so 2021 is not complete
+    store.sync_state(api, "Punjab")
+    assert qa.coverage("rainfall_data") == (2018, 2020)
+
+
+def question(query, query_type="comparison"):
+    return {"query_type": query_type, "original_query": query, "states": [], "crops": [], "years": []}
+
+
+def finish_later(future, delay, result=None, error=None):
+    def finish():
+        time.sleep(delay)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    threading.Thread(target=finish, daemon=True).start()
+
+
+EMPTY = {"frame": None, "sources": [], "partial": False}
+
+
+def test_required_datasets(qa):
+    both = {"crop_data", "rainfall_data"}
+    assert qa.required_datasets(question("Rice in Punjab"), both) == {"crop_data"}
+    assert qa.required_datasets(question("Rice and monsoon rain in Punjab"), both) == both
+    assert qa.required_datasets(question("Rice in Punjab", "correlation"), both) == both
+    assert qa.required_datasets(question("Rainfall in Kerala"), {"rainfall_data"}) == {"rainfall_data"}
+
+
+def test_required_datasets_are_awaited_past_the_deadline(qa):
+    crop, rain = Future(), Future()
+    finish_later(crop, 0.3, dict(EMPTY, sources=["crop"]))
+    finish_later(rain, 0.1, dict(EMPTY, sources=["rain"]))
+    data, _, late = qa._gather({"crop_data": crop, "rainfall_data": rain},
+                               question("Rice in Punjab"), time.perf_counter() + 0.01)
+    assert late == [] and data["sources"] == ["rain", "crop"]
+    assert not data["partial"]
+
+
+def test_a_late_optional_dataset_is_left_out_and_marked_partial(qa):
+    crop, rain = Future(), Future()
+    finish_later(crop, 0.05, dict(EMPTY, sources=["crop"]))
+    start = time.perf_counter()
+    data, _, late = qa._gather({"crop_data": crop, "rainfall_data": rain},
+                               question("Rice in Punjab"), start + 0.2)
+    assert late == ["rainfall_data"]
+    assert 0.2 <= time.perf_counter() - start < 1
+    assert data["partial"] and data["sources"] == ["crop"] and data["rainfall_data"] is None
+
+
+def test_a_failed_optional_dataset_is_skipped_and_a_required_one_raises(qa):
+    crop, rain = Future(), Future()
+    crop.set_result(EMPTY)
+    rain.set_exception(ConnectionError("down"))
+    data, _, late = qa._gather({"crop_data": crop, "rainfall_data": rain}, question("Rice in Punjab"), None)
+    assert late == [] and not data["partial"]
+
+    crop = Future()
+    crop.set_exception(ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        qa._gather({"crop_data": crop}, question("Rice in Punjab"), None)
+
+
+def test_no_deadline_waits_for_every_dataset(qa):
+    crop, rain = Future(), Future()
+    crop.set_result(EMPTY)
+    finish_later(rain, 0.2, EMPTY)
+    assert qa._gather({"crop_data": crop, "rainfall_data": rain}, question("Rice in Punjab"), None)[2] == []
@@ -0,0 +1,39 @@
+import response_cache
+from answer_cache import AnswerCache
+
+SOURCES = ["Crop Production API (data.gov.in) - Punjab, Rice, 2013"]
+
+
+def analysis(**changes):
+    base = {"query_type": "comparison", "ranking_order": None, "states": ["Punjab", "Tamil Nadu"],
+            "crops": ["Rice"], "districts": [], "seasons": [], "years": [2013],
+            "original_query": "Compare rice production in Punjab and Tamil Nadu for 2013"}
+    return {**base, **changes}
+
+
+def test_rewordings_with_the_same_entities_share_an_entry():
+    cache = AnswerCache("answers.sqlite")
+    cache.put_answer("model", analysis(), "summary", SOURCES, "Punjab grew more rice.")
+    reworded = analysis(states=["tamil nadu", "PUNJAB"], original_query="rice Punjab vs Tamil Nadu, 2013")
+    assert cache.get_answer("model", reworded, "summary", SOURCES) == "Punjab grew more rice."
+
+
+def test_anything_the_model_sees_changes_the_key():
+    cache = AnswerCache("answers.sqlite")
+    cache.put_answer("model", analysis(), "summary", SOURCES, "answer")
+    assert cache.get_answer("other-model", analysis(), "summary", SOURCES) is None
+    assert cache.get_answer("model", analysis(), "new data", SOURCES) is None
+    assert cache.get_answer("model", analysis(), "summary", SOURCES + ["more"]) is None
+    assert cache.get_answer("model", analysis(years=[2014]), "summary", SOURCES) is None
+    assert cache.get_answer("model", analysis(query_type="ranking"), "summary", SOURCES) is None
+
+
+def test_answers_expire_after_the_ttl(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = AnswerCache("answers.sqlite", ttl=60.0)
+    cache.put_answer("model", analysis(), "summary", SOURCES, "answer")
+    now[0] += 59
+    assert cache.get_answer("model", analysis(), "summary", SOURCES) == "answer"
+    now[0] += 2
+    assert cache.get_answer("model", analysis(), "summary", SOURCES) is None
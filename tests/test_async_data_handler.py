@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+from async_data_handler import AsyncDataGovAPI, AsyncRateLimiter
+from data_handler import DataGovAPI, RateLimiter
+from schemas import RAINFALL_SCHEMA
+
+
+def fetch(coro_factory, batch_size=100):
+    async def run():
+        async with AsyncDataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0) as api:
+            api.BATCH_SIZE = batch_size
+            return await coro_factory(api)
+    return asyncio.run(run())
+
+
+def test_chunked_pages_match_the_sync_client(stub):
+    sync = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+    expected = sync.fetch_rainfall_data(state="Kerala", year=2019, limit=5000)
+    df = fetch(lambda api: api.fetch_rainfall_data(state="Kerala", year=2019, limit=5000))
+    assert df.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    assert df.dtypes.equals(expected.dtypes)
+    assert df.attrs == {"partial": False, "total": len(expected), "truncated": False}
+
+
+def test_limit_and_truncation(stub):
+    df = fetch(lambda api: api.fetch_rainfall_data(state="Kerala", year=2019, limit=450))
+    assert len(df) == 450
+    assert df.index.is_unique
+    assert df.attrs["truncated"] and not df.attrs["partial"]
+
+
+def test_failed_page_keeps_the_pages_before_it(stub):
+    async def run(api):
+        fetch_page = api._fetch_page
+
+        async def failing(url, filters, offset, limit):
+            if offset == 200:
+                raise ConnectionError("page lost")
+            return await fetch_page(url, filters, offset, limit)
+
+        api._fetch_page = failing
+        return await api.fetch_rainfall_data(state="Kerala", year=2019, limit=5000)
+
+    df = fetch(run)
+    assert len(df) == 200
+    assert df.attrs["partial"]
+
+
+
+def test_pages_are_windowed_and_a_failure_cancels_the_rest():
+    started, done, live, peak = [], [], 0, 0
+
+    async def run(api):
+        async def fetch_page(url, filters, offset, limit):
+            nonlocal live, peak
+            started.append(offset)
+            live += 1
+            peak = max(peak, live)
+            try:
+                await asyncio.sleep(0.01 if offset < 300 else 0.05 if offset == 300 else 0.2)
+                if offset == 300:
+                    raise ConnectionError("page lost")
+                done.append(offset)
+                return {"total": 5000, "records": [{"State": "Goa", "Avg_rainfall": "1"}] * limit}
+            finally:
+                live -= 1
+
+        api._fetch_page = fetch_page
+        return await api._fetch_chunks(api.RAINFALL_API_URL, {}, 5000, RAINFALL_SCHEMA)
+
+    async def main():
+        async with AsyncDataGovAPI(use_snapshot=False, use_cache=False, max_connections=3,
+                                   requests_per_second=0) as api:
+            api.BATCH_SIZE = 100
+            result = await run(api)
+            await asyncio.sleep(0.3)  # cancelled pages would have finished by now
+            return result
+
+    chunks, error, total = asyncio.run(main())
+    assert [len(chunk) for chunk in chunks] == [100] * 3
+    assert isinstance(error, ConnectionError) and total == 5000
+    assert peak == 3
+    # The pages in flight behind the failed one were cancelled, not finished
+    assert started == [0, 100, 200, 300, 400, 500]
+    assert done == [0, 100, 200] and live == 0
+
+
+def test_async_limiter_shares_the_sync_bucket_logic():
+    limiter = AsyncRateLimiter(100.0, burst=1)
+    assert isinstance(limiter, RateLimiter)
+    limiter.throttle(retry_after=0.2)
+    assert limiter.rate == 50.0
+
+    async def timed():
+        start = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(timed()) >= 0.2
+
+
+def test_local_store_checks_run_off_the_loop():
+    threads = []
+
+    class Store:
+        def serves(self, state, year):
+            threads.append(threading.current_thread())
+            return False
+
+        def has_state(self, state):
+            threads.append(threading.current_thread())
+            return False
+
+    async def main():
+        async with AsyncDataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0) as api:
+            async def failing(url, filters, limit, schema):
+                return [], ConnectionError("down"), 0
+
+            api.rainfall_store, api._fetch_chunks = Store(), failing
+            df = await api.fetch_rainfall_data(state="Kerala", year=2019)
+            return df, threading.current_thread()
+
+    df, loop_thread = asyncio.run(main())
+    assert df is None
+    assert len(threads) == 2 and loop_thread not in threads
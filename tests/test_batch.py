@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+import batch
+
+
+def write_questions(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_read_questions_skips_comments_and_reads_jsonl(tmp_path):
+    path = write_questions(tmp_path / "q.txt", ["# report", "", "Rice in Punjab", '{"question": "Wheat in Bihar"}'])
+    assert batch.read_questions(path) == ["Rice in Punjab", "Wheat in Bihar"]
+    assert batch.normalize("  Rice   in PUNJAB ") == "rice in punjab"
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Every IntelligentQASystem main() builds"""
+    import ai_system
+
+    systems = []
+
+    class Recorded(ai_system.IntelligentQASystem):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            systems.append(self)
+
+    monkeypatch.setattr(ai_system, "IntelligentQASystem", Recorded)
+    return systems
+
+
+def test_answers_are_written_in_order_once_per_distinct_question(stub, tmp_path, built):
+    questions = write_questions(tmp_path / "q.txt", [
+        "Compare rice production in Punjab and Tamil Nadu for 2013",
+        "Which state has the highest wheat production in 2010?",
+        "compare rice production in punjab and tamil nadu  for 2013",
+    ])
+    report = batch.main([questions, "-o", "out.jsonl", "--data-rps", "0", "--groq-rps", "0"])
+    records = [json.loads(line) for line in open("out.jsonl")]
+    assert [r["index"] for r in records] == [0, 1, 2]
+    assert records[2]["duplicate_of"] == 0 and records[2]["answer"] == records[0]["answer"]
+    assert not any("error" in r for r in records)
+    assert report["questions"] == 3 and report["distinct_questions"] == 2
+    assert report["llm_calls"] == 2
+    # Offline answers wait for every dataset
+    assert built[0].answer_sla == 0
+
+
+def test_answer_sla_flag(stub, tmp_path, built):
+    questions = write_questions(tmp_path / "q.txt", ["Rainfall in Kerala in 2019"])
+    batch.main([questions, "-o", "out.jsonl", "--data-rps", "0", "--groq-rps", "0", "--answer-sla", "5"])
+    assert built[0].answer_sla == 5
+
+
+def test_prefetch_fetches_each_shared_job_once(stub):
+    from ai_system import IntelligentQASystem
+
+    runner = batch.BatchRunner(IntelligentQASystem(use_async=False, answer_sla=0))
+    stats = runner.prefetch(["Rainfall in Kerala in 2019", "Show rainfall patterns in Kerala for 2019"])
+    assert stats == {"jobs_planned": 2, "jobs_unique": 1, "jobs_fetched": 1}
+    assert runner.prefetch(["Rainfall in Kerala in 2019"])["jobs_fetched"] == 0
+    out = io.StringIO()
+    runner.run(["Rainfall in Kerala in 2019"], out, progress=io.StringIO())
+    assert json.loads(out.getvalue())["sources"]
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+from async_data_handler import AsyncDataGovAPI
+from cache_warmer import ForegroundGate, QueryLog
+from data_handler import DataGovAPI
+from request_control import yield_to
+
+
+def jobs(*names):
+    return [("crop_data", {"state": name}, "src") for name in names]
+
+
+def test_top_jobs_counts_planned_jobs():
+    log = QueryLog("log.jsonl")
+    log.record(jobs("Goa", "Kerala"))
+    log.record(jobs("Kerala"))
+    log.record([])
+    assert log.top_jobs(1) == [("crop_data", {"state": "Kerala"})]
+    assert len(log.entries()) == 2
+
+
+def test_log_is_rotated_to_its_newest_entries():
+    log = QueryLog("log.jsonl", max_lines=5)
+    for i in range(23):
+        log.record(jobs(f"S{i}"))
+    with open("log.jsonl") as f:
+        assert len(f.readlines()) < 10
+    assert [entry["jobs"][0][1]["state"] for entry in log.entries()] == [f"S{i}" for i in range(18, 23)]
+
+
+def test_entries_are_reread_only_when_the_file_changes():
+    log = QueryLog("log.jsonl")
+    log.record(jobs("Goa"))
+    assert log.entries() is log.entries()
+    with open("log.jsonl", "a") as f:
+        f.write('{"torn": \n')
+    assert len(log.entries()) == 1
+    log.record(jobs("Kerala"))
+    assert len(log.entries()) == 2
+
+
+def hold_then_release(gate, stub, background):
+    """Run `background` while a user fetch holds the gate; return requests sent meanwhile"""
+    with gate:
+        worker = threading.Thread(target=background)
+        worker.start()
+        time.sleep(0.3)
+        sent = stub.requests["data"]
+    worker.join(10)
+    return sent
+
+
+def test_background_fetches_wait_for_user_fetches(stub):
+    gate, results = ForegroundGate(), []
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+
+    def warm():
+        yield_to.set(gate)
+        results.append(api.fetch_crop_data(state="Punjab"))
+
+    assert hold_then_release(gate, stub, warm) == 0
+    assert results[0] is not None and stub.requests["data"] > 0
+
+
+def test_async_background_fetches_wait_for_user_fetches(stub):
+    gate, results = ForegroundGate(), []
+
+    async def fetch():
+        yield_to.set(gate)
+        async with AsyncDataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0) as api:
+            return await api.fetch_crop_data(state="Punjab")
+
+    assert hold_then_release(gate, stub, lambda: results.append(asyncio.run(fetch()))) == 0
+    assert results[0] is not None and stub.requests["data"] > 0
+
+
+def test_warming_uses_the_question_client(stub):
+    from ai_system import IntelligentQASystem
+
+    qa = IntelligentQASystem(use_async=True)
+    qa.async_api.crop_snapshot = qa.async_api.rainfall_store = None
+    assert qa.async_api.breaker is qa.data_api.breaker
+    qa.data_api = None  # the sync client must not be touched
+    job = {"state": "Punjab", "crop": None, "year": None, "limit": 20000}
+    qa.warm("crop_data", job)
+    assert not qa.needs_fetch("crop_data", job)
+    assert stub.requests["data"] > 0
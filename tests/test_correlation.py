@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import annual_rainfall, correlate, format_stats, rainfall_months
+
+DISTRICTS = [f"D{i}" for i in range(6)]
+YEARS = [2018, 2019, 2020, 2021]
+
+
+@pytest.fixture(scope="module")
+def rain():
+    rng = np.random.default_rng(0)
+    frames = []
+    for district in DISTRICTS:
+        for year in YEARS:
+            dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+            frames.append(pd.DataFrame({"State": "Kerala", "District": district, "Date": dates,
+                                        "Year": year, "Month": dates.month,
+                                        "Avg_rainfall": rng.uniform(1, 9)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def crops(rain, years=YEARS, crop="Rice"):
+    """Yield (t/ha) rising exactly linearly with each district-year's annual rainfall"""
+    annual = annual_rainfall(rainfall_months(rain), "district")
+    rows = annual.assign(year=lambda df: df["year"] - YEARS[0] + years[0])
+    return pd.DataFrame({"state_name": "Kerala", "district_name": rows["district"].str.title(),
+                         "crop": crop, "crop_year": rows["year"], "area_": 100.0,
+                         "production_": 100.0 * (1 + 0.001 * rows["annual_mm"])})
+
+
+def test_time_series_recovers_a_linear_relation(rain):
+    stats = correlate(crops(rain), rain)
+    assert (stats["mode"], stats["level"]) == ("time-series", "district")
+    rice = stats["crops"]["Rice"]
+    assert rice["pearson"] == pytest.approx(1.0) and rice["spearman"] == pytest.approx(1.0)
+    assert rice["pairs"] == len(DISTRICTS) * len(YEARS)
+    assert rice["groups"] == len(DISTRICTS) and rice["median_group_r"] == pytest.approx(1.0)
+    assert set(rice["lagged_pearson"]) == {1, 2}
+    assert "Rice: Pearson r=1.0" in format_stats(stats)
+
+
+def test_no_shared_years_falls_back_to_comparing_places(rain):
+    stats = correlate(crops(rain, years=[2000, 2001, 2002, 2003]), rain)
+    assert stats["mode"] == "cross-sectional"
+    assert stats["crops"]["Rice"]["pairs"] == len(DISTRICTS)
+    assert "compares places, not years" in format_stats(stats)
+
+
+def test_chunks_give_the_same_result_as_one_frame(rain):
+    chunks = [rain.iloc[i:i + 1000] for i in range(0, len(rain), 1000)]
+    assert correlate(crops(rain), chunks) == correlate(crops(rain), rain)
+
+
+def test_state_level_without_districts(rain):
+    crop = crops(rain).drop(columns="district_name")
+    stats = correlate(crop, rain)
+    assert stats["level"] == "state"
+    assert stats["crops"]["Rice"]["pairs"] == len(YEARS)
+
+
+def test_truncated_frames_are_refused(rain):
+    cut = rain.copy()
+    cut.attrs["truncated"] = True
+    stats = correlate(crops(rain), cut)
+    assert stats["mode"] == "none" and "row limit" in stats["reason"]
+    assert format_stats(stats).startswith("- Correlation not computed")
+
+
+def test_thinly_reported_years_are_left_out(rain):
+    thin = rain[~((rain["Year"] == 2021) & (rain["Date"].dt.day > 3))]
+    annual = annual_rainfall(rainfall_months(thin), "district")
+    assert sorted(annual["year"].unique()) == [2018, 2019, 2020]
+
+
+def test_missing_data():
+    assert correlate(None, pd.DataFrame())["mode"] == "none"
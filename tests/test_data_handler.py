@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from data_handler import DataGovAPI, mark_truncated
+from benchmarks.stub_server import RAINFALL_RESOURCE
+
+
+@pytest.fixture
+def api(stub):
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+    api.BATCH_SIZE = 100
+    return api
+
+
+def kerala_2019(stub):
+    return stub.select(RAINFALL_RESOURCE, {"State": "Kerala", "Year": "2019"})
+
+
+def test_pages_are_stitched_in_offset_order(api, stub):
+    expected = kerala_2019(stub)
+    df = api.fetch_rainfall_data(state="Kerala", year=2019, limit=5000)
+    assert len(df) == len(expected)
+    assert df["Date"].dt.strftime("%Y-%m-%d").tolist() == [
+        str(pd.Timestamp(r["Date"]).date()) for r in expected]
+    assert stub.requests["data"] == -(-len(expected) // api.BATCH_SIZE)
+    assert df.attrs == {"partial": False, "total": len(expected), "truncated": False}
+
+
+def test_limit_cuts_the_result_and_marks_it_truncated(api, stub):
+    df = api.fetch_rainfall_data(state="Kerala", year=2019, limit=250)
+    assert len(df) == 250
+    assert df.attrs["truncated"] and df.attrs["total"] == len(kerala_2019(stub))
+    assert stub.requests["data"] == 3
+
+
+def test_failed_page_ends_the_result_as_partial(api, monkeypatch):
+    fetch = api._fetch_page
+
+    def failing(url, filters, offset, limit):
+        if offset == 300:
+            raise ConnectionError("page lost")
+        return fetch(url, filters, offset, limit)
+
+    monkeypatch.setattr(api, "_fetch_page", failing)
+    df = api.fetch_rainfall_data(state="Kerala", year=2019, limit=5000)
+    assert len(df) == 300
+    assert df.attrs["partial"]
+
+
+def test_typed_columns(api):
+    df = api.fetch_crop_data(state="Punjab", crop="Rice", limit=5000)
+    assert isinstance(df["state_name"].dtype, pd.CategoricalDtype)
+    assert str(df["crop_year"].dtype) == "Int16"
+    assert set(df["state_name"].astype(str)) == {"Punjab"}
+
+
+def test_mark_truncated_without_a_total_uses_the_limit():
+    df = pd.DataFrame({"x": range(10)})
+    mark_truncated(df, None, 10)
+    assert df.attrs == {"total": None, "truncated": True}
+    mark_truncated(df, 10, 50)
+    assert df.attrs == {"total": 10, "truncated": False}
@@ -0,0 +1,73 @@
+import time
+
+import history_store
+from history_store import HistoryStore, SessionHistory, compact
+
+ANALYSIS = {"query_type": "comparison", "states": ["Punjab"], "crops": ["Rice"], "years": [2014],
+            "original_query": "not kept"}
+
+
+def result(i):
+    return {"question": f"Q{i}", "answer": f"A{i}", "sources": ["crop_data"], "analysis": ANALYSIS,
+            "stream": iter(()), "late": object(), "trace": [{"name": "llm", "duration_ms": 2.0}],
+            "jobs": [["crop_data", {"state": "Punjab"}]], "trace_id": f"t{i}"}
+
+
+def questions(records):
+    return [record["question"] for record in records]
+
+
+def test_compact_keeps_references_not_live_objects():
+    record = compact(result(1))
+    assert set(record) == {"question", "answer", "sources", "partial", "analysis", "late_appendix",
+                           "jobs", "trace_id", "timing", "asked"}
+    assert "original_query" not in record["analysis"]
+    assert record["jobs"] == [["crop_data", {"state": "Punjab"}]]
+
+
+def test_pages_run_newest_first_across_memory_and_disk():
+    history = SessionHistory(HistoryStore("history.sqlite"), max_entries=3)
+    for i in range(10):
+        history.add(result(i))
+    assert len(history.recent) == 3 and len(history) == 10
+    assert history.pages(4) == 3
+    assert questions(history.page(0, 4)) == ["Q9", "Q8", "Q7", "Q6"]
+    assert questions(history.page(1, 4)) == ["Q5", "Q4", "Q3", "Q2"]
+    assert questions(history.page(2, 4)) == ["Q1", "Q0"]
+    assert questions(history.page(0, 4, skip=1)) == ["Q8", "Q7", "Q6", "Q5"]
+    assert history.latest()["question"] == "Q9"
+
+
+def test_without_a_store_old_entries_are_dropped():
+    history = SessionHistory(max_entries=2)
+    for i in range(5):
+        history.add(result(i))
+    assert len(history) == 2
+    assert questions(history.page(0, 10)) == ["Q4", "Q3"]
+
+
+def test_sessions_are_capped_and_isolated():
+    store = HistoryStore("history.sqlite", max_per_session=3)
+    for i in range(5):
+        store.append("a", {"question": f"Q{i}"})
+    store.append("b", {"question": "other"})
+    assert store.count("a") == 3
+    assert questions(store.page("a", 0, 10)) == ["Q4", "Q3", "Q2"]
+    store.clear("a")
+    assert store.count("a") == 0 and store.count("b") == 1
+
+
+def test_idle_sessions_expire_when_the_store_is_opened(monkeypatch):
+    HistoryStore("history.sqlite").append("old", {"question": "Q"})
+    later = time.time() + 8 * 24 * 3600
+    monkeypatch.setattr(history_store.time, "time", lambda: later)
+    assert HistoryStore("history.sqlite").count("old") == 0
+
+
+def test_clear_empties_memory_and_disk():
+    store = HistoryStore("history.sqlite")
+    history = SessionHistory(store, max_entries=1)
+    for i in range(3):
+        history.add(result(i))
+    history.clear()
+    assert len(history) == 0 and store.count(history.session_id) == 0
@@ -0,0 +1,80 @@
+from prompt_budget import Section, compact_sources, estimate_tokens, fit_sections, table
+
+
+def rows(n, prefix="D"):
+    return [f"{prefix}{i}|{1000 * (n - i):,}" for i in range(n)]
+
+
+def test_token_estimate():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Punjab rice") == 2
+    assert estimate_tokens("1,234,567") == 5
+    assert estimate_tokens("a|b\nc") == 5
+    # Long words count as several tokens
+    assert estimate_tokens("Thiruvananthapuram") == 3
+
+
+def test_table_is_pipe_separated():
+    assert table(["state", "mm"], [("Goa", 1), ("Kerala", 2)]) == ("state|mm", ["Goa|1", "Kerala|2"])
+
+
+def test_everything_fits_a_large_budget():
+    sections = [Section("a", "A:", rows(3)), Section("b", "B:", rows(3))]
+    summary, stats = fit_sections(sections, 1000)
+    assert summary == "\n\n".join(section.render() for section in sections)
+    assert stats["saved"] == 0 and stats["truncated"] == stats["omitted"] == []
+    assert stats["tokens"] == stats["full_tokens"] <= 1000
+
+
+def test_trailing_rows_are_cut_with_a_marker():
+    section = Section("districts", "Districts:", rows(40), ["district|t"])
+    text = section.fit(60)
+    assert estimate_tokens(text) <= 60
+    lines = text.split("\n")
+    assert lines[:3] == ["Districts:", "district|t", "D0|40,000"]
+    kept = len(lines) - 3
+    assert lines[-1] == f"… {40 - kept} more rows omitted"
+
+
+def test_chronological_sections_keep_both_ends():
+    section = Section("years", "Years:", [f"{2000 + i}|{i}" for i in range(15)], keep="ends")
+    lines = section.render(4).split("\n")
+    assert lines == ["Years:", "2000|0", "2001|1", "… 11 rows omitted", "2013|13", "2014|14"]
+
+
+def test_sections_are_filled_in_priority_order():
+    first = Section("first", "First:", rows(30, "F"))
+    second = Section("second", "Second:", rows(30, "S"))
+    # The earlier section takes what it needs; the later one gets what is left
+    summary, stats = fit_sections([first, second], 300)
+    assert summary.startswith(first.render() + "\n\nSecond:\nS0|30,000")
+    assert stats["truncated"] == ["second"] and stats["omitted"] == []
+    assert stats["tokens"] <= 300
+    assert stats["saved"] == stats["full_tokens"] - stats["tokens"] > 0
+
+    summary, stats = fit_sections([second, first], 300)
+    assert summary.startswith(second.render())
+    assert stats["truncated"] == ["first"]
+
+
+def test_lowest_priority_sections_are_dropped_and_named():
+    overview = Section("crop_overview", "Overview:", ["- Records: 1,200", "- States: Punjab"], min_rows=2)
+    big = Section("district_ranking", "Districts:", rows(40), min_rows=30)
+    summary, stats = fit_sections([overview, big], 40)
+    assert summary.startswith("Overview:\n- Records: 1,200\n- States: Punjab")
+    assert stats["omitted"] == ["district_ranking"]
+    assert summary.endswith("Omitted for length: district ranking")
+
+
+def test_a_section_below_its_minimum_is_dropped_not_shrunk():
+    section = Section("overview", "Overview:", ["- one", "- two", "- three"], min_rows=3)
+    assert section.fit(3) is None
+    assert section.min_rows == 3 and Section("x", "X:", ["a"], min_rows=5).min_rows == 1
+
+
+def test_sources_are_grouped_per_api():
+    assert compact_sources([
+        "Crop Production API - Punjab, Rice, 2013",
+        "Crop Production API - Tamil Nadu, Rice, 2013",
+        "Rainfall API",
+    ]) == ["Crop Production API: Punjab, Rice, 2013; Tamil Nadu, Rice, 2013", "Rainfall API"]
@@ -0,0 +1,64 @@
+import pytest
+
+from query_analyzer import EntityMatcher, QueryAnalyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return QueryAnalyzer(vocabulary={"crops": ["Arhar/Tur", "Moong(Green Gram)"],
+                                     "districts": ["Amritsar", "North Goa"]})
+
+
+def test_longest_term_at_a_position_wins():
+    matcher = EntityMatcher({"state": {"Goa": "Goa"}, "district": {"North Goa": "North Goa", "North": "North"}})
+    assert matcher.scan("rain in north goa and goa") == [("district", "North Goa"), ("state", "Goa")]
+
+
+def test_terms_match_whole_words_only():
+    matcher = EntityMatcher({"crop": {"Gram": "Gram"}})
+    assert matcher.scan("Program on gram, not grammar") == [("crop", "Gram")]
+
+
+def test_matching_ignores_case_and_spacing():
+    matcher = EntityMatcher({"state": {"Tamil Nadu": "Tamil Nadu"}})
+    assert matcher.scan("TAMIL   nadu") == [("state", "Tamil Nadu")]
+
+
+def test_empty_vocabulary_still_matches_years():
+    assert EntityMatcher({}).scan("in 2013") == [("year", 2013)]
+
+
+def test_aliases_map_to_the_dataset_name(analyzer):
+    result = analyzer.analyze("Tur and green gram output in Punjab")
+    assert result["crops"] == ["Arhar/Tur", "Moong(Green Gram)"]
+    assert result["states"] == ["Punjab"]
+
+
+def test_entities_are_collected_once_in_order(analyzer):
+    result = analyzer.analyze("Compare rice in Punjab and Tamil Nadu and Punjab's Amritsar in 2013")
+    assert result["query_type"] == "comparison"
+    assert result["states"] == ["Punjab", "Tamil Nadu"]
+    assert result["districts"] == ["Amritsar"]
+    assert result["years"] == [2013]
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Wheat trend in Haryana from 2005 to 2014", ((2005, 2014), [2005, 2014], None)),
+    ("Wheat between 2014 and 2010", ((2010, 2014), [2010, 2014], None)),
+    ("Wheat in Haryana over the last 5 years", (None, [], 5)),
+])
+def test_years_ranges_and_last_n(analyzer, question, expected):
+    result = analyzer.analyze(question)
+    assert (result["year_range"], result["years"], result["last_n"]) == expected
+
+
+@pytest.mark.parametrize("question, query_type, order", [
+    ("Which state has the lowest maize production?", "ranking", "asc"),
+    ("Top rice producing states", "ranking", "desc"),
+    ("How does rainfall affect cotton in Maharashtra?", "correlation", None),
+    ("Rice in Punjab over the last 3 years", "trend", None),
+    ("Rice in Punjab", "general", None),
+])
+def test_query_type_and_ranking_order(analyzer, question, query_type, order):
+    result = analyzer.analyze(question)
+    assert (result["query_type"], result["ranking_order"]) == (query_type, order)
@@ -0,0 +1,115 @@
+import datetime
+
+import pandas as pd
+
+from query_planner import DEFAULT_COVERAGE, QueryPlanner, last_complete_year
+
+COVERAGE = {"crop_data": (1997, 2014), "rainfall_data": (2018, 2021)}
+
+
+def analysis(query_type="comparison", states=(), crops=(), years=(), **extra):
+    return {"query_type": query_type, "states": list(states), "crops": list(crops),
+            "districts": [], "seasons": [], "years": list(years), "year_range": None,
+            "last_n": None, **extra}
+
+
+def planner(**kwargs):
+    return QueryPlanner(coverage=COVERAGE.get, **kwargs)
+
+
+def test_comparison_splits_per_state():
+    plan = planner().plan(analysis(states=["Punjab", "Tamil Nadu"], crops=["Rice"], years=[2013]))
+    assert [r.kwargs for r in plan.requests] == [
+        {"state": "Punjab", "crop": "Rice", "year": 2013, "limit": 200},
+        {"state": "Tamil Nadu", "crop": "Rice", "year": 2013, "limit": 200},
+    ]
+    assert plan.estimated_requests == 2
+    assert not any(r.truncated for r in plan.requests)
+
+
+def test_ranking_drops_the_state_filter_within_the_bulk_limit():
+    plan = planner().plan(analysis("ranking", crops=["Maize"], years=[2010]))
+    request, = plan.requests
+    assert request.kwargs == {"state": None, "crop": "Maize", "year": 2010, "limit": 20000}
+    assert request.rows == 60 * 20 and request.pages == 2
+    assert not request.truncated
+
+
+def test_served_requests_cost_nothing():
+    plan = planner(is_cached=lambda dataset, kwargs: True).plan(
+        analysis(states=["Punjab"], crops=["Rice"], years=[2013]))
+    assert [r.status for r in plan.requests] == ["cached"]
+    assert plan.estimated_requests == 0
+    assert "1 served from cache or local data" in plan.explain()
+
+
+def test_history_is_fetched_per_year_without_truncation():
+    plan = planner().plan(analysis("trend", states=["Kerala"]))
+    assert [r.kwargs for r in plan.requests] == [
+        {"state": "Kerala", "year": year, "limit": 12000} for year in range(2018, 2022)]
+    assert not any(r.truncated for r in plan.requests)
+
+
+def test_correlation_drops_crop_years_and_keeps_them_locally():
+    plan = planner().plan(analysis("correlation", states=["Maharashtra"], crops=["Cotton"]))
+    crop, *rain = plan.requests
+    assert crop.kwargs["year"] is None
+    assert crop.local == {"year": list(range(1997, 2015))}
+    assert crop.needs == 18
+    assert [r.kwargs["year"] for r in rain] == [2018, 2019, 2020, 2021]
+
+
+def test_a_truncating_drop_is_never_chosen():
+    plan = planner().plan(analysis("comparison", states=["Kerala", "Goa", "Punjab"], years=[2020]))
+    assert [r.kwargs["state"] for r in plan.requests] == ["Kerala", "Goa", "Punjab"]
+    assert all(r.local == {} for r in plan.requests)
+
+
+def test_request_over_the_limit_is_marked_truncated():
+    request = planner()._request("rainfall_data", {"state": None, "year": 2020}, {}, 1)
+    assert request.truncated
+    assert request.rows == request.kwargs["limit"] == 12000
+    assert "truncated by limit" in request.describe()
+
+
+def test_years_count_back_from_coverage_and_clamp_crop_years():
+    p = planner()
+    assert p.years(analysis(last_n=3), "crop_data") == [2012, 2013, 2014]
+    assert p.years(analysis(years=[2020]), "crop_data") == [2014]
+    assert p.years(analysis(years=[2020]), "rainfall_data") == [2020]
+    assert p.years(analysis(years=[2010]), "rainfall_data") == []
+
+
+def test_select_keeps_the_asked_values_case_insensitively():
+    plan = planner().plan(analysis("correlation", states=["Punjab"], crops=["Rice"]))
+    crop = plan.requests[0]
+    crop.local = {"year": [2000, 2001]}
+    df = pd.DataFrame({"state_name": ["Punjab"] * 3, "crop": ["Rice"] * 3, "crop_year": [1999, 2000, 2001]})
+    assert crop.select(df)["crop_year"].tolist() == [2000, 2001]
+
+    crop.local = {"state": ["punjab"]}
+    df["state_name"] = pd.Categorical(["PUNJAB", "Goa", "Punjab"])
+    assert crop.select(df)["crop_year"].tolist() == [1999, 2001]
+
+
+def test_a_state_year_of_rainfall_is_read_whole():
+    plan = planner().plan(analysis("comparison", states=["Kerala"], years=[2020]))
+    request, = plan.requests
+    assert request.kwargs == {"state": "Kerala", "year": 2020, "limit": 12000}
+    assert request.pages == 11
+    assert not request.truncated
+
+
+def test_a_crop_trend_plans_rainfall_only_when_asked():
+    question = analysis("trend", states=["Haryana"], crops=["Wheat"], last_n=5,
+                        original_query="Wheat production trend in Haryana over the last 5 years")
+    assert {r.dataset for r in planner().plan(question).requests} == {"crop_data"}
+
+    question["original_query"] = "Wheat production and monsoon rainfall trend in Haryana"
+    assert {r.dataset for r in planner().plan(question).requests} == {"crop_data", "rainfall_data"}
+
+
+def test_rainfall_coverage_ends_at_the_last_complete_year():
+    assert last_complete_year(datetime.date(2024, 12, 31)) == 2024
+    assert last_complete_year(datetime.date(2025, 3, 1)) == 2024
+    assert DEFAULT_COVERAGE["rainfall_data"][1] == last_complete_year(datetime.date.today())
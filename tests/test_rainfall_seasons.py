@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlation
+import rainfall_seasons as rs
+
+
+def daily(state="Kerala", districts=("A", "B"), start="2018-01-01", end="2019-12-31", mm=2.0, every=1):
+    dates = pd.date_range(start, end, freq=f"{every}D")
+    df = pd.DataFrame({
+        "State": state,
+        "District": np.repeat(list(districts), len(dates)),
+        "Date": np.tile(dates, len(districts)),
+        "Avg_rainfall": mm,
+    })
+    df["Year"], df["Month"] = df["Date"].dt.year, df["Date"].dt.month
+    return df
+
+
+def test_season_lengths():
+    assert rs.SEASON_DAYS["Kharif"] == 153
+    assert rs.SEASON_DAYS["Rabi"] == 151
+    assert rs.SEASON_DAYS[rs.ANNUAL] == 365
+
+
+def test_monthly_sums_days_and_rollup_rows():
+    months = rs.monthly(daily(districts=("A",), end="2018-02-28"))
+    assert months[["Month", "rain_sum", "days"]].values.tolist() == [[1, 62.0, 31], [2, 56.0, 28]]
+
+    rollup = pd.DataFrame({"State": ["Goa"], "Year": [2018], "Month": [6],
+                           "Avg_rainfall_sum": [300.0], "records": [30]})
+    row, = rs.monthly(rollup).itertuples(index=False)
+    assert (row.District, row.rain_sum, row.days) == ("", 300.0, 30)
+    assert rs.monthly(None).empty
+
+
+def test_rabi_months_in_january_belong_to_the_previous_crop_year():
+    df = daily(districts=("A",), start="2018-11-01", end="2019-03-31")
+    rabi = rs.seasonal(rs.monthly(df), ["Rabi"])
+    assert rabi["Year"].tolist() == [2018]
+    assert rabi["days"].tolist() == [151]
+
+
+def test_partial_seasons_are_scaled_to_their_length_with_coverage():
+    seasons = rs.seasonal(rs.monthly(daily(every=2)), ["Monsoon", rs.ANNUAL])
+    monsoon = seasons[seasons["Season"] == "Monsoon"]
+    assert monsoon["mm"].tolist() == pytest.approx([2.0 * 122] * 4)
+    assert monsoon["coverage"].tolist() == pytest.approx([61 / 122] * 4, abs=0.01)
+
+
+def test_by_state_averages_districts():
+    df = pd.concat([daily(districts=("A",), mm=1.0), daily(districts=("B",), mm=3.0)])
+    per_state = rs.by_state(rs.annual(rs.monthly(df)), ["Year"])
+    assert per_state["mm"].tolist() == pytest.approx([730.0, 730.0])
+    assert per_state["districts"].tolist() == [2, 2]
+
+
+def test_correlation_quotes_the_same_annual_rainfall():
+    df = daily(every=3)
+    df.loc[df["District"] == "B", "Avg_rainfall"] = 5.0
+    tables = rs.by_state(rs.annual(rs.monthly(df)), ["Year"])
+    annual = correlation.annual_rainfall(correlation.rainfall_months(df), "state")
+    assert annual["annual_mm"].tolist() == pytest.approx(tables["mm"].tolist())
+    assert annual["state"].tolist() == ["KERALA", "KERALA"]
+
+
+def test_names_map_categories_once_and_keep_missing():
+    series = pd.Series(pd.Categorical([" goa", None, "Goa "]))
+    assert rs.names(series).tolist() == ["goa", None, "Goa"]
+    assert rs.names(series, upper=True).tolist() == ["GOA", None, "GOA"]
+    assert rs.names(pd.Series([" Kerala"])).tolist() == ["Kerala"]
+
+
+def test_crop_season_rainfall_matches_on_year_or_falls_back_to_means():
+    seasons = rs.seasonal(rs.monthly(daily()), ["Kharif"])
+    crop = pd.DataFrame({"state_name": ["Kerala"] * 2, "season": ["Kharif "] * 2,
+                         "crop_year": [2018, 2019], "production_": [100.0, 300.0]})
+    joined = rs.crop_season_rainfall(crop, seasons)
+    assert joined[["State", "Season", "production", "years", "matched"]].values.tolist() == [
+        ["KERALA", "Kharif", 200.0, 2, True]]
+    assert joined["mm"].iloc[0] == pytest.approx(2.0 * 153)
+
+    old = crop.assign(crop_year=[2000, 2001])
+    joined = rs.crop_season_rainfall(old, seasons)
+    assert not joined["matched"].iloc[0] and joined["years"].iloc[0] == 0
+
+
+def test_summaries_withhold_totals_from_thin_or_truncated_rainfall(stub):
+    from ai_system import IntelligentQASystem
+
+    qa = IntelligentQASystem(use_async=False)
+    assert "rainfall_by_state" in [s.key for s in qa._rain_sections(daily(every=3))]
+
+    thin = daily(every=10)
+    sections = qa._rain_sections(thin)
+    assert [s.key for s in sections] == ["rain_overview"]
+    assert sections[0].rows[-1].startswith("- Not enough data to state rainfall totals")
+    assert qa._rain_trend_sections(thin) == []
+
+    # Cut rows keep a partial table instead of totals
+    cut = daily()
+    cut.attrs["truncated"] = True
+    overview, partial = qa._rain_sections(cut)
+    assert overview.rows[-1].startswith("- Partial: the API row limit kept only the first")
+    assert "partial" in partial.title and "annual_mm" not in partial.header[0]
+    assert qa._rain_trend_sections(cut) == []
@@ -0,0 +1,74 @@
+import pytest
+
+from data_handler import DataGovAPI
+from rainfall_store import RainfallStore
+from rollups import RollupStore
+
+PUNJAB_ROWS = 4 * 122 * 8  # 2018-2021, every third day, 8 districts
+
+
+@pytest.fixture
+def api(stub):
+    return DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+
+
+def test_a_full_sync_is_complete_and_served(api):
+    store = RainfallStore("store")
+    assert store.sync(api, ["Punjab"]) == {"Punjab": PUNJAB_ROWS}
+    mark = store.watermark("Punjab")
+    assert mark["rows"] == mark["total"] == PUNJAB_ROWS
+    assert mark["complete"] and mark["max_date"] == "2021-12-30"
+    assert store.has_state("Punjab") and not store.has_state("Kerala")
+    assert len(store.query(state="Punjab", year=2019)) == 976
+    assert "data through 2021-12-30" in store.freshness("Punjab")
+
+
+def test_serves_only_complete_years_of_complete_syncs(api):
+    store = RainfallStore("store")
+    store.sync(api, ["Punjab"])
+    assert store.serves("Punjab", 2020)
+    assert store.serves("Punjab")
+    # The newest synced year may still be growing upstream
+    assert not store.serves("Punjab", 2021)
+    assert not store.serves("Kerala", 2020)
+    assert not store.serves(None, 2020)
+
+
+def test_an_interrupted_sync_resumes_from_its_watermark(api, stub):
+    store = RainfallStore("store")
+    assert store.sync_state(api, "Punjab", max_rows=1500) == 1500
+    mark = store.watermark("Punjab")
+    assert mark["rows"] == 1500 and not mark["complete"]
+    assert not store.serves("Punjab", 2018)
+
+    stub.requests["data"] = 0
+    assert store.sync_state(api, "Punjab") == PUNJAB_ROWS - 1500
+    # Only the pages past the watermark were asked for
+    assert stub.requests["data"] == 3
+    assert store.watermark("Punjab")["complete"]
+    assert len(store.query(state="Punjab")) == PUNJAB_ROWS
+    assert store.sync(api, ["Punjab"]) == {"Punjab": 0}
+
+
+def test_sync_feeds_the_rollups_exactly_the_new_rows(api):
+    store, rollups = RainfallStore("store"), RollupStore("rollups")
+    store.sync_state(api, "Punjab", rollups, max_rows=1500)
+    store.sync_state(api, "Punjab", rollups)
+    cube = rollups.lookup("rainfall_data", state="Punjab")
+    assert cube["records"].sum() == PUNJAB_ROWS
+    assert rollups.seasons(state="Punjab") is not None
+
+
+def test_partial_rollups_are_not_served_for_questions(stub):
+    from ai_system import IntelligentQASystem
+
+    qa = IntelligentQASystem(use_async=False)
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+    qa.data_api.rainfall_store.sync_state(api, "Punjab", qa.rollups, max_rows=1500)
+    job = {"state": "Punjab", "year": 2018, "limit": 12000}
+    assert qa.rollups.lookup("rainfall_data", **job) is not None
+    assert qa.needs_fetch("rainfall_data", job)
+
+    qa.data_api.rainfall_store.sync_state(api, "Punjab", qa.rollups)
+    assert not qa.needs_fetch("rainfall_data", job)
+    assert qa.needs_fetch("rainfall_data", dict(job, year=2021))
@@ -0,0 +1,105 @@
+import random
+import time
+from email.utils import formatdate
+
+import pytest
+
+import data_handler
+from data_handler import DataGovAPI, RateLimiter
+from request_control import CircuitBreaker, CircuitOpenError, backoff_delay, parse_retry_after
+
+
+def test_rate_limiter_halves_to_a_floor_and_relaxes_to_a_ceiling():
+    limiter = RateLimiter(4.0)
+    for _ in range(5):
+        limiter.throttle()
+    assert limiter.rate == limiter.min_rate == 0.5
+    for _ in range(100):
+        limiter.relax()
+    assert limiter.rate == limiter.max_rate == 8.0
+
+    capped = RateLimiter(4.0, max_rate=4.0)
+    capped.throttle()
+    for _ in range(100):
+        capped.relax()
+    assert capped.rate == 4.0
+
+
+def test_throttle_pauses_for_retry_after():
+    limiter = RateLimiter(100.0, burst=1)
+    limiter.throttle(retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_backoff_is_jittered_within_a_growing_window_and_honours_retry_after():
+    random.seed(0)
+    delays = [backoff_delay(3, base=0.5, cap=30.0) for _ in range(200)]
+    assert 0 <= min(delays) and max(delays) <= 4.0
+    assert len(set(delays)) > 100
+    assert backoff_delay(0, base=0.5, retry_after=10.0) == 10.0
+    assert backoff_delay(0, base=0.5, cap=5.0, retry_after=60.0) == 5.0
+
+
+def test_circuit_breaker_opens_probes_and_closes(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock[0] += 30
+    assert breaker.state == "half-open"
+    breaker.before_request()  # the one probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock[0] += 30
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def no_backoff(stub, monkeypatch):
+    monkeypatch.setattr(data_handler, "backoff_delay", lambda attempt, retry_after=None: 0.0)
+    stub.retry_after = 0
+    yield
+    stub.retry_after = 0.2
+
+
+def test_retries_recover_from_injected_errors(stub, no_backoff):
+    random.seed(1)
+    stub.error_rate = 0.3
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0, max_retries=10)
+    api.BATCH_SIZE = 50
+    df = api.fetch_rainfall_data(state="Kerala", year=2019, limit=5000)
+    assert stub.requests["errors"] > 0
+    assert not df.attrs["partial"] and not df.attrs["truncated"]
+    assert len(df) == df.attrs["total"]
+
+
+def test_exhausted_retries_give_up_and_open_the_breaker(stub, no_backoff):
+    stub.error_rate = 1.0
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    api = DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0, max_retries=200,
+                     breaker=breaker)
+    assert api.fetch_rainfall_data(state="Kerala", year=2019) is None
+    # Every attempt until the first 503 opened the circuit, then nothing more was sent
+    assert breaker.state == "open"
+    assert stub.requests["data"] < 200
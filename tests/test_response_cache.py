@@ -0,0 +1,76 @@
+import pickle
+import time
+
+import pytest
+
+import response_cache
+from data_handler import DataGovAPI
+from response_cache import ResponseCache
+
+PAGE = {"total": 1, "records": [{"State": "Tamil Nādu", "Avg_rainfall": "1.5"}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_ignores_credentials_order_and_types():
+    key = ResponseCache.make_key("u", {"api-key": "a", "format": "json", "offset": 0, "filters[State]": "Goa"})
+    assert key == ResponseCache.make_key("u", {"filters[State]": " Goa", "offset": "0", "api-key": "b"})
+    assert key != ResponseCache.make_key("u", {"filters[State]": "Goa", "offset": 1000})
+    assert key != ResponseCache.make_key("v", {"filters[State]": "Goa", "offset": 0})
+    assert key == ResponseCache.make_key("u", {"filters[State]": "Goa", "offset": 0, "filters[Year]": None})
+
+
+def test_round_trip_and_per_resource_ttl(clock):
+    cache = ResponseCache("pages.sqlite", ttls={"crop": 100.0}, default_ttl=10.0)
+    cache.put("crop", {"offset": 0}, PAGE)
+    cache.put("rain", {"offset": 0}, PAGE)
+    assert cache.get("crop", {"offset": 0}) == PAGE
+
+    clock[0] += 50
+    assert cache.get("rain", {"offset": 0}) is None
+    assert cache.get("crop", {"offset": 0}) == PAGE
+    clock[0] += 60
+    assert cache.get("crop", {"offset": 0}) is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_pages_are_evicted(clock):
+    cache = ResponseCache("pages.sqlite", max_bytes=10_000)
+    big = {"records": ["x" * 3000]}
+    for offset in range(3):
+        clock[0] += 1
+        cache.put("u", {"offset": offset}, big)
+    clock[0] += 1
+    assert cache.get("u", {"offset": 0}) == big  # now the most recently used
+    clock[0] += 1
+    cache.put("u", {"offset": 3}, big)
+    assert cache.get("u", {"offset": 1}) is None
+    assert cache.get("u", {"offset": 0}) == big
+    assert cache.stats()["bytes"] <= 10_000
+
+
+def test_pages_are_json_and_old_pickles_are_dropped():
+    cache = ResponseCache("pages.sqlite")
+    cache.put("u", {"offset": 0}, PAGE)
+    payload, = cache.conn.execute("SELECT payload FROM pages").fetchone()
+    assert payload.decode().startswith('{"total":1')
+
+    cache.conn.execute("UPDATE pages SET payload = ?", (pickle.dumps(PAGE),))
+    assert cache.get("u", {"offset": 0}) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_client_serves_repeat_fetches_from_the_cache(stub):
+    cache = ResponseCache("pages.sqlite", ttls=DataGovAPI.CACHE_TTLS)
+    api = DataGovAPI(use_snapshot=False, cache=cache, requests_per_second=0)
+    first = api.fetch_crop_data(state="Punjab", crop="Rice")
+    sent = stub.requests["data"]
+    again = api.fetch_crop_data(state="Punjab", crop="Rice")
+    assert stub.requests["data"] == sent
+    assert again.equals(first)
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import CROP_RESOURCE, RAINFALL_RESOURCE, synthetic_fixtures
+from rollups import RollupStore
+from schemas import CROP_SCHEMA, RAINFALL_SCHEMA, records_to_frame
+
+
+@pytest.fixture(scope="module")
+def raw():
+    fixtures = synthetic_fixtures()
+    return (records_to_frame(fixtures[CROP_RESOURCE], CROP_SCHEMA),
+            records_to_frame(fixtures[RAINFALL_RESOURCE], RAINFALL_SCHEMA))
+
+
+def test_crop_lookup_matches_the_raw_rows(raw):
+    crop, _ = raw
+    store = RollupStore("rollups")
+    store.build_crop(crop)
+    rows = store.lookup("crop_data", state="Punjab", crop="Rice", year=2010)
+    expected = crop[(crop["state_name"] == "Punjab") & (crop["crop"] == "Rice") & (crop["crop_year"] == 2010)]
+    assert rows["production_"].sum() == pytest.approx(expected["production_"].sum())
+    assert rows["records"].sum() == len(expected)
+    assert set(rows["district_name"]) == set(expected["district_name"].astype(str))
+
+
+def test_unanswerable_jobs_fall_through(raw):
+    store = RollupStore("rollups")
+    assert store.lookup("crop_data", state="Punjab") is None  # not built
+    store.build_crop(raw[0])
+    assert store.lookup("crop_data", state="Punjab", season="Kharif") is None
+    assert store.lookup("crop_data", state="Atlantis") is None
+    assert store.lookup("rainfall_data", state="Kerala") is None
+
+
+def test_update_folds_new_rows_like_a_rebuild(raw):
+    crop, _ = raw
+    half = len(crop) // 2
+    folded, rebuilt = RollupStore("folded"), RollupStore("rebuilt")
+    folded.build_crop(crop.iloc[:half])
+    folded.update_crop(crop.iloc[half:])
+    rebuilt.build_crop(crop)
+    for name in ("crop_state", "crop_district"):
+        pd.testing.assert_frame_equal(folded.cube(name).sort_index(), rebuilt.cube(name).sort_index(),
+                                      check_dtype=False)
+
+
+def test_rainfall_months_and_seasons(raw):
+    _, rain = raw
+    store = RollupStore("rollups")
+    store.build_rainfall(rain)
+    months = store.lookup("rainfall_data", state="Kerala", year=2019)
+    kerala = rain[(rain["State"] == "Kerala") & (rain["Year"] == 2019)]
+    assert months["Avg_rainfall_sum"].sum() == pytest.approx(float(kerala["Avg_rainfall"].sum()), rel=1e-5)
+    assert sorted(months["Month"].unique()) == list(range(1, 13))
+
+    seasons = store.seasons(state="Kerala", year=2019, season="Whole Year")
+    assert len(seasons) == kerala["District"].nunique()
+    assert seasons["coverage"].between(0, 1).all()
+
+
+def test_cubes_persist_across_instances(raw):
+    RollupStore("rollups").build_crop(raw[0])
+    reopened = RollupStore("rollups")
+    assert reopened.available() == ["crop_state", "crop_district"]
+    assert reopened.lookup("crop_data", state="Punjab", crop="Rice") is not None
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from schemas import RAINFALL_SCHEMA, CategoryDictionary, assemble_chunks, records_to_frame
+
+
+def test_missing_values_stay_missing():
+    dictionary = CategoryDictionary()
+    values = dictionary.encode("state", pd.Series([" Kerala", None, np.nan, "Goa"], dtype=object))
+    assert values.codes.tolist() == [0, -1, -1, 1]
+    assert values.categories.tolist() == ["Kerala", "Goa"]
+
+
+def test_categorical_input_is_recoded_onto_the_shared_list():
+    dictionary = CategoryDictionary()
+    dictionary.encode("state", pd.Series(["Goa"]))
+    values = dictionary.encode("state", pd.Series(pd.Categorical(["Kerala ", None, "Goa"])))
+    assert values.categories.tolist() == ["Goa", "Kerala"]
+    assert values.codes.tolist() == [1, -1, 0]
+
+
+def test_older_chunks_are_a_prefix_of_newer_ones():
+    dictionary = CategoryDictionary()
+    first = dictionary.encode("state", pd.Series(["Goa"]))
+    second = dictionary.encode("state", pd.Series(["Kerala", "Goa"]))
+    assert dictionary.shares("state", pd.Series(first))
+    assert list(second.categories[:len(first.categories)]) == list(first.categories)
+
+
+def test_chunks_assemble_with_types_kept():
+    chunks = [records_to_frame([{"State": "Goa", "Avg_rainfall": "1.5", "Year": "2019"}], RAINFALL_SCHEMA),
+              records_to_frame([{"State": "Kerala", "Avg_rainfall": "bad", "Year": "2020"},
+                                {"State": None, "Avg_rainfall": "2", "Year": "2020"}], RAINFALL_SCHEMA)]
+    df = assemble_chunks(chunks)
+    assert isinstance(df["State"].dtype, pd.CategoricalDtype)
+    assert df["State"].astype(object).where(df["State"].notna(), None).tolist() == ["Goa", "Kerala", None]
+    assert str(df["Avg_rainfall"].dtype) == "float32" and df["Avg_rainfall"].isna().tolist() == [False, True, False]
+    assert str(df["Year"].dtype) == "Int16"
+    assert assemble_chunks([None, pd.DataFrame()]) is None
@@ -0,0 +1,74 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from single_flight import SingleFlight
+
+BROAD = {"state": "Punjab", "crop": None, "year": 2013, "limit": 200}
+RICE = {"state": "Punjab", "crop": "Rice", "year": 2013, "limit": 200}
+FRAME = pd.DataFrame({"state_name": ["Punjab"] * 3, "crop": ["Rice", "Wheat", "rice"],
+                      "crop_year": [2013] * 3, "production_": [10.0, 20.0, 30.0]})
+
+
+def test_roles():
+    flights = SingleFlight()
+    leader, role = flights.join("crop_data", BROAD)
+    assert role == "leader" and flights.in_flight("crop_data", BROAD)
+    assert flights.join("crop_data", dict(BROAD)) == (leader, "coalesced")
+    assert flights.join("crop_data", RICE) == (leader, "subset")
+    assert flights.join("crop_data", RICE, broader=False)[1] == "leader"
+    assert flights.join("rainfall_data", {"state": "Punjab", "year": 2013})[1] == "leader"
+
+    flights.finish(leader, FRAME)
+    assert leader.future.result() is FRAME
+    assert not flights.in_flight("crop_data", BROAD)
+    assert flights.join("crop_data", BROAD)[1] == "leader"
+    assert flights.stats()["saved"] == 1
+
+
+def test_covers_compares_filters_case_insensitively():
+    assert SingleFlight.covers("crop_data", {"state": "punjab "}, {"state": "Punjab", "crop": "Rice"})
+    assert not SingleFlight.covers("crop_data", {"state": "Punjab", "crop": "Rice"}, {"state": "Punjab"})
+    assert not SingleFlight.covers("crop_data", {"state": "Goa"}, {"state": "Punjab"})
+
+
+def test_leader_errors_reach_the_waiters():
+    flights = SingleFlight()
+    leader, _ = flights.join("crop_data", BROAD)
+    waiter, _ = flights.join("crop_data", BROAD)
+    flights.finish(leader, error=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        waiter.future.result()
+
+
+def test_narrow_filters_the_broad_frame():
+    rows = SingleFlight.narrow("crop_data", FRAME, BROAD, RICE)
+    assert rows["production_"].tolist() == [10.0, 30.0]
+    assert rows.attrs == {"partial": False, "truncated": False, "total": None}
+
+
+def test_narrow_refuses_frames_that_may_miss_rows():
+    partial = FRAME.copy()
+    partial.attrs["partial"] = True
+    assert SingleFlight.narrow("crop_data", partial, BROAD, RICE) is None
+    assert SingleFlight.narrow("crop_data", FRAME, dict(BROAD, limit=3), RICE) is None
+    assert SingleFlight.narrow("crop_data", None, BROAD, RICE) is None
+
+
+def test_concurrent_questions_share_one_download(stub):
+    from ai_system import IntelligentQASystem
+
+    stub.latency = 0.2
+    qa = IntelligentQASystem(use_async=False, answer_sla=0)
+    qa.data_api.crop_snapshot = qa.data_api.rainfall_store = None
+    job = ("crop_data", {"state": "Punjab", "crop": "Rice", "year": None, "limit": 20000}, "src")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(qa.run_jobs([job])[0])) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.requests["data"] == 1
+    assert len({len(df) for df in results}) == 1 and len(results) == 4
+    assert qa.single_flight.stats()["leaders"] == 1
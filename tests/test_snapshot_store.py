@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_handler import DataGovAPI
+from snapshot_store import CropSnapshotStore
+
+CROP_ROWS = 6 * 8 * 18 * 6 * 2  # states x districts x years x crops x seasons
+
+
+@pytest.fixture
+def api(stub):
+    return DataGovAPI(use_snapshot=False, use_cache=False, requests_per_second=0)
+
+
+@pytest.fixture
+def snapshot(api):
+    store = CropSnapshotStore("snapshot")
+    store.ingest(api)
+    return store
+
+
+def test_ingest_writes_the_whole_table_and_its_manifest(snapshot):
+    assert snapshot.exists()
+    manifest = snapshot.manifest()
+    assert manifest["rows"] == CROP_ROWS
+    assert manifest["states"] == 6 and manifest["years"] == [1997, 2014]
+    assert not os.path.exists("snapshot.tmp")
+
+
+def test_queries_push_filters_down_and_return_plain_types(snapshot):
+    df = snapshot.query(state="Punjab", crop="Rice", year=2013)
+    assert len(df) == 8 * 2
+    assert set(df["state_name"]) == {"Punjab"} and set(df["crop_year"]) == {2013}
+    assert df["state_name"].dtype == object and df["crop_year"].dtype == "int64"
+    assert df["production_"].dtype == "float64"
+    assert len(snapshot.query(state="Punjab", season="Kharif ")) == 8 * 18 * 6
+    assert len(snapshot.query(state="Punjab", limit=10)) == 10
+    assert snapshot.query(state="Goa") is None
+
+
+def test_vocabulary(snapshot):
+    vocabulary = snapshot.vocabulary()
+    assert "Tamil Nadu" in vocabulary["states"] and vocabulary["seasons"] == ["Kharif", "Rabi"]
+    assert len(vocabulary["districts"]) == 6 * 8
+
+
+def test_an_unfinished_write_is_not_a_snapshot(api, monkeypatch):
+    store = CropSnapshotStore("snapshot")
+
+    def interrupted(*args, **kwargs):
+        os.makedirs("snapshot.tmp/state_name=Punjab", exist_ok=True)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", interrupted)
+    with pytest.raises(OSError):
+        store.ingest(api)
+    assert not store.exists() and store.manifest() == {}
+
+
+def test_a_rewrite_replaces_the_snapshot(snapshot):
+    rows = snapshot.query(state="Kerala", year=2000)
+    assert snapshot.write(rows) == len(rows)
+    assert snapshot.manifest()["years"] == [2000, 2000]
+    assert snapshot.query(state="Punjab") is None
+
+
+def test_the_client_serves_crop_data_from_the_snapshot(snapshot, stub):
+    api = DataGovAPI(use_cache=False, requests_per_second=0)
+    api.crop_snapshot = snapshot
+    stub.requests["data"] = 0
+    df = api.fetch_crop_data(state="Punjab", crop="Wheat", year=2010)
+    assert len(df) == 16 and stub.requests["data"] == 0
+    assert not df.attrs["partial"] and not df.attrs["truncated"]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import trends
+
+
+def production(values, state="Punjab", start=2000):
+    return pd.DataFrame({"state_name": state, "crop_year": range(start, start + len(values)),
+                         "production_": values})
+
+
+def test_yearly_totals_sum_within_each_year():
+    df = pd.concat([production([1.0, 2.0]), production([3.0, np.nan])])
+    totals = trends.yearly_totals(df, ["state_name"], "production_", "crop_year")
+    assert totals[["year", "value"]].values.tolist() == [[2000, 4.0], [2001, 2.0]]
+
+
+def test_slope_growth_and_rolling_mean():
+    yearly = trends.yearly_trends(
+        trends.yearly_totals(production([10.0, 12.0, 14.0, 16.0]), ["state_name"], "production_", "crop_year"),
+        ["state_name"])
+    assert yearly["slope"].tolist() == [2.0] * 4
+    assert yearly["trend"].tolist() == pytest.approx([10.0, 12.0, 14.0, 16.0])
+    assert yearly["growth"].tolist()[1:] == pytest.approx([0.2, 2 / 12, 2 / 14])
+    assert yearly["rolling"].tolist() == pytest.approx([10.0, 11.0, 12.0, 14.0])
+    assert not yearly["anomaly"].any()
+
+
+def test_groups_get_their_own_lines():
+    df = pd.concat([production([10.0, 20.0, 30.0]), production([9.0, 6.0, 3.0], state="Bihar")])
+    summary = trends.analyze(df, ["state_name"], "production_", "crop_year")["summary"].set_index("state_name")
+    assert summary.loc["Punjab", "slope"] == pytest.approx(10.0)
+    assert summary.loc["Bihar", "slope"] == pytest.approx(-3.0)
+    assert summary.loc["Punjab", "change"] == pytest.approx(2.0)
+    assert summary.loc["Punjab", "cagr"] == pytest.approx(3 ** 0.5 - 1)
+    assert summary.loc["Bihar", "years"] == 3
+
+
+def test_cagr_needs_positive_ends():
+    summary = trends.analyze(production([0.0, 5.0, 10.0]), ["state_name"], "production_", "crop_year")["summary"]
+    assert np.isnan(summary["cagr"].iloc[0]) and np.isnan(summary["change"].iloc[0])
+
+
+def test_an_outlier_year_is_flagged_only_with_enough_years():
+    values = [100.0 + i for i in range(12)]
+    values[6] = 400.0
+    result = trends.analyze(production(values), ["state_name"], "production_", "crop_year")
+    flagged = result["anomalies"]
+    assert flagged["year"].tolist() == [2006]
+    assert flagged["deviation"].iloc[0] > 1
+    assert result["summary"]["anomalies"].iloc[0] == 1
+
+    short = trends.analyze(production([100.0, 101.0, 400.0, 103.0]), ["state_name"], "production_", "crop_year")
+    assert short["anomalies"].empty
+
+
+def test_missing_data_gives_empty_tables():
+    result = trends.analyze(None, ["state_name"], "production_", "crop_year")
+    assert all(df.empty for df in result.values())
+    assert trends.percent(0.1234) == "+12.3%" and trends.percent(np.nan) == "n/a"
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# The trace of the question being answered, if any. Worker threads and
+# asyncio tasks see it as long as they run in a copy of the caller's context.
+current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Timing spans for one answer_question call.
+
+    Each span is a plain dict: name, start_ms (relative to the trace start),
+    duration_ms and any attributes the instrumented code attaches (records,
+    bytes, cache_hit, wait_ms, retries, ...).
+    """
+
+    def __init__(self, question: str = ""):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.question = question
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List[dict] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a block; the yielded dict can be given extra attributes"""
+        start = time.perf_counter()
+        span = {"name": name, "start_ms": round((start - self.origin) * 1000, 2), **attrs}
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = repr(e)
+            raise
+        finally:
+            span["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            with self.lock:
+                self.spans.append(span)
+
+    def to_jsonl(self) -> str:
+        with self.lock:
+            spans = list(self.spans)
+        return "".join(
+            json.dumps({"trace_id": self.trace_id, "question": self.question,
+                        "started_at": self.started_at, **span}, default=str) + "\n"
+            for span in spans
+        )
+
+    def export(self, path: str):
+        """Append every span as one JSON line"""
+        with open(path, "a") as f:
+            f.write(self.to_jsonl())
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Span on the current trace, or a no-op when nothing is being traced"""
+    trace = current_trace.get()
+    if trace is None:
+        yield {}
+        return
+    with trace.span(name, **attrs) as s:
+        yield s
+
+
+def breakdown(spans: List[dict]) -> List[dict]:
+    """Per span name: count, total and max duration, and summed counters"""
+    rows: Dict[str, dict] = {}
+    for s in spans:
+        row = rows.setdefault(s["name"], {"stage": s["name"], "count": 0, "total_ms": 0.0,
+                                          "max_ms": 0.0, "records": 0, "bytes": 0, "cache_hits": 0,
+                                          "retries": 0})
+        row["count"] += 1
+        row["total_ms"] = round(row["total_ms"] + s.get("duration_ms", 0.0), 2)
+        row["max_ms"] = max(row["max_ms"], s.get("duration_ms", 0.0))
+        row["records"] += s.get("records") or 0
+        row["bytes"] += s.get("bytes") or 0
+        row["cache_hits"] += 1 if s.get("cache_hit") else 0
+        row["retries"] += s.get("retries") or 0
+    return sorted(rows.values(), key=lambda r: r["stage"])
+
+
+def percentiles(path: str, quantiles=(0.5, 0.95)) -> Dict[str, Dict[str, float]]:
+    """p50/p95 duration per span name over an exported JSONL trace log"""
+    durations: Dict[str, List[float]] = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            durations.setdefault(record["name"], []).append(record["duration_ms"])
+
+    report = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        report[name] = {"count": len(values)}
+        for q in quantiles:
+            report[name][f"p{int(q * 100)}"] = values[min(len(values) - 1, int(q * len(values)))]
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    log = sys.argv[1] if len(sys.argv) > 1 else "cache/traces.jsonl"
+    print(f"{'span':<24} {'count':>6} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, row in percentiles(log).items():
+        print(f"{name:<24} {row['count']:>6} {row['p50']:>10.1f} {row['p95']:>10.1f}")
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Years in the rolling mean, and the residual z-score flagged as an anomaly
+WINDOW = 3
+ANOMALY_Z = 2.0
+# Fewer points than this and a linear trend says nothing about anomalies
+MIN_ANOMALY_YEARS = 5
+
+
+def yearly_totals(df: pd.DataFrame, keys: List[str], value: str, year: str) -> pd.DataFrame:
+    """One row per key x year with the summed `value`, sorted by key then year"""
+    totals = df.groupby(keys + [year], observed=True, sort=True)[value].sum().reset_index()
+    totals = totals.rename(columns={year: "year", value: "value"})
+    totals["year"] = totals["year"].astype("int64")
+    return totals[totals["value"].notna()].reset_index(drop=True)
+
+
+def yearly_trends(totals: pd.DataFrame, keys: List[str], window: int = WINDOW,
+                  z: float = ANOMALY_Z) -> pd.DataFrame:
+    """Add growth, rolling mean and anomaly columns to yearly_totals output.
+
+    Every statistic is a grouped array operation, so the cost grows with
+    rows, not with the number of states or districts:
+
+    - growth:   change on the group's previous year
+    - rolling:  mean of the last `window` years (fewer at the start)
+    - trend:    the group's least-squares line at that year
+    - anomaly:  residual from the line beyond `z` standard deviations,
+                for groups with at least MIN_ANOMALY_YEARS years
+    """
+    out = totals.copy()
+    groups = out.groupby(keys, observed=True, sort=False)
+    value = out["value"]
+
+    previous = groups["value"].shift(1)
+    out["growth"] = (value - previous) / previous.where(previous > 0)
+
+    cumulative = groups["value"].cumsum()
+    dropped = cumulative.groupby([out[k] for k in keys], observed=True, sort=False).shift(window).fillna(0.0)
+    seen = groups.cumcount().to_numpy() + 1
+    out["rolling"] = (cumulative - dropped) / np.minimum(seen, window)
+
+    x = out["year"].astype("float64")
+    x_mean = groups["year"].transform("mean")
+    y_mean = groups["value"].transform("mean")
+    dx = x - x_mean
+    frame = pd.DataFrame({"dxdy": dx * (value - y_mean), "dxdx": dx * dx})
+    sums = frame.groupby([out[k] for k in keys], observed=True, sort=False).transform("sum")
+    slope = sums["dxdy"] / sums["dxdx"].where(sums["dxdx"] > 0)
+    out["slope"] = slope.fillna(0.0)
+    out["trend"] = y_mean + out["slope"] * dx
+
+    residual = value - out["trend"]
+    spread = residual.groupby([out[k] for k in keys], observed=True, sort=False).transform("std")
+    count = groups["value"].transform("size")
+    out["anomaly"] = (count >= MIN_ANOMALY_YEARS) & (residual.abs() > z * spread) & (spread > 0)
+    out["deviation"] = residual / out["trend"].where(out["trend"] > 0)
+    return out
+
+
+def trend_summary(trends: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """One row per group: span, first/last value, change, CAGR, slope, anomalies"""
+    groups = trends.groupby(keys, observed=True, sort=False)
+    summary = groups.agg(
+        first_year=("year", "first"), last_year=("year", "last"), years=("year", "size"),
+        first=("value", "first"), last=("value", "last"), mean=("value", "mean"),
+        slope=("slope", "first"), mean_growth=("growth", "mean"),
+        rolling=("rolling", "last"), anomalies=("anomaly", "sum"),
+    )
+    span = (summary["last_year"] - summary["first_year"]).where(lambda s: s > 0)
+    valid = (summary["first"] > 0) & (summary["last"] > 0)
+    summary["change"] = (summary["last"] - summary["first"]) / summary["first"].where(summary["first"] > 0)
+    summary["cagr"] = np.where(valid, (summary["last"] / summary["first"].where(valid)) ** (1 / span) - 1, np.nan)
+    summary["anomalies"] = summary["anomalies"].astype("int64")
+    return summary.reset_index()
+
+
+def anomalies(trends: pd.DataFrame, keys: List[str], limit: int = 10) -> pd.DataFrame:
+    """The largest flagged departures from trend, biggest first"""
+    flagged = trends[trends["anomaly"]]
+    order = flagged["deviation"].abs().sort_values(ascending=False).index
+    return flagged.loc[order, keys + ["year", "value", "trend", "deviation"]].head(limit)
+
+
+def analyze(df: Optional[pd.DataFrame], keys: List[str], value: str, year: str,
+            window: int = WINDOW) -> Dict[str, pd.DataFrame]:
+    """Yearly series, per-year statistics and per-group summary in one call"""
+    if df is None or df.empty or value not in df.columns or year not in df.columns:
+        empty = pd.DataFrame()
+        return {"yearly": empty, "summary": empty, "anomalies": empty}
+    yearly = yearly_trends(yearly_totals(df, keys, value, year), keys, window)
+    return {"yearly": yearly, "summary": trend_summary(yearly, keys), "anomalies": anomalies(yearly, keys)}
+
+
+def percent(value, digits: int = 1) -> str:
+    return f"{value * 100:+.{digits}f}%" if pd.notna(value) else "n/a"
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    states, districts, crops, years = 30, 20, 6, np.arange(1997, 2015)
+    n = states * districts * crops * len(years) * 2
+    rows = pd.DataFrame({
+        "state_name": pd.Categorical(np.repeat([f"S{i}" for i in range(states)], n // states)),
+        "district_name": pd.Categorical(np.repeat([f"D{i}" for i in range(states * districts)], n // (states * districts))),
+        "crop": pd.Categorical(np.tile(np.repeat([f"C{i}" for i in range(crops)], len(years) * 2), states * districts)),
+        "crop_year": np.tile(np.repeat(years, 2), states * districts * crops),
+        "production_": rng.gamma(2.0, 500.0, n),
+    })
+    start = time.perf_counter()
+    by_state = analyze(rows, ["state_name"], "production_", "crop_year")
+    by_district = analyze(rows, ["state_name", "district_name"], "production_", "crop_year")
+    elapsed = time.perf_counter() - start
+    print(by_state["summary"].head().to_string())
+    print(by_district["anomalies"].head().to_string())
+    print(f"({len(rows):,} rows, {len(by_district['summary']):,} districts x {len(years)} years in {elapsed:.2f}s)")